@@ -0,0 +1,16 @@
+"""End-to-end benchmarks for the static site generator
+
+Run from the repository root, e.g.:
+
+    python3 -m benchmarks.run --pages 10 100 1000 --output bench.json
+
+See `benchmarks.run` for all options. The modules in `src` are made importable here
+so that the benchmarks exercise the same code as `src/main.py`.
+"""
+
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
@@ -0,0 +1,85 @@
+"""Run and measure a single build of a site
+
+Meant to be run in its own process by `benchmarks.run` so that the peak memory usage of
+every build is measured separately:
+
+    python3 -m benchmarks.build SITE_DIR [--jobs N] [--stream-threshold BYTES]
+        [--block-cache-size N] [--line-cache-size N]
+
+Prints the measurements as JSON on stdout.
+"""
+
+import json
+import resource
+import sys
+import time
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from io import StringIO
+from pathlib import Path
+
+from benchmarks import SRC_DIR  # noqa: F401 (makes the modules in src importable)
+from page_helpers import STREAM_THRESHOLD, generate_pages_recursive
+from parse_cache import DEFAULT_MAX_BLOCKS, DEFAULT_MAX_LINES, ParseCache
+from template_engine import TemplateEngine
+
+
+def _peak_rss_kb() -> int:
+    """Peak resident set size of this process or any of its finished children in KiB"""
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in KiB everywhere else
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("site_dir", type=Path)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--stream-threshold", type=int, default=STREAM_THRESHOLD)
+    parser.add_argument("--block-cache-size", type=int, default=DEFAULT_MAX_BLOCKS)
+    parser.add_argument("--line-cache-size", type=int, default=DEFAULT_MAX_LINES)
+    args = parser.parse_args()
+
+    content_dir = args.site_dir / "content"
+    template_path = args.site_dir / "template.html"
+    dest_dir = args.site_dir / "docs"
+    pages = sum(1 for f in content_dir.rglob("*.md"))
+    source_bytes = sum(f.stat().st_size for f in content_dir.rglob("*.md"))
+
+    cache = ParseCache(args.block_cache_size, args.line_cache_size)
+    start = time.perf_counter()
+    with redirect_stdout(StringIO()):
+        engine = TemplateEngine(template_path)
+        generate_pages_recursive(
+            content_dir,
+            template_path,
+            dest_dir,
+            "/",
+            jobs=args.jobs,
+            engine=engine,
+            stream_threshold=args.stream_threshold,
+            cache=cache,
+        )
+    wall_time = time.perf_counter() - start
+
+    result = {
+        "pages": pages,
+        "source_bytes": source_bytes,
+        "jobs": args.jobs,
+        "stream_threshold": args.stream_threshold,
+        "block_cache_size": args.block_cache_size,
+        "line_cache_size": args.line_cache_size,
+        "wall_time": wall_time,
+        "pages_per_second": pages / wall_time,
+        "peak_rss_kb": _peak_rss_kb(),
+        "parse_cache": {tier: asdict(stats) for tier, stats in cache.stats().items()},
+    }
+    json.dump(result, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
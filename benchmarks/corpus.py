@@ -0,0 +1,156 @@
+"""Generator of synthetic sites used by the benchmarks
+
+Pages are built from the same kinds of blocks as the posts in `content/blog`: headings,
+paragraphs with inline markdown, quotes, ordered and unordered lists, code blocks and
+images. The `mix` decides which kinds of blocks dominate a page.
+"""
+
+import random
+from pathlib import Path
+
+WORDS: list[str] = (
+    "the of and to in a is that for it as was with be by on not he this are or his "
+    "from at which but have an they you were her she there one all we their been has "
+    "would when if so what no out up said its about into than them can only other "
+    "ring shire hobbit wizard elf dwarf mountain river forest road fellowship quest "
+    "king steward tower sword shadow light song tale journey"
+).split()
+
+MIXES: dict[str, dict[str, int]] = {
+    "mixed": {
+        "paragraph": 6,
+        "heading": 2,
+        "quote": 1,
+        "list": 2,
+        "code": 1,
+        "image": 1,
+    },
+    "inline": {"paragraph": 10, "heading": 1, "list": 1},
+    "list": {"list": 10, "heading": 1, "paragraph": 1},
+    "code": {"code": 10, "heading": 1, "paragraph": 1},
+}
+"""
+Relative weights of the kinds of blocks that make up a page for each mix
+"""
+
+
+def _sentence(rng: random.Random, inline: bool) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 18))
+    if inline:
+        for i in rng.sample(range(len(words)), rng.randint(1, 3)):
+            match rng.randrange(5):
+                case 0:
+                    words[i] = f"**{words[i]}**"
+                case 1:
+                    words[i] = f"_{words[i]}_"
+                case 2:
+                    words[i] = f"`{words[i]}`"
+                case 3:
+                    words[i] = f"[{words[i]}](/blog/{words[i]})"
+                case _:
+                    words[i] = f"[{words[i]}](https://example.com/{words[i]})"
+    return " ".join(words).capitalize() + "."
+
+
+def _block(rng: random.Random, kind: str, inline: bool) -> str:
+    match kind:
+        case "heading":
+            return "#" * rng.randint(2, 4) + " " + _sentence(rng, False).rstrip(".")
+        case "quote":
+            lines = rng.randint(1, 4)
+            return "\n".join("> " + _sentence(rng, inline) for _ in range(lines))
+        case "list":
+            items = [_sentence(rng, inline) for _ in range(rng.randint(2, 8))]
+            if rng.random() < 0.5:
+                return "\n".join(f"{i}. {item}" for i, item in enumerate(items, 1))
+            return "\n".join(f"- {item}" for item in items)
+        case "code":
+            lines = [f'print("{rng.choice(WORDS)}")' for _ in range(rng.randint(2, 12))]
+            return "```\n" + "\n".join(lines) + "\n```"
+        case "image":
+            word = rng.choice(WORDS)
+            return f"![{word} image](/images/{word}.png)"
+        case _:
+            sentences = rng.randint(2, 8)
+            return " ".join(_sentence(rng, inline) for _ in range(sentences))
+
+
+def generate_page(rng: random.Random, size: int, mix: str = "mixed") -> str:
+    """Generate a markdown page of roughly `size` bytes
+
+    Parameters
+    ----------
+    rng: random.Random
+        The random number generator used to pick the contents of the page
+    size: int
+        Approximate size of the page in bytes. Pages are never smaller than their title
+        and first block.
+    mix: str
+        The mix of blocks making up the page. Must be a key of `MIXES`. Default:
+        "mixed"
+
+    Returns
+    -------
+    str
+        The markdown page
+    """
+    weights = MIXES[mix]
+    kinds, kind_weights = list(weights), list(weights.values())
+    inline = mix != "code"
+    blocks = ["# " + _sentence(rng, False).rstrip(".")]
+    length = len(blocks[0])
+    while length < size:
+        block = _block(rng, rng.choices(kinds, kind_weights)[0], inline)
+        blocks.append(block)
+        length += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_corpus(
+    root: Path | str,
+    pages: int,
+    page_size: int = 4096,
+    mix: str = "mixed",
+    seed: int = 0,
+) -> Path:
+    """Generate a synthetic site
+
+    Pages are spread over nested directories (`blog/<n>/<m>/index.md`) with at most 100
+    entries per directory. A copy of the repository's template is written alongside the
+    content.
+
+    Parameters
+    ----------
+    root: pathlib.Path | str
+        Directory the site is generated in. Must be empty or not exist.
+    pages: int
+        Number of pages to generate
+    page_size: int
+        Approximate size of every page in bytes. Default: 4096
+    mix: str
+        The mix of blocks making up the pages. Must be a key of `MIXES`. Default:
+        "mixed"
+    seed: int
+        Seed of the random number generator, so that corpora can be reproduced.
+        Default: 0
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the content directory of the generated site
+    """
+    if mix not in MIXES:
+        raise ValueError(f"unknown mix '{mix}'")
+    root = Path(root)
+    rng = random.Random(seed)
+    content_dir = root / "content"
+    for i in range(pages):
+        page_dir = content_dir
+        if i > 0:
+            page_dir = content_dir / "blog" / str(i // 100) / str(i % 100)
+        page_dir.mkdir(parents=True, exist_ok=True)
+        (page_dir / "index.md").write_text(generate_page(rng, page_size, mix))
+
+    template_path = Path(__file__).resolve().parent.parent / "template.html"
+    (root / "template.html").write_text(template_path.read_text())
+    return content_dir
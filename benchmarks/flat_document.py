@@ -0,0 +1,510 @@
+import struct
+import sys
+from array import array
+from collections.abc import Callable
+from enum import IntEnum
+from typing import TextIO
+
+from benchmarks import SRC_DIR  # noqa: F401 (makes the modules in src importable)
+from htmlnode import HTMLNode
+from leafnode import LeafNode
+from markdown_converters import _shared_block_node, lex_blocks
+from parentnode import ParentNode
+from parse_cache import ParseCache
+from profiling import PageProfile
+from render_options import RenderOptions
+
+NO_NODE = -1
+"""Index used in the link arrays of a `FlatDocument` where there is no node"""
+NO_STRING = -1
+"""Index used in the tag and value arrays of a `FlatDocument` for `None`"""
+
+# Magic, format version, number of nodes, props and strings, size of the text in bytes
+_HEADER = struct.Struct("<4sHIIII")
+_MAGIC = b"FDOC"
+_FORMAT_VERSION = 1
+
+_HAS_CHILDREN = 0x4
+"""Flag of a node whose children are a (possibly empty) list instead of `None`"""
+_KIND_MASK = 0x3
+
+
+class NodeKind(IntEnum):
+    """The class of the `HTMLNode` a node of a `FlatDocument` stands for"""
+
+    HTML = 0
+    LEAF = 1
+    PARENT = 2
+
+
+_KIND_CLASSES: dict[NodeKind, type[HTMLNode]] = {
+    NodeKind.HTML: HTMLNode,
+    NodeKind.LEAF: LeafNode,
+    NodeKind.PARENT: ParentNode,
+}
+_CLASS_KINDS: dict[type[HTMLNode], NodeKind] = {
+    cls: kind for kind, cls in _KIND_CLASSES.items()
+}
+
+
+class FlatDocument:
+    """An HTML document tree stored in parallel arrays instead of node objects
+
+    Node `i` of the document is described by the `i`th entry of each array:
+
+    - `flags`: the `NodeKind` of the node, plus a flag telling whether it has a list
+      of children (a node without one is rendered from its value)
+    - `tags`, `values`: indices into `strings`, or `NO_STRING` for `None`
+    - `parents`, `first_children`, `next_siblings`: indices of other nodes, or
+      `NO_NODE`
+    - `prop_offsets`: the props of the node are the pairs of `prop_names` and
+      `prop_values` (indices into `strings`) from `prop_offsets[i]` up to
+      `prop_offsets[i + 1]`
+
+    Every distinct string (tags, text, attribute names and values) is stored once.
+    Node 0 is the root. A document is a few flat buffers no matter how many nodes it
+    has, so it is much cheaper to hold in memory, to serialize with `to_bytes` and to
+    send to another process than the equivalent `HTMLNode` tree. Pickling a document
+    pickles the bytes of `to_bytes`.
+
+    Documents are built by appending `HTMLNode` trees with `append`, or converted from
+    and to a tree with `from_html_node` and `to_html_node`. `to_html` and `write_html`
+    produce the same HTML as the tree would.
+
+    The build itself doesn't use documents: every worker process renders and writes
+    its pages itself, so no parsed page is sent between processes, and appending the
+    nodes of a page takes longer than copying its cached blocks and serializing the
+    tree. Documents are measured by `benchmarks.memory`.
+    """
+
+    __slots__ = (
+        "flags",
+        "tags",
+        "values",
+        "parents",
+        "first_children",
+        "next_siblings",
+        "prop_offsets",
+        "prop_names",
+        "prop_values",
+        "strings",
+        "_string_ids",
+        "_last_children",
+    )
+
+    def __init__(self) -> None:
+        self.flags: array[int] = array("B")
+        self.tags: array[int] = array("i")
+        self.values: array[int] = array("i")
+        self.parents: array[int] = array("i")
+        self.first_children: array[int] = array("i")
+        self.next_siblings: array[int] = array("i")
+        self.prop_offsets: array[int] = array("i", [0])
+        self.prop_names: array[int] = array("i")
+        self.prop_values: array[int] = array("i")
+        self.strings: list[str] = []
+        self._string_ids: dict[str, int] | None = {}
+        # Only needed to link nodes appended later, so it isn't serialized
+        self._last_children: array[int] | None = array("i")
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def __repr__(self) -> str:
+        return f"FlatDocument({len(self)} nodes, {len(self.strings)} strings)"
+
+    def __reduce__(self) -> tuple[Callable[[bytes], "FlatDocument"], tuple[bytes]]:
+        return FlatDocument.from_bytes, (self.to_bytes(),)
+
+    def _string_id(self, string: str | None) -> int:
+        if string is None:
+            return NO_STRING
+        if self._string_ids is None:
+            self._string_ids = {s: i for i, s in enumerate(self.strings)}
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(string)
+            self._string_ids[string] = string_id
+        return string_id
+
+    def _link_last_children(self) -> array:
+        if self._last_children is None:
+            self._last_children = array("i", [NO_NODE]) * len(self)
+            # Siblings are appended in order, so the last one seen is the last child
+            for i, parent in enumerate(self.parents):
+                if parent != NO_NODE:
+                    self._last_children[parent] = i
+        return self._last_children
+
+    def _append_node(self, node: HTMLNode, parent: int) -> int:
+        last_children = self._link_last_children()
+        index = len(self)
+        kind = _CLASS_KINDS.get(type(node), NodeKind.HTML)
+        has_children = _HAS_CHILDREN if node.children is not None else 0
+        self.flags.append(kind | has_children)
+        self.tags.append(self._string_id(node.tag))
+        self.values.append(self._string_id(node.value))
+        self.parents.append(parent)
+        self.first_children.append(NO_NODE)
+        self.next_siblings.append(NO_NODE)
+        if node.props:
+            for name, value in node.props.items():
+                self.prop_names.append(self._string_id(name))
+                self.prop_values.append(self._string_id(value))
+        self.prop_offsets.append(len(self.prop_names))
+
+        last_children.append(NO_NODE)
+        if parent != NO_NODE:
+            previous = last_children[parent]
+            if previous == NO_NODE:
+                self.first_children[parent] = index
+            else:
+                self.next_siblings[previous] = index
+            last_children[parent] = index
+        return index
+
+    def append(self, node: HTMLNode, parent: int = NO_NODE) -> int:
+        """Add an `HTMLNode` and all of its descendants to the document
+
+        The tree is copied, so `node` can be modified or discarded afterwards.
+
+        Parameters
+        ----------
+        node: HTMLNode
+            The root of the tree to add
+        parent: int
+            Index of the node the tree is added to as the last child. Must have a list
+            of children. Setting to `NO_NODE` adds the tree as the root, which is only
+            allowed while the document is empty. Default: `NO_NODE`
+
+        Returns
+        -------
+        int
+            The index of `node` in the document
+        """
+        if parent == NO_NODE:
+            if len(self):
+                raise ValueError("document already has a root")
+        elif not 0 <= parent < len(self) or not self.flags[parent] & _HAS_CHILDREN:
+            raise ValueError(f"node {parent} can't have children")
+
+        index = self._append_node(node, parent)
+        stack: list[tuple[HTMLNode, int]] = [(node, index)]
+        while stack:
+            node, index = stack.pop()
+            if node.children is None:
+                continue
+            for child in node.children:
+                stack.append((child, self._append_node(child, index)))
+        return index
+
+    @classmethod
+    def from_html_node(cls, node: HTMLNode) -> "FlatDocument":
+        """Convert an `HTMLNode` tree into a document
+
+        Parameters
+        ----------
+        node: HTMLNode
+            The root of the tree
+
+        Returns
+        -------
+        FlatDocument
+            A document with `node` as its root
+        """
+        document = cls()
+        document.append(node)
+        return document
+
+    def props(self, index: int) -> dict[str, str] | None:
+        """The props of a node as a new dictionary, None if it has none"""
+        start, end = self.prop_offsets[index], self.prop_offsets[index + 1]
+        if start == end:
+            return None
+        strings = self.strings
+        return {
+            strings[self.prop_names[i]]: strings[self.prop_values[i]]
+            for i in range(start, end)
+        }
+
+    def children(self, index: int) -> list[int] | None:
+        """Indices of the children of a node, None if it has no list of children"""
+        if not self.flags[index] & _HAS_CHILDREN:
+            return None
+        children: list[int] = []
+        child = self.first_children[index]
+        while child != NO_NODE:
+            children.append(child)
+            child = self.next_siblings[child]
+        return children
+
+    def _string(self, string_id: int) -> str | None:
+        return None if string_id == NO_STRING else self.strings[string_id]
+
+    def _new_node(self, index: int) -> HTMLNode:
+        node = object.__new__(_KIND_CLASSES[NodeKind(self.flags[index] & _KIND_MASK)])
+        node.tag = self._string(self.tags[index])
+        node.value = self._string(self.values[index])
+        node.children = [] if self.flags[index] & _HAS_CHILDREN else None
+        node.props = self.props(index)
+        return node
+
+    def to_html_node(self, index: int = 0) -> HTMLNode:
+        """Convert a node and its descendants back into an `HTMLNode` tree
+
+        Parameters
+        ----------
+        index: int
+            Index of the root of the tree to convert. Default: 0, the whole document
+
+        Returns
+        -------
+        HTMLNode
+            A new tree of `HTMLNode`, `LeafNode` and `ParentNode` objects equal to the
+            one the nodes were added from
+        """
+        root = self._new_node(index)
+        stack = [(root, index)]
+        while stack:
+            node, index = stack.pop()
+            child = self.first_children[index]
+            while child != NO_NODE:
+                child_node = self._new_node(child)
+                node.children.append(child_node)
+                stack.append((child_node, child))
+                child = self.next_siblings[child]
+        return root
+
+    def to_html(self) -> str:
+        """Convert the document into the HTML its `HTMLNode` tree converts into
+
+        Returns
+        -------
+        str
+            A string containing valid HTML tags for the whole document
+        """
+        chunks: list[str] = []
+        self._serialize(chunks.append)
+        return "".join(chunks)
+
+    def write_html(self, fp: TextIO) -> None:
+        """Write the document as HTML to a text stream, like `HTMLNode.write_html`
+
+        Parameters
+        ----------
+        fp: TextIO
+            Any writable text stream (e.g., an open file or an `io.StringIO`)
+        """
+        self._serialize(fp.write)
+
+    def _leaf_html(self, index: int) -> str:
+        kind = self.flags[index] & _KIND_MASK
+        tag = self._string(self.tags[index])
+        if kind == NodeKind.PARENT:
+            if tag is None:
+                raise ValueError("'tag' attribute has no value")
+            raise ValueError("'children' attribute has no value")
+        if self.values[index] == NO_STRING:
+            raise ValueError("'value' attribute has no value")
+        value = self.strings[self.values[index]]
+        if tag is None:
+            return value
+        return f"<{tag}{self._props_to_html(index)}>{value}</{tag}>"
+
+    def _start_tag(self, index: int) -> str:
+        tag = self._string(self.tags[index])
+        if self.flags[index] & _KIND_MASK == NodeKind.PARENT:
+            if tag is None:
+                raise ValueError("'tag' attribute has no value")
+            return f"<{tag}>"
+        return f"<{tag}{self._props_to_html(index)}>"
+
+    def _props_to_html(self, index: int) -> str:
+        strings = self.strings
+        return "".join(
+            f' {strings[self.prop_names[i]]}="{strings[self.prop_values[i]]}"'
+            for i in range(self.prop_offsets[index], self.prop_offsets[index + 1])
+        )
+
+    def _serialize(self, write: Callable[[str], object]) -> None:
+        if not len(self):
+            raise ValueError("document has no nodes")
+        flags, tags, values = self.flags, self.tags, self.values
+        first_children, next_siblings = self.first_children, self.next_siblings
+        prop_offsets, strings = self.prop_offsets, self.strings
+        # Each entry holds the closing tag of an open element, followed by the node
+        # written after it
+        stack: list[tuple[str, int]] = []
+        index = 0
+        while True:
+            flag = flags[index]
+            if flag & _HAS_CHILDREN:
+                write(self._start_tag(index))
+                stack.append((f"</{self._string(tags[index])}>", next_siblings[index]))
+                index = first_children[index]
+            else:
+                tag, value = tags[index], values[index]
+                if (
+                    flag != NodeKind.PARENT
+                    and value != NO_STRING
+                    and prop_offsets[index] == prop_offsets[index + 1]
+                ):
+                    # Fast path for the many text and inline nodes without props
+                    if tag == NO_STRING:
+                        write(strings[value])
+                    else:
+                        write(f"<{strings[tag]}>{strings[value]}</{strings[tag]}>")
+                else:
+                    write(self._leaf_html(index))
+                index = next_siblings[index]
+            while index == NO_NODE:
+                if not stack:
+                    return
+                end_tag, index = stack.pop()
+                write(end_tag)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the document into a compact buffer
+
+        Returns
+        -------
+        bytes
+            The arrays of the document and its strings, encoded as UTF-8. Can be
+            turned back into a document with `from_bytes`
+        """
+        text = "".join(self.strings).encode()
+        string_offsets = array("i", [0])
+        offset = 0
+        for string in self.strings:
+            offset += len(string.encode())
+            string_offsets.append(offset)
+        arrays = [
+            self.flags,
+            self.tags,
+            self.values,
+            self.parents,
+            self.first_children,
+            self.next_siblings,
+            self.prop_offsets,
+            self.prop_names,
+            self.prop_values,
+            string_offsets,
+        ]
+        if sys.byteorder == "big":
+            arrays = [array(a.typecode, a) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        header = _HEADER.pack(
+            _MAGIC,
+            _FORMAT_VERSION,
+            len(self),
+            len(self.prop_names),
+            len(self.strings),
+            len(text),
+        )
+        return b"".join([header, *(a.tobytes() for a in arrays), text])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FlatDocument":
+        """Deserialize a document written by `to_bytes`
+
+        Parameters
+        ----------
+        data: bytes
+            A buffer returned by `to_bytes`
+
+        Returns
+        -------
+        FlatDocument
+            A document equal to the serialized one
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("buffer is too short to hold a document")
+        magic, version, num_nodes, num_props, num_strings, text_size = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError("buffer does not hold a document of a known format")
+
+        document = cls()
+        view = memoryview(data)
+        offset = _HEADER.size
+        layout = [
+            ("flags", num_nodes),
+            ("tags", num_nodes),
+            ("values", num_nodes),
+            ("parents", num_nodes),
+            ("first_children", num_nodes),
+            ("next_siblings", num_nodes),
+            ("prop_offsets", num_nodes + 1),
+            ("prop_names", num_props),
+            ("prop_values", num_props),
+            (None, num_strings + 1),
+        ]
+        string_offsets = array("i")
+        for name, length in layout:
+            a = array("B" if name == "flags" else "i")
+            size = a.itemsize * length
+            if offset + size > len(data):
+                raise ValueError("buffer is too short to hold a document")
+            a.frombytes(view[offset : offset + size])
+            offset += size
+            if sys.byteorder == "big":
+                a.byteswap()
+            if name is None:
+                string_offsets = a
+            else:
+                setattr(document, name, a)
+        if offset + text_size != len(data):
+            raise ValueError("buffer size does not match the document")
+
+        text = bytes(view[offset:])
+        document.strings = [
+            text[string_offsets[i] : string_offsets[i + 1]].decode()
+            for i in range(num_strings)
+        ]
+        document._string_ids = None
+        document._last_children = None
+        return document
+
+
+def markdown_to_flat_document(
+    markdown: str,
+    profile: PageProfile | None = None,
+    options: RenderOptions | None = None,
+    cache: ParseCache | None = None,
+) -> FlatDocument:
+    """Convert markdown text to a FlatDocument
+
+    Produces the same document as `markdown_to_html_node`, but every block is added to
+    the document as soon as it is converted, so the tree of the whole document is never
+    built. Blocks taken from `cache` are added without being copied first.
+
+    Parameters
+    ----------
+    markdown: str
+        Text written in markdown format
+    profile: PageProfile | None
+        If provided, the time spent on block and inline parsing is recorded in it.
+        Default: None
+    options: RenderOptions | None
+        Options applied while converting. Default: None
+    cache: ParseCache | None
+        If provided, blocks and lines that were converted before are taken from it
+        instead of being parsed again. Default: None
+
+    Returns
+    -------
+    FlatDocument
+        A FlatDocument representing the entire markdown document.
+    """
+    document = FlatDocument()
+    root = document.append(HTMLNode("div", None, []))
+    for block in lex_blocks(markdown.split("\n")):
+        if profile is not None:
+            profile.lap("blocks")
+        document.append(_shared_block_node(block, options, cache), root)
+        if profile is not None:
+            profile.lap("inline")
+    return document
@@ -0,0 +1,137 @@
+"""Measure the memory used by the node trees of a page
+
+    python3 -m benchmarks.memory [--page-size BYTES] [--mix MIX] [--nodes N]
+
+Reports the bytes per instance of every node class next to an equivalent class that
+keeps a per-instance `__dict__` (the layout of the nodes before they had `__slots__`),
+and the nodes and peak memory of converting a synthetic page with
+`markdown_to_html_node`. The page is also converted with `markdown_to_flat_document`
+and the size of the `FlatDocument` is compared with the pickled tree, which is what
+would otherwise be sent between processes. Prints the measurements as JSON on stdout.
+"""
+
+import json
+import pickle
+import random
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from collections import Counter
+from collections.abc import Callable
+
+from benchmarks import SRC_DIR  # noqa: F401 (makes the modules in src importable)
+from benchmarks.corpus import MIXES, generate_page
+from benchmarks.flat_document import markdown_to_flat_document
+from htmlnode import HTMLNode
+from leafnode import LeafNode
+from markdown_converters import markdown_to_html_node
+from parentnode import ParentNode
+from textnode import TextNode, TextType
+
+_CHILDREN: list[HTMLNode] = []
+
+NODE_FACTORIES: dict[str, Callable[[], object]] = {
+    "TextNode": lambda: TextNode("some text", TextType.TEXT),
+    "HTMLNode": lambda: HTMLNode("p", "some text"),
+    "LeafNode": lambda: LeafNode("b", "some text"),
+    "ParentNode": lambda: ParentNode("li", _CHILDREN),
+}
+"""How to create a typical instance of every node class"""
+
+
+def _dict_factory(node: object) -> Callable[[], object]:
+    """Factory of objects holding the attributes of `node` in a `__dict__`"""
+    attrs = [
+        (name, getattr(node, name))
+        for cls in reversed(type(node).__mro__)
+        for name in getattr(cls, "__slots__", ())
+    ]
+    dict_cls = type(f"{type(node).__name__}WithDict", (), {})
+
+    def factory() -> object:
+        obj = dict_cls()
+        for name, value in attrs:
+            setattr(obj, name, value)
+        return obj
+
+    return factory
+
+
+def bytes_per_instance(factory: Callable[[], object], n: int) -> float:
+    """Average memory allocated for each of `n` instances created by `factory`"""
+    instances: list[object] = [None] * n
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        instances[i] = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / n
+
+
+def count_nodes(node: HTMLNode) -> Counter[str]:
+    """Number of nodes of each class in the tree below and including `node`"""
+    counts: Counter[str] = Counter()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        counts[type(node).__name__] += 1
+        if node.children is not None:
+            stack.extend(node.children)
+    return counts
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--page-size", type=int, default=1024 * 1024)
+    parser.add_argument("--mix", choices=MIXES, default="mixed")
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    per_node = {}
+    for name, factory in NODE_FACTORIES.items():
+        per_node[name] = {
+            "slots": bytes_per_instance(factory, args.nodes),
+            "dict": bytes_per_instance(_dict_factory(factory()), args.nodes),
+        }
+
+    markdown = generate_page(random.Random(args.seed), args.page_size, args.mix)
+    tracemalloc.start()
+    tree = markdown_to_html_node(markdown)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    counts = count_nodes(tree)
+    tracemalloc.start()
+    document = markdown_to_flat_document(markdown)
+    flat_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        "bytes_per_node": per_node,
+        "page": {
+            "source_bytes": len(markdown.encode()),
+            "mix": args.mix,
+            "nodes": dict(counts),
+            "node_bytes_slots": sum(
+                n * per_node[name]["slots"] for name, n in counts.items()
+            ),
+            "node_bytes_dict": sum(
+                n * per_node[name]["dict"] for name, n in counts.items()
+            ),
+            "peak_bytes": peak,
+            "pickled_tree_bytes": len(pickle.dumps(tree)),
+        },
+        "flat_document": {
+            "nodes": len(document),
+            "strings": len(document.strings),
+            "serialized_bytes": len(document.to_bytes()),
+            "peak_bytes": flat_peak,
+        },
+    }
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
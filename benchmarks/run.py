@@ -0,0 +1,130 @@
+"""Measure full builds of synthetic sites of various sizes and shapes
+
+Every combination of `--pages`, `--page-size`, `--mix` and `--jobs` is generated with
+`benchmarks.corpus` and built `--repeat` times with `benchmarks.build`, each build in a
+fresh process. The results are written as JSON so that scaling curves can be compared
+between commits, e.g.:
+
+    python3 -m benchmarks.run --pages 10 100 1000 10000 --output before.json
+    python3 -m benchmarks.run --page-size 1024 1048576 52428800 --pages 1 \\
+        --mix inline list code --output sizes.json
+    python3 -m benchmarks.run --block-cache-size 0 --line-cache-size 0 \\
+        --output uncached.json
+"""
+
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from itertools import product
+from pathlib import Path
+
+from benchmarks.corpus import MIXES, generate_corpus
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+
+def _git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_build(
+    site_dir: Path,
+    jobs: int,
+    stream_threshold: int | None = None,
+    block_cache_size: int | None = None,
+    line_cache_size: int | None = None,
+) -> dict[str, float | int]:
+    """Build the site in `site_dir` in a fresh process and return its measurements
+
+    Options that are `None` are left at the defaults of `benchmarks.build`.
+    """
+    command = [sys.executable, "-m", "benchmarks.build", str(site_dir)]
+    command += ["--jobs", str(jobs)]
+    if stream_threshold is not None:
+        command += ["--stream-threshold", str(stream_threshold)]
+    if block_cache_size is not None:
+        command += ["--block-cache-size", str(block_cache_size)]
+    if line_cache_size is not None:
+        command += ["--line-cache-size", str(line_cache_size)]
+    result = subprocess.run(
+        command,
+        cwd=REPO_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--page-size", type=int, nargs="+", default=[4096])
+    parser.add_argument("--mix", choices=MIXES, nargs="+", default=["mixed"])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1])
+    parser.add_argument("--stream-threshold", type=int)
+    parser.add_argument("--block-cache-size", type=int)
+    parser.add_argument("--line-cache-size", type=int)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("bench.json"))
+    args = parser.parse_args()
+
+    results: list[dict[str, float | int | str]] = []
+    for pages, page_size, mix in product(args.pages, args.page_size, args.mix):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            site_dir = Path(tmp_dir)
+            generate_corpus(site_dir, pages, page_size, mix, args.seed)
+            for jobs in args.jobs:
+                runs = [
+                    run_build(
+                        site_dir,
+                        jobs,
+                        args.stream_threshold,
+                        args.block_cache_size,
+                        args.line_cache_size,
+                    )
+                    for _ in range(args.repeat)
+                ]
+                best = min(runs, key=lambda run: run["wall_time"])
+                result = {
+                    "mix": mix,
+                    "page_size": page_size,
+                    **best,
+                    "wall_times": [run["wall_time"] for run in runs],
+                }
+                results.append(result)
+                print(
+                    f"{pages:>7} pages  {page_size:>9} B  {mix:<6}  {jobs:>2} jobs  "
+                    f"{best['wall_time']:>9.3f} s  {best['pages_per_second']:>9.1f} "
+                    f"pages/s  {best['peak_rss_kb'] / 1024:>8.1f} MiB"
+                )
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote results to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
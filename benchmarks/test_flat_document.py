@@ -0,0 +1,107 @@
+import io
+import pickle
+import unittest
+
+from benchmarks.flat_document import NO_NODE, FlatDocument, markdown_to_flat_document
+from htmlnode import HTMLNode
+from leafnode import LeafNode
+from markdown_converters import markdown_to_html_node
+from parentnode import ParentNode
+from parse_cache import ParseCache
+
+MARKDOWN = """# Title
+
+Some **bold** and _italic_ text with a [link](/page) and ![image](/image.png)
+
+- one
+- two
+
+```
+code
+```"""
+
+
+class TestFlatDocument(unittest.TestCase):
+    def setUp(self):
+        self.tree = HTMLNode(
+            "div",
+            None,
+            [
+                ParentNode("p", [LeafNode(None, "text "), LeafNode("b", "bold")]),
+                LeafNode("a", "link", {"href": "/page", "title": "text "}),
+                HTMLNode("ul", None, []),
+            ],
+        )
+        self.document = FlatDocument.from_html_node(self.tree)
+
+    def test_to_html(self):
+        self.assertEqual(self.document.to_html(), self.tree.to_html())
+        fp = io.StringIO()
+        self.document.write_html(fp)
+        self.assertEqual(fp.getvalue(), self.tree.to_html())
+
+    def test_strings_are_stored_once(self):
+        self.assertEqual(self.document.strings.count("text "), 1)
+
+    def test_links(self):
+        self.assertEqual(len(self.document), 6)
+        self.assertEqual(self.document.parents[0], NO_NODE)
+        children = self.document.children(0)
+        self.assertEqual(len(children), 3)
+        self.assertEqual(self.document.children(children[2]), [])
+        self.assertIsNone(self.document.children(children[1]))
+        self.assertEqual(
+            self.document.props(children[1]), {"href": "/page", "title": "text "}
+        )
+
+    def test_to_html_node(self):
+        tree = self.document.to_html_node()
+        self.assertEqual(tree.to_html(), self.tree.to_html())
+        self.assertEqual(
+            [type(child) for child in tree.children], [ParentNode, LeafNode, HTMLNode]
+        )
+
+    def test_bytes_round_trip(self):
+        document = FlatDocument.from_bytes(self.document.to_bytes())
+        self.assertEqual(document.to_html(), self.tree.to_html())
+        document.append(LeafNode("i", "more"), document.children(0)[2])
+        self.assertEqual(
+            document.to_html(),
+            self.tree.to_html().replace("<ul></ul>", "<ul><i>more</i></ul>"),
+        )
+
+    def test_pickle(self):
+        document = pickle.loads(pickle.dumps(self.document))
+        self.assertEqual(document.to_html(), self.tree.to_html())
+
+    def test_invalid_bytes(self):
+        data = self.document.to_bytes()
+        with self.assertRaises(ValueError):
+            FlatDocument.from_bytes(b"HTML" + data[4:])
+        with self.assertRaises(ValueError):
+            FlatDocument.from_bytes(data[:-1])
+
+    def test_invalid_append(self):
+        with self.assertRaises(ValueError):
+            self.document.append(LeafNode("b", "root"))
+        with self.assertRaises(ValueError):
+            self.document.append(LeafNode("b", "bold"), self.document.children(0)[1])
+
+    def test_invalid_node(self):
+        document = FlatDocument.from_html_node(ParentNode("p", [LeafNode("b", None)]))
+        with self.assertRaises(ValueError):
+            document.to_html()
+
+
+class TestMarkdownToFlatDocument(unittest.TestCase):
+    def test_matches_tree(self):
+        document = markdown_to_flat_document(MARKDOWN)
+        self.assertEqual(document.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+
+    def test_cache(self):
+        cache = ParseCache()
+        want = markdown_to_html_node(MARKDOWN).to_html()
+        for _ in range(2):
+            document = markdown_to_flat_document(MARKDOWN, cache=cache)
+            self.assertEqual(document.to_html(), want)
+        self.assertGreater(cache.blocks.stats.hits, 0)
@@ -0,0 +1,256 @@
+import hashlib
+import json
+from pathlib import Path
+
+from markdown_converters import CONVERTER_VERSION
+
+MANIFEST_VERSION = 2
+
+
+def hash_file(path: Path | str) -> str:
+    """Compute the SHA-256 hex digest of a file's contents
+
+    Parameters
+    ----------
+    path: pathlib.Path | str
+        Path to the file to be hashed
+
+    Returns
+    -------
+    str
+        The hex digest of the file's contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Record of the inputs used to produce each generated page
+
+    The manifest maps every source markdown file to the hash of its contents, the
+    output file it was rendered to and the sizes of the images it refers to. Pages are
+    only considered up to date if their source hash and the sizes of their images
+    match and the build settings (templates hash, converter version, basepath,
+    minification and asset URLs) are the same as the ones used by the previous build,
+    so changing an image only rebuilds the pages that show it. Outputs whose sources
+    disappear between builds are removed by `remove_orphans`. The manifest also keeps
+    track of the static assets copied into the output directory so that assets removed
+    from the source directory can be removed from the output as well, of the hashes of
+    the precompressed output files and of the sources of optimized images so that
+    unchanged files aren't processed again, and of the files of the search index so
+    that only those are ever deleted.
+
+    Parameters
+    ----------
+    path: pathlib.Path | str
+        Path to the JSON file where the manifest is stored
+    templates_hash: str
+        Hash of the templates used to render pages
+    basepath: str
+        The basepath that root-relative URLs are rewritten to
+    minify: bool
+        Whether pages are written as minified HTML. Default: False
+    asset_urls: dict[str, str] | None
+        URLs of assets mapped to the URLs pages refer to them by (e.g., the URLs of
+        fingerprinted stylesheets). Default: None
+    image_sizes: dict[str, tuple[int, int]] | None
+        URLs of images mapped to the width and height pages give them. Default: None
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        templates_hash: str,
+        basepath: str,
+        minify: bool = False,
+        asset_urls: dict[str, str] | None = None,
+        image_sizes: dict[str, tuple[int, int]] | None = None,
+    ) -> None:
+        self.path: Path = Path(path)
+        self.settings: dict[str, object] = {
+            "manifest_version": MANIFEST_VERSION,
+            "converter_version": CONVERTER_VERSION,
+            "templates": templates_hash,
+            "basepath": basepath,
+            "minify": minify,
+            "asset_urls": asset_urls or {},
+        }
+        # Stored as lists to compare equal to the sizes loaded from JSON
+        self._image_sizes: dict[str, list[int]] = {
+            url: list(size) for url, size in (image_sizes or {}).items()
+        }
+        self._previous_pages: dict[str, dict] = {}
+        self._settings_match: bool = False
+        self.pages: dict[str, dict] = {}
+        self.previous_assets: list[str] = []
+        self.assets: list[str] = []
+        self.previous_compressed: dict[str, str] = {}
+        self.compressed: dict[str, str] = {}
+        self.previous_images: dict[str, str] = {}
+        self.images: dict[str, str] = {}
+        self.previous_search_files: list[str] = []
+        self.search_files: list[str] = []
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._previous_pages = data.get("pages", {})
+        self.previous_assets = data.get("assets", [])
+        self.previous_compressed = data.get("compressed", {})
+        self.previous_images = data.get("images", {})
+        self.previous_search_files = data.get("search", [])
+        self._settings_match = data.get("settings") == self.settings
+
+    def invalidate_pages(self) -> None:
+        """Consider every page out of date, regardless of the previous build"""
+        self._settings_match = False
+
+    def needs_build(self, src: Path, dest: Path, src_hash: str) -> bool:
+        """Check whether a page has to be (re)generated
+
+        Parameters
+        ----------
+        src: pathlib.Path
+            Path to the source markdown file
+        dest: pathlib.Path
+            Path to the generated HTML file
+        src_hash: str
+            Hash of the current contents of `src`
+
+        Returns
+        -------
+        bool
+            True if the page is new, changed, missing from the output directory, refers
+            to an image whose size changed or was built with different settings. False
+            otherwise.
+        """
+        if not self._settings_match or not dest.exists():
+            return True
+        previous = self._previous_pages.get(str(src))
+        if previous is None:
+            return True
+        if previous["hash"] != src_hash or previous["output"] != str(dest):
+            return True
+        return any(
+            self._image_sizes.get(url) != size
+            for url, size in previous.get("images", {}).items()
+        )
+
+    def record(
+        self,
+        src: Path,
+        dest: Path,
+        src_hash: str,
+        images: dict[str, tuple[int, int] | None] | None = None,
+    ) -> None:
+        """Record a page as being part of the current build
+
+        Parameters
+        ----------
+        src: pathlib.Path
+            Path to the source markdown file
+        dest: pathlib.Path
+            Path to the generated HTML file
+        src_hash: str
+            Hash of the contents of `src` the page was generated from
+        images: dict[str, tuple[int, int] | None] | None
+            The URLs the page refers to mapped to the sizes of the images
+            (`RenderOptions.referenced_images`). Setting to `None` keeps the ones
+            recorded by the previous build, for pages that `needs_build` found up to
+            date. Default: None
+        """
+        if images is None:
+            previous = self._previous_pages.get(str(src), {})
+            sizes = previous.get("images", {})
+        else:
+            sizes = {
+                url: None if size is None else list(size)
+                for url, size in images.items()
+            }
+        page: dict[str, object] = {"hash": src_hash, "output": str(dest)}
+        if sizes:
+            page["images"] = sizes
+        self.pages[str(src)] = page
+
+    def remove_page(self, src: Path, output_root: Path) -> Path | None:
+        """Remove a page from the build and delete its output
+
+        Parameters
+        ----------
+        src: pathlib.Path
+            Path to the source markdown file of the page
+        output_root: pathlib.Path
+            The output directory. It is never removed, even if it ends up empty.
+
+        Returns
+        -------
+        pathlib.Path | None
+            The output file that was deleted. None if the page was not part of the build
+        """
+        page = self.pages.pop(str(src), None)
+        if page is None:
+            return None
+        output = Path(page["output"])
+        output.unlink(missing_ok=True)
+        _remove_empty_parents(output.parent, output_root)
+        return output
+
+    def remove_orphans(self, output_root: Path) -> list[Path]:
+        """Delete outputs of pages that were not part of the current build
+
+        Only files that were recorded by a previous build are deleted. Directories below
+        `output_root` left empty by the deletion are removed as well.
+
+        Parameters
+        ----------
+        output_root: pathlib.Path
+            The output directory. It is never removed, even if it ends up empty.
+
+        Returns
+        -------
+        list[pathlib.Path]
+            The output files that were deleted
+        """
+        current_outputs = {page["output"] for page in self.pages.values()}
+        removed: list[Path] = []
+        for src, page in self._previous_pages.items():
+            if src in self.pages or page["output"] in current_outputs:
+                continue
+            output = Path(page["output"])
+            if output.exists():
+                output.unlink()
+                removed.append(output)
+                _remove_empty_parents(output.parent, output_root)
+        return removed
+
+    def save(self) -> None:
+        """Write the manifest of the current build to disk"""
+        data = {
+            "settings": self.settings,
+            "pages": self.pages,
+            "assets": self.assets,
+            "compressed": self.compressed,
+            "images": self.images,
+            "search": self.search_files,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        tmp_path.replace(self.path)
+
+
+def _remove_empty_parents(path: Path, root: Path) -> None:
+    """Remove `path` and its parents below `root` while they are empty directories"""
+    try:
+        while path != root and root in path.parents and not any(path.iterdir()):
+            path.rmdir()
+            path = path.parent
+    except OSError:
+        pass
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+"""
+Name of the file in the output directory that maps every stylesheet to its
+fingerprinted copy
+"""
+HASH_LENGTH = 8
+"""Number of hex digits of the content hash in the name of a fingerprinted file"""
+
+# Strings and comments, which are the only parts of a stylesheet where whitespace and
+# punctuation aren't interchangeable. Comments starting with "/*!" are kept (e.g.,
+# licenses).
+_CSS_TOKEN = re.compile(
+    r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*!.*?\*/)|/\*.*?\*/""", re.DOTALL
+)
+_CSS_WHITESPACE = re.compile(r"\s+")
+_CSS_PUNCTUATION = re.compile(r" ?([{};,>]) ?")
+_CSS_OPEN = re.compile(r"([(:]) ")
+_CSS_CLOSE = re.compile(r" \)")
+
+
+def _minify_css_code(code: str) -> str:
+    """Minify CSS that contains neither strings nor comments"""
+    code = _CSS_WHITESPACE.sub(" ", code)
+    code = _CSS_PUNCTUATION.sub(r"\1", code)
+    code = _CSS_CLOSE.sub(")", _CSS_OPEN.sub(r"\1", code))
+    return code.replace(";}", "}")
+
+
+def minify_css(source: str) -> str:
+    """Minify a stylesheet
+
+    Removes comments (except ones starting with "/*!") and whitespace around
+    punctuation, collapses other whitespace and drops the semicolon after the last
+    declaration of a block. Strings are kept as is. Whitespace before a colon is kept,
+    since it is significant in selectors (e.g., `a :hover`).
+
+    Parameters
+    ----------
+    source: str
+        The source of a stylesheet
+
+    Returns
+    -------
+    str
+        The minified stylesheet
+    """
+    chunks: list[str] = []
+    code: list[str] = []
+    pos = 0
+    for match in _CSS_TOKEN.finditer(source):
+        code.append(source[pos : match.start()])
+        pos = match.end()
+        if match[1] is not None:
+            chunks.append(_minify_css_code("".join(code)))
+            code.clear()
+            chunks.append(match[1])
+    code.append(source[pos:])
+    chunks.append(_minify_css_code("".join(code)))
+    return "".join(chunks).strip()
+
+
+def fingerprinted_name(rel_path: str, data: bytes) -> str:
+    """The path of a fingerprinted copy of a file (e.g., `index.3f9a1c2b.css`)
+
+    Parameters
+    ----------
+    rel_path: str
+        The path of the file, with forward slashes
+    data: bytes
+        The contents of the copy
+
+    Returns
+    -------
+    str
+        `rel_path` with the first `HASH_LENGTH` digits of the SHA-256 hex digest of
+        `data` inserted before its suffix
+    """
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    stem, dot, suffix = rel_path.rpartition(".")
+    if not dot or "/" in suffix:
+        return f"{rel_path}.{digest}"
+    return f"{stem}.{digest}.{suffix}"
+
+
+def load_asset_manifest(output_dir: Path | str) -> dict[str, str]:
+    """Read the asset manifest written by `build_css_assets`
+
+    Parameters
+    ----------
+    output_dir: pathlib.Path | str
+        The output directory
+
+    Returns
+    -------
+    dict[str, str]
+        The path of every stylesheet mapped to the path of its fingerprinted copy,
+        both relative to the output directory. Empty if there is no valid manifest
+    """
+    try:
+        data = json.loads((Path(output_dir) / ASSET_MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def build_css_assets(static_dir: Path | str, output_dir: Path | str) -> dict[str, str]:
+    """Write a minified, fingerprinted copy of every stylesheet in `static_dir`
+
+    The name of every copy contains the hash of its contents, so the copies can be
+    cached by browsers indefinitely: a changed stylesheet gets a new name. Copies that
+    already exist are not written again and copies from the previous build that are
+    no longer referenced by the asset manifest are deleted. The manifest is written to
+    `ASSET_MANIFEST_NAME` in `output_dir`.
+
+    Parameters
+    ----------
+    static_dir: pathlib.Path | str
+        The directory containing the stylesheets, recursively
+    output_dir: pathlib.Path | str
+        The output directory the copies are written to, at the same relative paths
+        as the stylesheets
+
+    Returns
+    -------
+    dict[str, str]
+        The path of every stylesheet mapped to the path of its fingerprinted copy,
+        both relative to the output directory and with forward slashes
+    """
+    static_dir, output_dir = Path(static_dir), Path(output_dir)
+    previous = load_asset_manifest(output_dir)
+
+    assets: dict[str, str] = {}
+    for dir_path, _, file_names in os.walk(static_dir):
+        for file_name in file_names:
+            if not file_name.endswith(".css"):
+                continue
+            path = Path(dir_path, file_name)
+            rel_path = path.relative_to(static_dir).as_posix()
+            data = minify_css(path.read_text()).encode()
+            fingerprinted = fingerprinted_name(rel_path, data)
+            dest = output_dir / fingerprinted
+            if not dest.exists():
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                _write_file(dest, data)
+            assets[rel_path] = fingerprinted
+
+    stale = set(previous.values()) - set(assets.values())
+    for rel_path in stale:
+        (output_dir / rel_path).unlink(missing_ok=True)
+    if assets != previous:
+        manifest = json.dumps(dict(sorted(assets.items())), indent=2) + "\n"
+        _write_file(output_dir / ASSET_MANIFEST_NAME, manifest.encode())
+    return assets
+
+
+def remove_css_assets(output_dir: Path | str) -> None:
+    """Delete the copies and the asset manifest written by `build_css_assets`
+
+    Parameters
+    ----------
+    output_dir: pathlib.Path | str
+        The output directory
+    """
+    output_dir = Path(output_dir)
+    for rel_path in load_asset_manifest(output_dir).values():
+        (output_dir / rel_path).unlink(missing_ok=True)
+    (output_dir / ASSET_MANIFEST_NAME).unlink(missing_ok=True)
@@ -0,0 +1,170 @@
+import threading
+from collections import OrderedDict
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+from page_helpers import render_page
+from template_engine import TemplateEngine
+
+
+class PageCache:
+    """LRU cache of rendered pages that are invalidated when their inputs change
+
+    A cached page is only returned if neither its markdown source nor any template has
+    been modified since it was rendered.
+
+    Parameters
+    ----------
+    engine: TemplateEngine
+        The template engine used to render pages
+    max_pages: int
+        Maximum number of rendered pages kept in memory. Default: 256
+    """
+
+    def __init__(self, engine: TemplateEngine, max_pages: int = 256) -> None:
+        self.engine: TemplateEngine = engine
+        self.max_pages: int = max_pages
+        self._pages: OrderedDict[Path, tuple[tuple[int, int], bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _templates_mtime(self) -> int:
+        return max(
+            (p.stat().st_mtime_ns for p in self.engine.template_dir.glob("*.html")),
+            default=0,
+        )
+
+    def get(self, md_path: Path) -> bytes:
+        """Get the rendered page for a markdown file, rendering it if needed
+
+        Parameters
+        ----------
+        md_path: pathlib.Path
+            Path to the markdown file
+
+        Returns
+        -------
+        bytes
+            The rendered page encoded as UTF-8
+        """
+        key = (md_path.stat().st_mtime_ns, self._templates_mtime())
+        with self._lock:
+            cached = self._pages.get(md_path)
+            if cached is not None and cached[0] == key:
+                self._pages.move_to_end(md_path)
+                return cached[1]
+
+        page = render_page(md_path.read_text(), self.engine).encode()
+        with self._lock:
+            self._pages[md_path] = (key, page)
+            self._pages.move_to_end(md_path)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    """Serves pages rendered on request from markdown and static files from disk
+
+    Request paths are mapped to markdown files the same way the build maps markdown
+    files to pages, i.e., `/blog/post/` and `/blog/post/index.html` are both rendered
+    from `blog/post/index.md` in the content directory, and `/blog/post` is redirected
+    to `/blog/post/`. Anything that isn't a page is served from the static directory.
+    """
+
+    def __init__(
+        self, *args, content_dir: Path, page_cache: PageCache, **kwargs
+    ) -> None:
+        self.content_dir: Path = content_dir
+        self.page_cache: PageCache = page_cache
+        super().__init__(*args, **kwargs)
+
+    def _find_markdown(self, url_path: str) -> Path | None:
+        if url_path.endswith("/"):
+            url_path += "index.html"
+        if not url_path.endswith(".html"):
+            return None
+        md_path = (self.content_dir / url_path.lstrip("/")).with_suffix(".md")
+        content_dir = self.content_dir.resolve()
+        resolved = md_path.resolve()
+        if content_dir not in resolved.parents or not resolved.is_file():
+            return None
+        return md_path
+
+    def _send_redirect(self, location: str) -> None:
+        self.send_response(301)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_page(self, head_only: bool) -> bool:
+        url = urlsplit(self.path)
+        url_path = unquote(url.path)
+        md_path = self._find_markdown(url_path)
+        if md_path is None:
+            if url_path.endswith("/") or self._find_markdown(url_path + "/") is None:
+                return False
+            # Like a directory of static files, so relative links resolve inside it
+            self._send_redirect(urlunsplit(url._replace(path=url.path + "/")))
+            return True
+        try:
+            page = self.page_cache.get(md_path)
+        except Exception as e:
+            self.send_error(500, f"could not render '{md_path}': {e}")
+            return True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(page)
+        return True
+
+    def do_GET(self) -> None:
+        if not self._send_page(head_only=False):
+            super().do_GET()
+
+    def do_HEAD(self) -> None:
+        if not self._send_page(head_only=True):
+            super().do_HEAD()
+
+
+def serve(
+    content_dir: Path | str,
+    static_dir: Path | str,
+    engine: TemplateEngine,
+    port: int = 8888,
+    host: str = "localhost",
+) -> None:
+    """Run the development server until interrupted
+
+    Nothing is written to disk. Pages are rendered on their first request and kept in a
+    `PageCache` afterwards.
+
+    Parameters
+    ----------
+    content_dir: pathlib.Path | str
+        Path to the directory containing the markdown files
+    static_dir: pathlib.Path | str
+        Path to the directory containing the static files
+    engine: TemplateEngine
+        The template engine used to render pages
+    port: int
+        Port to listen on. Default: 8888
+    host: str
+        Address to listen on. Default: "localhost"
+    """
+    handler = partial(
+        DevRequestHandler,
+        content_dir=Path(content_dir),
+        page_cache=PageCache(engine),
+        directory=str(static_dir),
+    )
+    with ThreadingHTTPServer((host, port), handler) as server:
+        print(f"Serving on http://{host}:{port}/ (Ctrl+C to stop)...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,374 @@
+import re
+from collections.abc import Callable
+
+VOID_ELEMENTS = frozenset(
+    {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "source",
+        "track",
+        "wbr",
+    }
+)
+"""Elements that have no contents and no end tag"""
+PREFORMATTED_ELEMENTS = frozenset({"pre", "code", "textarea", "script", "style"})
+"""Elements whose contents are written as is"""
+_RAW_TEXT_ELEMENTS = frozenset({"script", "style", "textarea"})
+BLOCK_ELEMENTS = frozenset(
+    {
+        "!doctype",
+        "address",
+        "article",
+        "aside",
+        "base",
+        "blockquote",
+        "body",
+        "dd",
+        "details",
+        "div",
+        "dl",
+        "dt",
+        "fieldset",
+        "figcaption",
+        "figure",
+        "footer",
+        "form",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "head",
+        "header",
+        "hr",
+        "html",
+        "li",
+        "link",
+        "main",
+        "meta",
+        "nav",
+        "noscript",
+        "ol",
+        "p",
+        "pre",
+        "script",
+        "section",
+        "style",
+        "summary",
+        "table",
+        "tbody",
+        "td",
+        "tfoot",
+        "th",
+        "thead",
+        "title",
+        "tr",
+        "ul",
+    }
+)
+"""Elements next to whose tags whitespace in a template is never rendered"""
+
+# The end tag of a paragraph may be omitted if it is directly followed by one of
+# these elements, or if the paragraph is the last thing in its parent and the parent
+# isn't one of _P_END_REQUIRED_PARENTS. The end tag of a list item may be omitted if
+# it is followed by another list item or by the end of its parent.
+_P_CLOSERS = frozenset(
+    {
+        "address",
+        "article",
+        "aside",
+        "blockquote",
+        "details",
+        "div",
+        "dl",
+        "fieldset",
+        "figcaption",
+        "figure",
+        "footer",
+        "form",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "header",
+        "hgroup",
+        "hr",
+        "main",
+        "menu",
+        "nav",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "table",
+        "ul",
+    }
+)
+_P_END_REQUIRED_PARENTS = frozenset(
+    {"a", "audio", "del", "ins", "map", "noscript", "video"}
+)
+
+_WHITESPACE = re.compile(r"[ \t\n\r\f]+")
+_UNQUOTED_VALUE = re.compile(r"[^ \t\n\r\f\"'=<>`]+")
+_TEMPLATE_TOKEN = re.compile(
+    r"\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\}|<!--.*?-->|<[^>]*>", re.DOTALL
+)
+# A slash ending a tag that isn't part of an unquoted attribute value
+_SELF_CLOSING = re.compile(r"(?:^|[ \t\n\r\f\"'])/$")
+_TAG_NAME = re.compile(r"<(/?)([A-Za-z!][^ \t\n\r\f/>]*)")
+_ATTRIBUTE = re.compile(
+    r"""[ \t\n\r\f]*([^ \t\n\r\f"'=<>/`]+)"""
+    r"""(?:[ \t\n\r\f]*=[ \t\n\r\f]*(?:"([^"]*)"|'([^']*)'|([^ \t\n\r\f>]+)))?"""
+)
+
+
+def collapse_whitespace(text: str) -> str:
+    """Replace every run of whitespace in text with a single space"""
+    return _WHITESPACE.sub(" ", text)
+
+
+def minify_attr(name: str, value: str) -> str:
+    """An attribute with the shortest equivalent syntax for its value
+
+    Empty values are left out (`alt=""` is equivalent to `alt`) and values that
+    can't be mistaken for the end of the attribute are not quoted.
+
+    Parameters
+    ----------
+    name: str
+        The name of the attribute
+    value: str
+        The value of the attribute
+
+    Returns
+    -------
+    str
+        The attribute, starting with a space
+    """
+    if not value:
+        return f" {name}"
+    if _UNQUOTED_VALUE.fullmatch(value):
+        return f" {name}={value}"
+    return f' {name}="{value}"'
+
+
+class HTMLMinifier:
+    """Writes minified HTML for a tree of elements as it is walked
+
+    Whitespace in text is collapsed, attributes are written by `minify_attr`, void
+    elements are written without an end tag and the end tags of paragraphs and list
+    items are left out where the HTML parser implies them. Because whether an end tag
+    can be left out depends on what follows it, the end tag of a paragraph or list item
+    is held back until the next start tag, text or end tag is written. The contents of
+    `PREFORMATTED_ELEMENTS` are written as is.
+
+    Parameters
+    ----------
+    write: Callable[[str], object]
+        Called with every piece of HTML (e.g., `list.append` or the `write` method of
+        a text stream)
+    """
+
+    def __init__(self, write: Callable[[str], object]) -> None:
+        self._write: Callable[[str], object] = write
+        self._open_tags: list[str] = []
+        self._preformatted: int = 0
+        self._pending_end: str | None = None
+
+    def _resolve_pending(
+        self, next_tag: str | None = None, parent_end: str | None = None
+    ) -> None:
+        """Write the held back end tag unless what follows it implies it
+
+        Parameters
+        ----------
+        next_tag: str | None
+            Tag of the start tag that follows. Default: None
+        parent_end: str | None
+            Tag of the end tag of the parent that follows. Default: None
+        """
+        tag = self._pending_end
+        if tag is None:
+            return
+        self._pending_end = None
+        if tag == "li":
+            implied = next_tag == "li" or parent_end is not None
+        else:
+            implied = next_tag in _P_CLOSERS or (
+                parent_end is not None and parent_end not in _P_END_REQUIRED_PARENTS
+            )
+        if not implied:
+            self._write(f"</{tag}>")
+
+    def start_tag(self, tag: str, props: dict[str, str] | None = None) -> None:
+        """Write the start tag of an element
+
+        The element stays open until `end_tag` is called, unless it is a void element.
+        """
+        self._resolve_pending(next_tag=tag)
+        if props:
+            attrs = "".join(minify_attr(name, value) for name, value in props.items())
+            self._write(f"<{tag}{attrs}>")
+        else:
+            self._write(f"<{tag}>")
+        if tag in VOID_ELEMENTS:
+            return
+        self._open_tags.append(tag)
+        if tag in PREFORMATTED_ELEMENTS:
+            self._preformatted += 1
+
+    def end_tag(self) -> None:
+        """Write the end tag of the innermost open element"""
+        tag = self._open_tags.pop()
+        self._resolve_pending(parent_end=tag)
+        if tag in PREFORMATTED_ELEMENTS:
+            self._preformatted -= 1
+        if tag == "p" or tag == "li":
+            self._pending_end = tag
+        else:
+            self._write(f"</{tag}>")
+
+    def text(self, text: str) -> None:
+        """Write text, collapsing its whitespace outside of preformatted elements"""
+        if not text:
+            return
+        self._resolve_pending()
+        self._write(text if self._preformatted else collapse_whitespace(text))
+
+    def leaf(self, tag: str | None, value: str, props: dict[str, str] | None) -> None:
+        """Write an element without children, or text if `tag` is None"""
+        if tag is None:
+            self.text(value)
+            return
+        self.start_tag(tag, props)
+        self.text(value)
+        # The parser ignores the end tag of a void element, so any value of one ends
+        # up after it anyway
+        if tag not in VOID_ELEMENTS:
+            self.end_tag()
+
+    def close(self) -> None:
+        """Write the end tag held back at the end of the document, if any"""
+        self._resolve_pending()
+
+
+def _minify_template_tag(tag: str) -> str:
+    """A start or end tag of a template with the shortest equivalent syntax"""
+    match = _TAG_NAME.match(tag)
+    if match is None or "{" in tag or match[2].lower() == "!doctype":
+        return tag
+    closing, name = match[1], match[2]
+    if closing:
+        return f"</{name}>"
+    attrs_source = tag[match.end() : -1].rstrip(" \t\n\r\f")
+    if _SELF_CLOSING.search(attrs_source):
+        if name.lower() not in VOID_ELEMENTS:
+            # A self-closing slash is only ignored on void elements
+            return tag
+        attrs_source = attrs_source[:-1].rstrip(" \t\n\r\f")
+    attrs: list[str] = []
+    pos = 0
+    while pos < len(attrs_source):
+        attr = _ATTRIBUTE.match(attrs_source, pos)
+        if attr is None or attr.end() == pos:
+            # Not an attribute that can be parsed safely
+            return tag
+        value = attr[2] if attr[2] is not None else attr[3]
+        if value is None:
+            value = attr[4] or ""
+        attrs.append(minify_attr(attr[1], value))
+        pos = attr.end()
+    return f"<{name}{''.join(attrs)}>"
+
+
+def _block_tag(piece: str) -> bool:
+    match = _TAG_NAME.match(piece)
+    return match is not None and match[2].lower() in BLOCK_ELEMENTS
+
+
+def minify_template(source: str) -> str:
+    """Minify the HTML of a Jinja template
+
+    Whitespace next to the tags of `BLOCK_ELEMENTS` and at the start and end of the
+    template is removed, other runs of whitespace are collapsed into a single space,
+    comments are removed and tags are rewritten by `minify_attr`. Jinja expressions,
+    statements and tags containing them are kept as is, as is everything inside
+    `PREFORMATTED_ELEMENTS`. End tags are never left out, since the contents of a
+    template aren't known until it is rendered.
+
+    Parameters
+    ----------
+    source: str
+        The source of a template
+
+    Returns
+    -------
+    str
+        The minified source
+    """
+    # Split the source into text to minify, tokens (tags and Jinja syntax) and
+    # preformatted parts to keep as is
+    pieces: list[tuple[str, str]] = []
+    text: list[str] = []
+    preformatted: list[str] = []
+
+    def end_text() -> None:
+        if text:
+            pieces.append(("raw" if preformatted else "text", "".join(text)))
+            text.clear()
+
+    pos = 0
+    while pos < len(source):
+        match = _TEMPLATE_TOKEN.search(source, pos)
+        if match is None:
+            text.append(source[pos:])
+            break
+        text.append(source[pos : match.start()])
+        pos = match.end()
+        token = match[0]
+        if token.startswith("<!--") and not preformatted:
+            continue
+        end_text()
+        tag = _TAG_NAME.match(token)
+        name = "" if tag is None else tag[2].lower()
+        if tag is not None and tag[1] and preformatted and preformatted[-1] == name:
+            preformatted.pop()
+        pieces.append(("raw" if preformatted else "tag", token))
+        if tag is None or tag[1] or name not in PREFORMATTED_ELEMENTS:
+            continue
+        preformatted.append(name)
+        if name in _RAW_TEXT_ELEMENTS:
+            # Their contents aren't HTML, so they end at the first matching end tag
+            end = re.compile(f"</{name}", re.IGNORECASE).search(source, pos)
+            end_pos = len(source) if end is None else end.start()
+            text.append(source[pos:end_pos])
+            pos = end_pos
+    end_text()
+
+    chunks: list[str] = []
+    for i, (kind, piece) in enumerate(pieces):
+        if kind == "raw":
+            chunks.append(piece)
+        elif kind == "tag":
+            chunks.append(_minify_template_tag(piece))
+        else:
+            piece = collapse_whitespace(piece)
+            if piece.startswith(" ") and (i == 0 or _block_tag(pieces[i - 1][1])):
+                piece = piece[1:]
+            if piece.endswith(" ") and (
+                i + 1 == len(pieces) or _block_tag(pieces[i + 1][1])
+            ):
+                piece = piece[:-1]
+            chunks.append(piece)
+    return "".join(chunks)
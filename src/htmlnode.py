@@ -1,4 +1,8 @@
-from collections.abc import Sequence
+import sys
+from collections.abc import Callable, Iterator, Sequence
+from typing import TextIO
+
+from html_minify import HTMLMinifier
 
 
 class HTMLNode:
@@ -26,9 +30,12 @@ class HTMLNode:
         A dictionary of key-value pairs representing the attributes of the HTML tag. For
         example, a link (`<a>` tag) might have `{"href": "https://www.google.com"}`.
         Setting to `None` will simply cause the `HTMLNode` object to have no attributes.
-        Default: `None`
+        An empty dictionary is stored as `None`. Default: `None`
     """
 
+    # Documents are converted into many small nodes, so nodes don't carry a __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -36,37 +43,164 @@ class HTMLNode:
         children: Sequence["HTMLNode"] | None = None,
         props: dict[str, str] | None = None,
     ) -> None:
-        self.tag: str | None = tag
+        self.tag: str | None = None if tag is None else sys.intern(tag)
         self.value: str | None = value
         self.children: Sequence["HTMLNode"] | None = children
-        self.props: dict[str, str] | None = props
+        self.props: dict[str, str] | None = props or None
 
     def __repr__(self) -> str:
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
-    def to_html(self) -> str:
+    def to_html(self, minify: bool = False) -> str:
         """Convert the `HTMLNode` into valid HTML
 
+        Parameters
+        ----------
+        minify: bool
+            Whether to write minified HTML with `HTMLMinifier`. Default: False
+
         Returns
         -------
         str
             A string containing valid HTML tags for the current node and its children
         """
+        chunks: list[str] = []
+        if minify:
+            minifier = HTMLMinifier(chunks.append)
+            self.write_minified(minifier)
+            minifier.close()
+        else:
+            self._serialize(chunks.append)
+        return "".join(chunks)
+
+    def write_html(self, fp: TextIO, minify: bool = False) -> None:
+        """Write the `HTMLNode` as valid HTML to a text stream
+
+        Produces the same HTML as `to_html` without building the whole string in memory.
+        The tree is walked with an explicit stack, so arbitrarily deep trees don't hit
+        the recursion limit. If a node in the tree is invalid, the HTML of the nodes
+        preceding it has already been written when the `ValueError` is raised.
+
+        Parameters
+        ----------
+        fp: TextIO
+            Any writable text stream (e.g., an open file or an `io.StringIO`)
+        minify: bool
+            Whether to write minified HTML with `HTMLMinifier`. Default: False
+        """
+        if minify:
+            minifier = HTMLMinifier(fp.write)
+            self.write_minified(minifier)
+            minifier.close()
+        else:
+            self._serialize(fp.write)
+
+    def write_minified(self, minifier: HTMLMinifier) -> None:
+        """Pass the `HTMLNode` to an `HTMLMinifier` element by element
+
+        Unlike `write_html`, the minifier can be shared by several trees (e.g., the
+        blocks of a document written one at a time), so end tags that are implied by
+        the start of the next tree are left out as well. The tree is walked like in
+        `write_html`.
+
+        Parameters
+        ----------
+        minifier: HTMLMinifier
+            The minifier writing the HTML. `HTMLMinifier.close` has to be called once
+            everything has been written
+        """
         if self.children is None:
-            if self.value is None:
-                raise ValueError("'value' attribute has no value")
+            minifier.leaf(*self._leaf_parts())
+            return
+        minifier.start_tag(*self._start_parts())
+        stack: list[Iterator[HTMLNode]] = [iter(self.children)]
+        while stack:
+            for node in stack[-1]:
+                if node.children is None:
+                    minifier.leaf(*node._leaf_parts())
+                else:
+                    minifier.start_tag(*node._start_parts())
+                    stack.append(iter(node.children))
+                    break
             else:
-                if self.tag is None:
-                    return self.value
+                stack.pop()
+                minifier.end_tag()
+
+    def _serialize(self, write: Callable[[str], object]) -> None:
+        if self.children is None:
+            write(self._leaf_html())
+            return
+        write(self._start_tag())
+        # Each entry holds the children of an open element that are still to be
+        # written, followed by the closing tag of that element
+        stack: list[tuple[Iterator[HTMLNode], str]] = [
+            (iter(self.children), f"</{self.tag}>")
+        ]
+        while stack:
+            nodes, end_tag = stack[-1]
+            for node in nodes:
+                if node.children is None:
+                    write(node._leaf_html())
                 else:
-                    return (
-                        f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
-                    )
-        else:
-            html_string = ""
-            for child in self.children:
-                html_string += child.to_html()
-            return f"<{self.tag}{self.props_to_html()}>{html_string}</{self.tag}>"
+                    write(node._start_tag())
+                    stack.append((iter(node.children), f"</{node.tag}>"))
+                    break
+            else:
+                stack.pop()
+                write(end_tag)
+
+    def _leaf_html(self) -> str:
+        """HTML of a node without children"""
+        if self.value is None:
+            raise ValueError("'value' attribute has no value")
+        if self.tag is None:
+            return self.value
+        if not self.props:
+            return f"<{self.tag}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+
+    def _start_tag(self) -> str:
+        """Start tag of a node with children"""
+        return f"<{self.tag}{self.props_to_html()}>"
+
+    def _leaf_parts(self) -> tuple[str | None, str, dict[str, str] | None]:
+        """Tag, value and props of a node without children, checked like `_leaf_html`"""
+        if self.value is None:
+            raise ValueError("'value' attribute has no value")
+        return self.tag, self.value, self.props
+
+    def _start_parts(self) -> tuple[str, dict[str, str] | None]:
+        """Tag and props of the start tag of a node with children"""
+        return self.tag, self.props  # type: ignore[return-value]
+
+    def clone(self) -> "HTMLNode":
+        """Copy the node and all of its descendants
+
+        Props are copied as well, so nothing in the copy can be modified through the
+        original or the other way around. Like `to_html`, the tree is walked without
+        recursion.
+
+        Returns
+        -------
+        HTMLNode
+            A node of the same class equal to this one
+        """
+        root = self._shallow_clone()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.children is not None:
+                node.children = [child._shallow_clone() for child in node.children]
+                stack.extend(node.children)
+        return root
+
+    def _shallow_clone(self) -> "HTMLNode":
+        clone = object.__new__(type(self))
+        clone.tag = self.tag
+        clone.value = self.value
+        clone.children = self.children
+        clone.props = None if self.props is None else dict(self.props)
+        return clone
 
     def props_to_html(self) -> str:
         """Convert the attributes contained in `props` into an HTML tag attribute string
@@ -80,8 +214,8 @@ class HTMLNode:
             The tag attributes as a string of "attribute=value" pairs separated by
             spaces.
         """
-        prop_str = ""
-        if self.props is not None:
-            for html_attr, value in self.props.items():
-                prop_str += f' {html_attr}="{value}"'
-        return prop_str
+        if not self.props:
+            return ""
+        return "".join(
+            f' {html_attr}="{value}"' for html_attr, value in self.props.items()
+        )
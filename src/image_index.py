@@ -0,0 +1,169 @@
+import json
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+from build_manifest import hash_file
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+"""Suffixes of the files whose dimensions are indexed by `build_image_index`"""
+
+# JPEG start of frame markers, which hold the dimensions of the image. 0xC4, 0xC8 and
+# 0xCC are other markers in the same range.
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# JPEG markers that aren't followed by a length
+_JPEG_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD9)})
+
+
+def _jpeg_size(f: BinaryIO) -> tuple[int, int] | None:
+    """Find the dimensions in the segments of a JPEG file positioned after its SOI"""
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        if marker[0] in _JPEG_STANDALONE_MARKERS or marker[0] == 0:
+            continue
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+        if marker[0] in _JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _webp_size(header: bytes) -> tuple[int, int] | None:
+    chunk_type = header[12:16]
+    if chunk_type == b"VP8 " and len(header) >= 30:
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk_type == b"VP8L" and len(header) >= 25:
+        (bits,) = struct.unpack("<I", header[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk_type == b"VP8X" and len(header) >= 30:
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def read_image_size(path: Path | str) -> tuple[int, int] | None:
+    """Read the dimensions of a PNG, JPEG, GIF or WebP image from its header
+
+    Only the first bytes of the file are read (for a JPEG, the segments up to the
+    start of the frame), the image itself is never decoded.
+
+    Parameters
+    ----------
+    path: pathlib.Path | str
+        Path to the image
+
+    Returns
+    -------
+    tuple[int, int] | None
+        The width and height of the image in pixels. None if the file is not an image
+        in one of the supported formats
+    """
+    with open(path, "rb") as f:
+        header = f.read(32)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a") and len(header) >= 10:
+            return struct.unpack("<HH", header[6:10])
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return _webp_size(header)
+        if header[:2] == b"\xff\xd8":
+            f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+
+def _load_cache(cache_path: Path) -> dict[str, dict]:
+    try:
+        data = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def build_image_index(
+    static_dir: Path | str, cache_path: Path | str | None = None
+) -> dict[str, tuple[int, int]]:
+    """Find the dimensions of every image in a directory
+
+    Entries are cached in `cache_path` by the hash of the contents of every image. An
+    image whose size and modification time haven't changed since the previous build
+    isn't even hashed, and an image that was renamed or touched is only hashed, not
+    read again.
+
+    Parameters
+    ----------
+    static_dir: pathlib.Path | str
+        The directory containing the images, recursively. Only files with a suffix in
+        `IMAGE_SUFFIXES` are indexed
+    cache_path: pathlib.Path | str | None
+        Path to the JSON file the index is cached in between builds. Setting to `None`
+        disables the cache. Default: None
+
+    Returns
+    -------
+    dict[str, tuple[int, int]]
+        The path of every image relative to `static_dir`, with forward slashes, mapped
+        to its width and height. Files that are not valid images are left out
+    """
+    static_dir = Path(static_dir)
+    previous = {} if cache_path is None else _load_cache(Path(cache_path))
+    by_hash = {entry["hash"]: entry for entry in previous.values()}
+
+    entries: dict[str, dict] = {}
+    for dir_path, _, file_names in os.walk(static_dir):
+        for file_name in file_names:
+            if not file_name.lower().endswith(IMAGE_SUFFIXES):
+                continue
+            path = Path(dir_path, file_name)
+            rel_path = path.relative_to(static_dir).as_posix()
+            stat = path.stat()
+            entry = previous.get(rel_path)
+            if entry is None or (entry["size"], entry["mtime_ns"]) != (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                file_hash = hash_file(path)
+                cached = by_hash.get(file_hash)
+                if cached is not None:
+                    dimensions = cached["dimensions"]
+                else:
+                    size = read_image_size(path)
+                    dimensions = None if size is None else list(size)
+                entry = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "hash": file_hash,
+                    "dimensions": dimensions,
+                }
+            entries[rel_path] = entry
+
+    if cache_path is not None and entries != previous:
+        cache_path = Path(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(entries, indent=2, sort_keys=True))
+        tmp_path.replace(cache_path)
+
+    return {
+        rel_path: (entry["dimensions"][0], entry["dimensions"][1])
+        for rel_path, entry in sorted(entries.items())
+        if entry["dimensions"] is not None
+    }
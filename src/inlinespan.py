@@ -0,0 +1,53 @@
+from typing import NamedTuple
+
+from textnode import TextType
+
+
+class InlineSpan(NamedTuple):
+    """A piece of inline markdown, located by offsets into the text it was parsed from
+
+    Unlike a `TextNode`, a span doesn't hold any text of its own. Its text (and URL) is
+    only sliced out of the source when it is converted, so parsing a line doesn't
+    create a substring for every piece of it.
+
+    Parameters
+    ----------
+    text_type: TextType
+        The type of the span
+    start: int
+        Offset of the first character of the text of the span (e.g., the first
+        character after an opening delimiter, or of the text of a link)
+    end: int
+        Offset just past the last character of the text of the span
+    url_start: int
+        Offset of the first character of the URL of a link or image. Default: -1
+    url_end: int
+        Offset just past the last character of the URL of a link or image. Default: -1
+    children: tuple[InlineSpan, ...] | None
+        The nested spans making up the contents of a bold or italic span whose contents
+        are not one contiguous piece of plain text. `start` and `end` then span the
+        contents including any markdown inside them. Default: None
+    """
+
+    text_type: TextType
+    start: int
+    end: int
+    url_start: int = -1
+    url_end: int = -1
+    children: tuple["InlineSpan", ...] | None = None
+
+    def text(self, source: str) -> str:
+        """The text of the span, which must have been parsed from `source`
+
+        The text of a span with `children` is the concatenated text of its children,
+        like the text of the equivalent `TextNode`.
+        """
+        if self.children is None:
+            return source[self.start : self.end]
+        return "".join(child.text(source) for child in self.children)
+
+    def url(self, source: str) -> str | None:
+        """The URL of a link or image span parsed from `source`, None for other spans"""
+        if self.url_start < 0:
+            return None
+        return source[self.url_start : self.url_end]
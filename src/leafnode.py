@@ -24,27 +24,9 @@ class LeafNode(HTMLNode):
         Default: None
     """
 
+    __slots__ = ()
+
     def __init__(
         self, tag: str | None, value: str | None, props: dict[str, str] | None = None
     ):
         super().__init__(tag=tag, value=value, props=props)
-
-    def to_html(self) -> str:
-        """Convert the `LeafNode` into valid HTML
-
-        Returns `value` as a raw string if `tag` is None. Otherwise, returns 'tag',
-        'value' and 'props' as a valid HTML string. Will raise a `ValueError` if `value`
-        is not provided.
-
-        Returns
-        -------
-        str
-            `value` as a raw string if `tag` is not provided. Otherwise an HTML string
-            representation of the `LeafNode`
-        """
-        if self.value is None:
-            raise ValueError("'value' attribute has no value")
-        if self.tag is None:
-            return self.value
-        else:
-            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
@@ -1,26 +1,631 @@
+from argparse import ArgumentParser, Namespace
+from dataclasses import replace
 from pathlib import Path
-from sys import argv
 
-from page_helpers import copy_tree, generate_pages_recursive
+from build_manifest import BuildManifest, hash_file
+from css_assets import build_css_assets, remove_css_assets
+from dev_server import serve
+from image_index import IMAGE_SUFFIXES, build_image_index
+from page_helpers import (
+    STREAM_THRESHOLD,
+    CopyMode,
+    copy_tree,
+    generate_page,
+    generate_pages_recursive,
+    page_destination,
+    page_images,
+    sync_file,
+    sync_tree,
+)
+from parse_cache import DEFAULT_MAX_BLOCKS, DEFAULT_MAX_LINES, CacheStats, ParseCache
+from png_optimizer import is_png, optimize_images
+from precompress import (
+    ENCODINGS,
+    PRECOMPRESS_MIN_SIZE,
+    precompress_tree,
+    remove_precompressed,
+)
+from profiling import BuildProfile
+from render_cache import DEFAULT_MAX_BYTES, RenderCache
+from render_options import RenderOptions
+from search_index import (
+    SEARCH_DIR_NAME,
+    PageTerms,
+    SearchIndex,
+    remove_search_index,
+)
+from template_engine import TemplateEngine
+from watcher import create_watcher
+
+STATIC_DIR = Path("static")
+CONTENT_DIR = Path("content")
+TEMPLATE_PATH = Path("template.html")
+OUTPUT_DIR = Path("docs")
+CACHE_DIR = Path(".cache")
+RENDER_CACHE_PATH = CACHE_DIR / "render-cache.sqlite"
+IMAGE_CACHE_DIR = CACHE_DIR / "images"
+IMAGE_INDEX_PATH = CACHE_DIR / "image-index.json"
+SEARCH_CACHE_PATH = CACHE_DIR / "search-terms.json"
+MANIFEST_PATH = OUTPUT_DIR.parent / f".{OUTPUT_DIR.name}-manifest.json"
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(description="Generate a static site from markdown files")
+    parser.add_argument(
+        "basepath",
+        nargs="?",
+        default="",
+        help="path the site is served from, relative to the domain root",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="regenerate every page, even if its inputs are unchanged",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="empty the output directory before building (implies --force)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to generate pages (default: 1)",
+    )
+    parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        default=STREAM_THRESHOLD,
+        metavar="BYTES",
+        help="render markdown files larger than BYTES block by block without loading "
+        f"them into memory (default: {STREAM_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=DEFAULT_MAX_BLOCKS,
+        metavar="N",
+        help="number of converted markdown blocks kept for reuse by each process, "
+        f"0 to disable (default: {DEFAULT_MAX_BLOCKS})",
+    )
+    parser.add_argument(
+        "--line-cache-size",
+        type=int,
+        default=DEFAULT_MAX_LINES,
+        metavar="N",
+        help="number of parsed lines of inline markdown kept for reuse by each "
+        f"process, 0 to disable (default: {DEFAULT_MAX_LINES})",
+    )
+    parser.add_argument(
+        "--render-cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        metavar="BYTES",
+        help="size limit of the persistent cache of converted pages shared across "
+        f"builds, 0 to disable (default: {DEFAULT_MAX_BYTES})",
+    )
+    parser.add_argument(
+        "--export-cache",
+        type=Path,
+        metavar="PATH",
+        help="write the render cache to a single file and exit",
+    )
+    parser.add_argument(
+        "--import-cache",
+        type=Path,
+        metavar="PATH",
+        help="add the pages of an exported render cache to the render cache and exit",
+    )
+    parser.add_argument(
+        "--asset-mode",
+        choices=[mode.value for mode in CopyMode],
+        default=CopyMode.COPY.value,
+        help="how static assets are put into the output directory: copied, hard "
+        "linked or cloned on file systems that support it (default: copy)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="write pages as minified HTML",
+    )
+    parser.add_argument(
+        "--fingerprint-css",
+        action="store_true",
+        help="write minified copies of the stylesheets named after the hash of their "
+        "contents and refer to them instead",
+    )
+    parser.add_argument(
+        "--image-attributes",
+        action="store_true",
+        help="give images in pages their dimensions, read from the files in the "
+        "static directory, and let browsers load them lazily",
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="losslessly recompress the PNG images in the static directory instead of "
+        "copying them as is",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="write an inverted index of the words of every page for client-side "
+        f"search, sharded by word prefix, to '{SEARCH_DIR_NAME}' in the output "
+        "directory",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="write compressed siblings (" + ", ".join(ENCODINGS) + ") of the HTML "
+        "and CSS files in the output directory",
+    )
+    parser.add_argument(
+        "--precompress-min-size",
+        type=int,
+        default=PRECOMPRESS_MIN_SIZE,
+        metavar="BYTES",
+        help="size below which files are not precompressed "
+        f"(default: {PRECOMPRESS_MIN_SIZE})",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild whatever is affected when a source changes",
+    )
+    parser.add_argument(
+        "--serve",
+        nargs="?",
+        type=int,
+        const=8888,
+        metavar="PORT",
+        help="serve the site, rendering pages on request instead of building it "
+        "(default port: 8888)",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build-profile.json",
+        metavar="PATH",
+        help="time each phase of every generated page and write the results as JSON "
+        "(default path: build-profile.json)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of slowest pages listed after a profiled build (default: 10)",
+    )
+    return parser.parse_args()
+
+
+def build(
+    basepath: str,
+    engine: TemplateEngine,
+    jobs: int = 1,
+    clean: bool = False,
+    force: bool = False,
+    profile: BuildProfile | None = None,
+    stream_threshold: int | None = STREAM_THRESHOLD,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    asset_mode: CopyMode = CopyMode.COPY,
+    precompress_min_size: int | None = None,
+    fingerprint_css: bool = False,
+    optimize: bool = False,
+    image_attributes: bool = False,
+    search: SearchIndex | None = None,
+) -> BuildManifest:
+    """Build the whole site, skipping pages and assets that are up to date
+
+    If `precompress_min_size` is not None, compressed siblings are written for the
+    HTML and CSS files of at least that many bytes. If `fingerprint_css` is True, the
+    options of `engine` are updated to refer to the fingerprinted stylesheets. If
+    `optimize` is True, PNG images are optimized instead of being synced as is. If
+    `image_attributes` is True, the options of `engine` are updated with the
+    dimensions of the images. If `search` is provided, the terms of the pages are
+    recorded in it and the search index is written to the output directory.
+    """
+    if not OUTPUT_DIR.exists():
+        OUTPUT_DIR.mkdir()
+
+    # Copy contents of static to the output directory
+    if clean:
+        copy_tree(STATIC_DIR, OUTPUT_DIR, mode=asset_mode)
+    asset_urls = _fingerprint_css(fingerprint_css)
+    image_sizes = _index_images(image_attributes)
+    options = replace(
+        engine.options,
+        asset_urls=tuple(asset_urls.items()),
+        image_sizes=tuple((url, *size) for url, size in image_sizes.items()),
+    )
+    if options != engine.options or options.image_sizes != engine.options.image_sizes:
+        engine.set_options(options)
+
+    manifest = BuildManifest(
+        MANIFEST_PATH,
+        engine.fingerprint(),
+        basepath,
+        engine.options.minify,
+        asset_urls,
+        image_sizes,
+    )
+    if force:
+        manifest.invalidate_pages()
+
+    exclude = is_png if optimize else None
+    previous_assets = manifest.previous_assets
+    if optimize:
+        # PNGs synced as is by the previous build are handed to the optimizer instead
+        # of being deleted as orphans, so the ones it would leave as is stay in place
+        handed_over = {asset: "" for asset in previous_assets if is_png(Path(asset))}
+        manifest.previous_images = handed_over | manifest.previous_images
+        previous_assets = [a for a in previous_assets if a not in handed_over]
+    else:
+        # The optimized images are taken over by the sync
+        previous_assets = [*previous_assets, *manifest.previous_images]
+    report = sync_tree(
+        STATIC_DIR, OUTPUT_DIR, previous_assets, asset_mode, exclude=exclude
+    )
+    manifest.assets = [str(f) for f in report.files]
+    print(f"Synced '{STATIC_DIR}' to '{OUTPUT_DIR}': {report}")
+    if clean:
+        # The images have been replaced by their sources
+        manifest.previous_images = {}
+    _optimize_images(manifest, jobs, optimize)
+
+    # Generate pages in "content" using template, skipping unchanged pages
+    if cache is not None:
+        cache.reset_stats()
+    if render_cache is not None:
+        render_cache.stats = CacheStats()
+    generate_pages_recursive(
+        CONTENT_DIR,
+        TEMPLATE_PATH,
+        OUTPUT_DIR,
+        basepath,
+        manifest,
+        jobs,
+        engine,
+        profile,
+        stream_threshold,
+        cache,
+        render_cache,
+        search,
+    )
+    if cache is not None:
+        print(f"Parse cache: {cache}")
+    if render_cache is not None:
+        render_cache.flush()
+        print(f"Render cache: {render_cache.stats}")
+    manifest.remove_orphans(OUTPUT_DIR)
+    _write_search_index(manifest, search)
+    _precompress(manifest, jobs, precompress_min_size)
+    manifest.save()
+    return manifest
+
+
+def _fingerprint_css(enabled: bool) -> dict[str, str]:
+    """Bring the fingerprinted stylesheets up to date
+
+    Returns
+    -------
+    dict[str, str]
+        The root-relative URL of every stylesheet mapped to the URL of its
+        fingerprinted copy
+    """
+    asset_urls: dict[str, str] = {}
+    if enabled:
+        assets = build_css_assets(STATIC_DIR, OUTPUT_DIR)
+        asset_urls = {"/" + src: "/" + dest for src, dest in sorted(assets.items())}
+        print(f"Fingerprinted {len(assets)} stylesheet(s) in '{OUTPUT_DIR}'")
+    else:
+        remove_css_assets(OUTPUT_DIR)
+    return asset_urls
+
+
+def _index_images(enabled: bool) -> dict[str, tuple[int, int]]:
+    """Find the dimensions of the images in the static directory
+
+    Returns
+    -------
+    dict[str, tuple[int, int]]
+        The root-relative URL of every image mapped to its width and height. Empty if
+        not `enabled`
+    """
+    if not enabled:
+        return {}
+    sizes = build_image_index(STATIC_DIR, IMAGE_INDEX_PATH)
+    print(f"Indexed the dimensions of {len(sizes)} image(s) in '{STATIC_DIR}'")
+    return {"/" + rel_path: size for rel_path, size in sizes.items()}
+
+
+def _needs_build(
+    path: Path, templates: list[Path], fingerprint_css: bool, image_attributes: bool
+) -> bool:
+    """Whether a change to `path` is handled by `build` rather than on its own
+
+    Changing a template (or a fingerprinted stylesheet) regenerates every page.
+    Changing an image whose size pages are given regenerates the pages that refer to
+    it, which the manifest tells apart from the others.
+    """
+    if path in templates:
+        return True
+    if STATIC_DIR not in path.parents:
+        return False
+    name = path.name.lower()
+    return (fingerprint_css and name.endswith(".css")) or (
+        image_attributes and name.endswith(IMAGE_SUFFIXES)
+    )
+
+
+def _write_search_index(manifest: BuildManifest, search: SearchIndex | None) -> None:
+    """Bring the search index in the output directory up to date"""
+    previous = manifest.search_files or manifest.previous_search_files
+    if search is None:
+        # Only delete what a previous build wrote, never files put there by hand
+        remove_search_index(OUTPUT_DIR, previous)
+        manifest.search_files = []
+        return
+    search.save()
+    report = search.write(OUTPUT_DIR, previous)
+    manifest.search_files = report.files
+    print(
+        f"Indexed {len(search)} page(s) in '{OUTPUT_DIR / SEARCH_DIR_NAME}': {report}"
+    )
+
+
+def _optimize_images(manifest: BuildManifest, jobs: int, enabled: bool) -> None:
+    """Bring the optimized images in the output directory up to date"""
+    if not enabled:
+        # The images have been synced as is
+        manifest.images = {}
+        return
+    previous = manifest.images or manifest.previous_images
+    report = optimize_images(STATIC_DIR, OUTPUT_DIR, IMAGE_CACHE_DIR, previous, jobs)
+    manifest.images = report.hashes
+    print(f"Optimized images in '{OUTPUT_DIR}': {report}")
+
+
+def _precompress(
+    manifest: BuildManifest, jobs: int, precompress_min_size: int | None
+) -> None:
+    """Bring the precompressed siblings in the output directory up to date"""
+    previous = manifest.compressed or manifest.previous_compressed
+    if precompress_min_size is None:
+        # Don't leave siblings of a previous build behind that would go stale
+        remove_precompressed(OUTPUT_DIR, previous)
+        manifest.compressed = {}
+        return
+    report = precompress_tree(OUTPUT_DIR, previous, jobs, precompress_min_size)
+    manifest.compressed = report.hashes
+    print(f"Precompressed '{OUTPUT_DIR}': {report}")
+
+
+def _rebuild_page(
+    path: Path,
+    basepath: str,
+    engine: TemplateEngine,
+    manifest: BuildManifest,
+    stream_threshold: int | None,
+    cache: ParseCache | None,
+    render_cache: RenderCache | None,
+    search: SearchIndex | None,
+) -> None:
+    if path.is_file():
+        dest_path = page_destination(path, CONTENT_DIR, OUTPUT_DIR)
+        src_hash = hash_file(path)
+        terms = None
+        if search is not None and search.needs_terms(path, src_hash):
+            terms = PageTerms()
+        generate_page(
+            path,
+            TEMPLATE_PATH,
+            dest_path,
+            basepath,
+            engine,
+            stream_threshold=stream_threshold,
+            cache=cache,
+            render_cache=render_cache,
+            terms=terms,
+        )
+        manifest.record(path, dest_path, src_hash, page_images(path, engine.options))
+        if search is not None:
+            url = "/" + dest_path.relative_to(OUTPUT_DIR).as_posix()
+            search.record(path, src_hash, engine.options.rewrite_url(url), terms)
+        return
+    # The file or a whole directory was removed
+    for src in list(manifest.pages):
+        src_path = Path(src)
+        if src_path == path or path in src_path.parents:
+            output = manifest.remove_page(src_path, OUTPUT_DIR)
+            print(f"Removed '{output}'")
+            if search is not None:
+                search.remove(src_path)
+
+
+def _resync_asset(
+    path: Path, manifest: BuildManifest, asset_mode: CopyMode, optimize: bool
+) -> None:
+    rel_path = path.relative_to(STATIC_DIR)
+    if optimize and is_png(rel_path):
+        # Left to `_optimize_images`
+        return
+    if path.is_file():
+        if sync_file(path, OUTPUT_DIR / rel_path, asset_mode):
+            print(f"Copied '{path}' to '{OUTPUT_DIR / rel_path}'")
+        if str(rel_path) not in manifest.assets:
+            manifest.assets.append(str(rel_path))
+        return
+    # The file or a whole directory was removed
+    for asset in list(manifest.assets):
+        asset_path = Path(asset)
+        if asset_path == rel_path or rel_path in asset_path.parents:
+            (OUTPUT_DIR / asset_path).unlink(missing_ok=True)
+            manifest.assets.remove(asset)
+            print(f"Removed '{OUTPUT_DIR / asset_path}'")
+
+
+def watch(
+    basepath: str,
+    engine: TemplateEngine,
+    manifest: BuildManifest,
+    jobs: int = 1,
+    stream_threshold: int | None = STREAM_THRESHOLD,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    asset_mode: CopyMode = CopyMode.COPY,
+    precompress_min_size: int | None = None,
+    fingerprint_css: bool = False,
+    optimize: bool = False,
+    image_attributes: bool = False,
+    search: SearchIndex | None = None,
+) -> None:
+    """Rebuild the parts of the site affected by changes until interrupted
+
+    An edited markdown file regenerates only its own page and an edited asset is copied
+    on its own. Changing a template (or a stylesheet, if `fingerprint_css` is True)
+    regenerates every page. Changing an image, if `image_attributes` is True, only
+    regenerates the pages that refer to it.
+    """
+    templates = sorted(engine.template_dir.glob("*.html"))
+    watcher = create_watcher([CONTENT_DIR, STATIC_DIR], templates)
+    print(f"Watching for changes using {type(watcher).__name__} (Ctrl+C to stop)...")
+    try:
+        while True:
+            changed = sorted(watcher.wait())
+            try:
+                if any(
+                    _needs_build(path, templates, fingerprint_css, image_attributes)
+                    for path in changed
+                ):
+                    manifest = build(
+                        basepath,
+                        engine,
+                        jobs,
+                        stream_threshold=stream_threshold,
+                        cache=cache,
+                        render_cache=render_cache,
+                        asset_mode=asset_mode,
+                        precompress_min_size=precompress_min_size,
+                        fingerprint_css=fingerprint_css,
+                        optimize=optimize,
+                        image_attributes=image_attributes,
+                        search=search,
+                    )
+                    continue
+                for path in changed:
+                    if CONTENT_DIR in path.parents:
+                        _rebuild_page(
+                            path,
+                            basepath,
+                            engine,
+                            manifest,
+                            stream_threshold,
+                            cache,
+                            render_cache,
+                            search,
+                        )
+                    elif STATIC_DIR in path.parents:
+                        _resync_asset(path, manifest, asset_mode, optimize)
+                if optimize and any(is_png(path) for path in changed):
+                    _optimize_images(manifest, jobs, optimize)
+                if search is not None and any(
+                    CONTENT_DIR in path.parents for path in changed
+                ):
+                    _write_search_index(manifest, search)
+                _precompress(manifest, jobs, precompress_min_size)
+                manifest.save()
+                if render_cache is not None:
+                    render_cache.flush()
+            except Exception as e:
+                print(f"Rebuild failed: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
 
 
 def main():
+    args = parse_args()
+
     # Get first CLI argument as the basepath
-    basepath = "/"
-    if len(argv) > 1:
-        basepath += argv[1]
-
-    # Copy contents of static to public
-    static_dir = Path("static")
-    page_dir = Path("docs")
-    if not page_dir.exists():
-        page_dir.mkdir()
-    copy_tree(static_dir, page_dir)
-
-    # Generate pages in "content" using template
-    content_path = Path("content")
-    template_path = Path("template.html")
-    generate_pages_recursive(content_path, template_path, page_dir, basepath)
+    basepath = "/" + args.basepath
+
+    if args.serve is not None:
+        # The development server serves the site from the domain root and writes
+        # nothing to disk, not even the bytecode cache of the templates
+        engine = TemplateEngine(TEMPLATE_PATH)
+        serve(CONTENT_DIR, STATIC_DIR, engine, args.serve)
+        return
+
+    if args.export_cache is not None or args.import_cache is not None:
+        render_cache = RenderCache(RENDER_CACHE_PATH, args.render_cache_size)
+        try:
+            if args.import_cache is not None:
+                added = render_cache.import_from(args.import_cache)
+                print(f"Imported {added} page(s) from '{args.import_cache}'")
+            if args.export_cache is not None:
+                render_cache.export_to(args.export_cache)
+                print(f"Exported the render cache to '{args.export_cache}'")
+        finally:
+            render_cache.close()
+        return
+
+    options = RenderOptions(basepath, args.minify)
+    engine = TemplateEngine(TEMPLATE_PATH, CACHE_DIR / "jinja", options)
+
+    asset_mode = CopyMode(args.asset_mode)
+    precompress_min_size = args.precompress_min_size if args.precompress else None
+    profile = BuildProfile() if args.profile is not None else None
+    cache = ParseCache(args.block_cache_size, args.line_cache_size)
+    search = SearchIndex(SEARCH_CACHE_PATH) if args.search_index else None
+    render_cache = None
+    if args.render_cache_size > 0:
+        render_cache = RenderCache(RENDER_CACHE_PATH, args.render_cache_size)
+    try:
+        manifest = build(
+            basepath,
+            engine,
+            args.jobs,
+            args.clean,
+            force=args.force or args.clean,
+            profile=profile,
+            stream_threshold=args.stream_threshold,
+            cache=cache,
+            render_cache=render_cache,
+            asset_mode=asset_mode,
+            precompress_min_size=precompress_min_size,
+            fingerprint_css=args.fingerprint_css,
+            optimize=args.optimize_images,
+            image_attributes=args.image_attributes,
+            search=search,
+        )
+        if profile is not None:
+            profile.write_json(args.profile)
+            print(profile.format_table(args.profile_top))
+            print(f"Wrote profile of {len(profile.pages)} page(s) to '{args.profile}'")
+        if args.watch:
+            watch(
+                basepath,
+                engine,
+                manifest,
+                args.jobs,
+                args.stream_threshold,
+                cache,
+                render_cache,
+                asset_mode,
+                precompress_min_size,
+                args.fingerprint_css,
+                args.optimize_images,
+                args.image_attributes,
+                search,
+            )
+    finally:
+        if render_cache is not None:
+            render_cache.close()
 
 
 if __name__ == "__main__":
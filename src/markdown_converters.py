@@ -1,13 +1,21 @@
 import re
+from collections.abc import Iterable, Iterator, Sequence
 from enum import Enum
+from typing import NamedTuple
 
 from htmlnode import HTMLNode
+from inlinespan import InlineSpan
+from parse_cache import ParseCache
+from profiling import PageProfile
+from render_options import RenderOptions
 from textnode import TextNode, TextType
-from textnode_converters import (
-    text_node_to_html,
-    text_to_textnodes,
-    textnodes_to_leafnodes,
-)
+from textnode_converters import spans_to_leafnodes, text_node_to_html, text_to_spans
+
+CONVERTER_VERSION = "3"
+"""
+Version of the markdown to HTML conversion. Bump whenever a change to the converters
+alters the generated HTML so that previously built pages are regenerated.
+"""
 
 
 class BlockType(Enum):
@@ -64,6 +72,158 @@ BLOCK_TYPE_TAGS: dict[BlockType, list[str]] = {
 }
 
 
+_HEADING_RE = re.compile(r"#{1,6}(?= \S)")
+_UNORDERED_LIST_RE = re.compile(r"(\*|-)(?= \S)")
+_ORDERED_LIST_RE = re.compile(r"(\d+)\.(?= \S)")
+
+
+class MarkdownBlock(NamedTuple):
+    """A block of a markdown document with its block-level markdown removed
+
+    Produced by `lex_blocks`. Equivalent to the result of `block_to_block_type` and
+    `process_block` for the same block.
+    """
+
+    block_type: BlockType
+    """The type of the block"""
+    lines: list[str]
+    """
+    The lines of the block without block-level markdown characters. Headings and code
+    blocks are kept as a single line containing the whole text of the block.
+    """
+    level: int = 0
+    """The level of a heading (i.e., the number of `#` characters). 0 otherwise"""
+
+
+def _lex_listlike_lines(
+    lines: list[str], pattern: re.Pattern[str], ordered: bool = False
+) -> list[str] | None:
+    """Strip the list markers from every line of a list-like block
+
+    Parameters
+    ----------
+    lines: list[str]
+        The lines of the block
+    pattern: re.Pattern[str]
+        Compiled pattern matching the list marker at the start of a line
+    ordered: bool
+        Whether the numbers of the list markers have to be in order. Default: False
+
+    Returns
+    -------
+    list[str] | None
+        The lines without their list markers. None if any line does not match
+        `pattern` or, for ordered lists, if the numbers are out of order.
+    """
+    stripped_lines: list[str] = []
+    prev_num = -1
+    for line in lines:
+        m = pattern.match(line)
+        if m is None:
+            return None
+        if ordered:
+            num = int(m.group(1))
+            if num < prev_num:
+                return None
+            prev_num = num
+        stripped_lines.append(line.replace(m.group() + " ", "", 1))
+    return stripped_lines
+
+
+def _lex_block(lines: list[str]) -> MarkdownBlock:
+    """Classify a block and strip its block-level markdown in a single pass
+
+    Only one block type can match a block with a given first character, so the lines of
+    the block are checked against at most one pattern.
+
+    Parameters
+    ----------
+    lines: list[str]
+        The lines of the block, stripped of surrounding whitespace as a whole (i.e.,
+        the first line has no leading and the last line no trailing whitespace).
+
+    Returns
+    -------
+    MarkdownBlock
+        The typed block
+    """
+    first_line = lines[0]
+    stripped_lines: list[str] | None = None
+    match first_line[0]:
+        case "#":
+            m = _HEADING_RE.match(first_line)
+            if m is not None:
+                text = "\n".join(lines).lstrip("# ")
+                return MarkdownBlock(BlockType.HEADING, [text], len(m.group()))
+        case "`":
+            text = "\n".join(lines)
+            if len(text) >= 6 and text.startswith("```") and text.endswith("```"):
+                return MarkdownBlock(BlockType.CODE, [text.lstrip("`\n").rstrip("`")])
+        case ">":
+            if all(line.startswith(">") for line in lines):
+                stripped_lines = [line.replace("> ", "", 1) for line in lines]
+                return MarkdownBlock(BlockType.QUOTE, stripped_lines)
+        case "*" | "-":
+            stripped_lines = _lex_listlike_lines(lines, _UNORDERED_LIST_RE)
+            if stripped_lines is not None:
+                return MarkdownBlock(BlockType.UNORDERED_LIST, stripped_lines)
+        case digit if digit.isdecimal():
+            stripped_lines = _lex_listlike_lines(lines, _ORDERED_LIST_RE, ordered=True)
+            if stripped_lines is not None:
+                return MarkdownBlock(BlockType.ORDERED_LIST, stripped_lines)
+    return MarkdownBlock(BlockType.PARAGRAPH, lines)
+
+
+def _trim_block_lines(lines: list[str]) -> list[str]:
+    """Strip the surrounding whitespace of a block given as a list of lines"""
+    start, end = 0, len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    if start == end:
+        return []
+    trimmed = lines[start:end]
+    trimmed[0] = trimmed[0].lstrip()
+    trimmed[-1] = trimmed[-1].rstrip()
+    return trimmed
+
+
+def lex_blocks(lines: Iterable[str]) -> Iterator[MarkdownBlock]:
+    """Split the lines of a markdown document into typed blocks
+
+    A single pass over the lines of the document that yields each block as soon as it
+    ends. Blocks are separated by empty lines, the same way `markdown_to_blocks` splits
+    a document, and every block is classified and stripped of its block-level markdown
+    the same way as `block_to_block_type` and `process_block` would. Blocks made up of
+    only whitespace are skipped.
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of a markdown document without line terminators
+
+    Yields
+    ------
+    MarkdownBlock
+        The blocks of the document in order
+    """
+    block_lines: list[str] = []
+    for line in lines:
+        if line:
+            block_lines.append(line)
+            continue
+        if block_lines:
+            trimmed = _trim_block_lines(block_lines)
+            if trimmed:
+                yield _lex_block(trimmed)
+            block_lines = []
+    if block_lines:
+        trimmed = _trim_block_lines(block_lines)
+        if trimmed:
+            yield _lex_block(trimmed)
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
     """Split markdown document into blocks
 
@@ -295,7 +455,97 @@ def _create_block_html_node(
             return HTMLNode(tag, None, child_nodes)
 
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
+def _line_spans(line: str, cache: ParseCache | None) -> Sequence[InlineSpan]:
+    """The `InlineSpan`s of a line of inline markdown"""
+    if cache is None:
+        return text_to_spans(line)
+    spans = cache.lines.get(line)
+    if spans is None:
+        spans = tuple(text_to_spans(line))
+        cache.lines.put(line, spans)
+    return spans
+
+
+def block_to_html_node(
+    block: MarkdownBlock,
+    options: RenderOptions | None = None,
+    cache: ParseCache | None = None,
+) -> HTMLNode:
+    """Convert a typed markdown block to an HTMLNode
+
+    Parameters
+    ----------
+    block: MarkdownBlock
+        A block produced by `lex_blocks`
+    options: RenderOptions | None
+        Options applied to the inline markdown of the block. Default: None
+    cache: ParseCache | None
+        If provided, converted blocks and tokenized lines are looked up in and added
+        to it. The returned node is never the cached one. Default: None
+
+    Returns
+    -------
+    HTMLNode
+        An HTMLNode representing the block, including its inline markdown
+    """
+    block_node = _shared_block_node(block, options, cache)
+    return block_node if cache is None else block_node.clone()
+
+
+def _shared_block_node(
+    block: MarkdownBlock, options: RenderOptions | None, cache: ParseCache | None
+) -> HTMLNode:
+    """The node of a block, which callers must not modify if `cache` is provided"""
+    if cache is None:
+        return _convert_block(block, options, None)
+    fingerprint = None if options is None else options.fingerprint
+    images: tuple[tuple[str, int, int], ...] = ()
+    if options is not None and options.image_sizes:
+        images = options.image_key("\n".join(block.lines))
+    key = (block.block_type, tuple(block.lines), block.level, fingerprint, images)
+    block_node = cache.blocks.get(key)
+    if block_node is None:
+        block_node = _convert_block(block, options, cache)
+        cache.blocks.put(key, block_node)
+    return block_node
+
+
+def _convert_block(
+    block: MarkdownBlock, options: RenderOptions | None, cache: ParseCache | None
+) -> HTMLNode:
+    block_type = block.block_type
+    is_list = block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST)
+
+    line_htmlnodes: list[HTMLNode] = []
+    if block_type == BlockType.CODE:
+        code_text_node = TextNode(block.lines[0], TextType.TEXT)
+        code_leaf_node = text_node_to_html(code_text_node)
+        line_htmlnodes.append(code_leaf_node)
+    else:
+        num_lines = len(block.lines) - 1
+        for i, block_line in enumerate(block.lines):
+            if i < num_lines and not is_list:
+                block_line += " "
+
+            block_line_spans = _line_spans(block_line, cache)
+            block_line_leafnodes = spans_to_leafnodes(
+                block_line, block_line_spans, options
+            )
+            if is_list:
+                tag = BLOCK_TYPE_TAGS[block_type][0]
+                block_line_leafnodes = [HTMLNode(tag, None, block_line_leafnodes)]
+
+            line_htmlnodes.extend(block_line_leafnodes)
+    md_block_chars = ["#" * block.level] if block_type == BlockType.HEADING else []
+    return _create_block_html_node(block_type, line_htmlnodes, md_block_chars)
+
+
+def markdown_to_html_node(
+    markdown: str,
+    profile: PageProfile | None = None,
+    options: RenderOptions | None = None,
+    cache: ParseCache | None = None,
+) -> HTMLNode:
     """Convert markdown text to an HTMLNode
 
     Takes markdown text and processes it block by block into an HTMLNode
@@ -304,47 +554,28 @@ def markdown_to_html_node(markdown: str) -> HTMLNode:
     ----------
     markdown: str
         Text written in markdown format
+    profile: PageProfile | None
+        If provided, the time spent on block and inline parsing is recorded in it.
+        Default: None
+    options: RenderOptions | None
+        Options applied while converting, e.g., the basepath that root-relative URLs
+        of links and images are resolved against. Default: None
+    cache: ParseCache | None
+        If provided, blocks and lines that were converted before are taken from it
+        instead of being parsed again. Default: None
 
     Returns
     -------
     HTMLNode
         An HTMLNode representing the entire markdown document.
     """
-    blocks = markdown_to_blocks(markdown)
-
     block_htmlnodes: list[HTMLNode] = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        md_block_chars, block_lines = process_block(block_type, block)
-
-        line_htmlnodes: list[HTMLNode] = []
-        if block_type == BlockType.CODE:
-            block_stripped = block.lstrip("`\n").rstrip("`")
-            code_text_node = TextNode(block_stripped, TextType.TEXT)
-            code_leaf_node = text_node_to_html(code_text_node)
-            line_htmlnodes.append(code_leaf_node)
-        else:
-            num_lines = len(block_lines) - 1
-            for i, block_line in enumerate(block_lines):
-                if i < num_lines and not (
-                    block_type == BlockType.UNORDERED_LIST
-                    or block_type == BlockType.ORDERED_LIST
-                ):
-                    block_line += " "
-
-                block_line_textnodes = text_to_textnodes(block_line)
-                block_line_leafnodes = textnodes_to_leafnodes(block_line_textnodes)
-                if (
-                    block_type == BlockType.ORDERED_LIST
-                    or block_type == BlockType.UNORDERED_LIST
-                ):
-                    tag = BLOCK_TYPE_TAGS[block_type][0]
-                    block_line_leafnodes = [HTMLNode(tag, None, block_line_leafnodes)]
-
-                line_htmlnodes.extend(block_line_leafnodes)
-        block_htmlnode = _create_block_html_node(
-            block_type, line_htmlnodes, md_block_chars
-        )
-        block_htmlnodes.append(block_htmlnode)
+    for block in lex_blocks(markdown.split("\n")):
+        if profile is not None:
+            profile.lap("blocks")
+        block_htmlnodes.append(block_to_html_node(block, options, cache))
+        if profile is not None:
+            profile.lap("inline")
 
     return HTMLNode("div", None, block_htmlnodes)
+
@@ -1,10 +1,43 @@
+import os
 import re
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum
 from pathlib import Path
-from shutil import copy2
+from shutil import copyfileobj, copystat
+from typing import TextIO
 
-from jinja2 import Environment, FileSystemLoader
+from build_manifest import BuildManifest, hash_file
+from html_minify import HTMLMinifier
+from markdown_converters import block_to_html_node, lex_blocks, markdown_to_html_node
+from parse_cache import CacheStats, ParseCache
+from profiling import BuildProfile, PageProfile
+from render_cache import RenderCache
+from render_options import RenderOptions
+from search_index import PageTerms, SearchIndex
+from template_engine import TemplateEngine
 
-from markdown_converters import markdown_to_html_node
+STREAM_THRESHOLD = 8 * 1024 * 1024
+"""
+Size in bytes above which markdown files are rendered with `render_page_streaming` by
+default
+"""
+
+_worker_engine: TemplateEngine | None = None
+"""
+Template engine of a worker process. Set up once per worker by `_init_worker`.
+"""
+_worker_parse_cache: ParseCache | None = None
+"""
+Parse cache of a worker process. Set up once per worker by `_init_worker`.
+"""
+_worker_render_cache: RenderCache | None = None
+"""
+Connection of a worker process to the render cache. Set up once per worker by
+`_init_worker`.
+"""
 
 
 def _convert_to_pathlib_path(path_str: Path | str) -> Path:
@@ -50,12 +83,261 @@ def _delete_file_tree(path: Path) -> bool:
     return True
 
 
-# Works, but try to find a better way of doing this later.
-def copy_tree(src: Path | str, dest: Path | str, dest_was_deleted: bool = False):
+class PageGenerationError(Exception):
+    """Raised when one or more pages of a build could not be generated
+
+    Parameters
+    ----------
+    failures: list[tuple[pathlib.Path, Exception]]
+        The source file of every page that failed along with the exception raised
+    """
+
+    def __init__(self, failures: list[tuple[Path, Exception]]) -> None:
+        self.failures: list[tuple[Path, Exception]] = failures
+        details = "\n".join(f"  {path}: {e}" for path, e in failures)
+        super().__init__(f"could not generate {len(failures)} page(s):\n{details}")
+
+
+def split_front_matter(markdown: str) -> tuple[dict[str, str], str]:
+    """Separate the front matter from the body of a markdown document
+
+    Front matter is an optional block of `key: value` lines at the very start of the
+    document, enclosed in lines containing only `---`. It is currently used to select
+    the template a page is rendered with (e.g., `template: post.html`).
+
+    Parameters
+    ----------
+    markdown: str
+        Text representing a markdown document
+
+    Returns
+    -------
+    tuple[dict[str, str], str]
+        A tuple containing the following values
+        - The front matter as a dictionary. Empty if there is no front matter
+        - The markdown document without the front matter
+    """
+    if not markdown.startswith("---\n"):
+        return {}, markdown
+    end = markdown.find("\n---\n", 3)
+    if end == -1:
+        return {}, markdown
+    front_matter: dict[str, str] = {}
+    for line in markdown[4:end].split("\n"):
+        key, sep, value = line.partition(":")
+        if sep:
+            front_matter[key.strip()] = value.strip()
+    return front_matter, markdown[end + 5 :]
+
+
+@dataclass
+class SyncReport:
+    """Summary of the work done by `sync_tree`
+
+    All paths are relative to the source and destination directories.
+    """
+
+    files: list[Path] = field(default_factory=list)
+    """Every file present in the source directory"""
+    copied: list[Path] = field(default_factory=list)
+    """Files that were new or changed and have been copied"""
+    unchanged: list[Path] = field(default_factory=list)
+    """Files that were already up to date in the destination directory"""
+    deleted: list[Path] = field(default_factory=list)
+    """Previously synced files that no longer exist in the source directory"""
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.copied)} copied, {len(self.unchanged)} unchanged, "
+            f"{len(self.deleted)} deleted"
+        )
+
+
+class CopyMode(Enum):
+    """How `sync_tree`, `sync_file` and `copy_tree` put files into the destination
+
+    Every mode writes to a temporary file that then replaces the destination, so a
+    destination that is linked to its source is never modified in place.
+    """
+
+    COPY = "copy"
+    """
+    Copy the contents, inside the kernel with `os.copy_file_range` or `os.sendfile`
+    where available
+    """
+    HARDLINK = "hardlink"
+    """
+    Make the destination a hard link to the source, so both share the same bytes on
+    disk. Falls back to copying if the directories are on different file systems.
+    """
+    REFLINK = "reflink"
+    """
+    Make the destination a copy-on-write clone of the source on file systems that
+    support it (e.g., Btrfs and XFS on Linux). Falls back to copying.
+    """
+
+
+_FICLONE = 0x40049409
+"""The Linux ioctl that clones a file, from <linux/fs.h>"""
+
+
+def _scan_files(src: Path) -> list[tuple[Path, os.stat_result]]:
+    """Find every file below `src` with `os.scandir`
+
+    Returns
+    -------
+    list[tuple[pathlib.Path, os.stat_result]]
+        The path of every file relative to `src` with the result of `stat` on it,
+        sorted by path
+    """
+    files: list[tuple[Path, os.stat_result]] = []
+    dirs = [(src, Path())]
+    while dirs:
+        directory, rel_dir = dirs.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    dirs.append((Path(entry.path), rel_dir / entry.name))
+                else:
+                    files.append((rel_dir / entry.name, entry.stat()))
+    files.sort(key=lambda f: f[0])
+    return files
+
+
+def _stats_match(
+    src_stat: os.stat_result, dest_stat: os.stat_result, mode: CopyMode
+) -> bool | None:
+    """Check whether a destination is up to date from its metadata alone
+
+    Returns
+    -------
+    bool | None
+        Whether the destination is up to date. None if the contents of the files have
+        to be compared to find out
+    """
+    if os.path.samestat(src_stat, dest_stat):
+        return mode == CopyMode.HARDLINK
+    if mode == CopyMode.HARDLINK or src_stat.st_size != dest_stat.st_size:
+        return False
+    if src_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    return None
+
+
+def _files_match(
+    src: Path,
+    dest: Path,
+    mode: CopyMode = CopyMode.COPY,
+    src_stat: os.stat_result | None = None,
+) -> bool:
+    """Check whether `dest` is an up to date copy of `src`
+
+    In `CopyMode.HARDLINK` only a link to `src` is up to date. In the other modes a
+    link to `src` is never up to date, files with a different size never match and
+    files with the same size and modification time are assumed to match. Otherwise
+    the contents of the files are compared by hash. If the contents match, the
+    metadata of `src` is copied to `dest` so that the next comparison can take the
+    fast path.
+    """
+    if src_stat is None:
+        src_stat = src.stat()
+    try:
+        dest_stat = dest.stat()
+    except FileNotFoundError:
+        return False
+    match = _stats_match(src_stat, dest_stat, mode)
+    if match is not None:
+        return match
+    if hash_file(src) != hash_file(dest):
+        return False
+    copystat(src, dest)
+    return True
+
+
+def _kernel_copy(src_fd: int, dest_fd: int, size: int) -> bool:
+    """Copy `size` bytes between two files without passing them through Python
+
+    Tries `os.copy_file_range` and then `os.sendfile`. Returns False, leaving the
+    destination empty and both files at their start, if neither is available for the
+    files or neither copied all `size` bytes (e.g., because the source shrank or the
+    file system stopped short).
+    """
+    copies: list[Callable[[int], int]] = []
+    if hasattr(os, "copy_file_range"):
+        copies.append(lambda count: os.copy_file_range(src_fd, dest_fd, count))
+    if hasattr(os, "sendfile"):
+        copies.append(lambda count: os.sendfile(dest_fd, src_fd, None, count))
+    for copy in copies:
+        offset = 0
+        try:
+            while offset < size:
+                copied = copy(size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            pass
+        if offset == size:
+            return True
+        os.lseek(src_fd, 0, os.SEEK_SET)
+        os.lseek(dest_fd, 0, os.SEEK_SET)
+        os.ftruncate(dest_fd, 0)
+    return False
+
+
+def _try_link(src: Path, dest: Path) -> bool:
+    try:
+        os.link(src, dest)
+    except OSError:
+        return False
+    return True
+
+
+def _try_clone(src_fd: int, dest_fd: int) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        fcntl.ioctl(dest_fd, _FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_contents(src: Path, dest: Path, mode: CopyMode) -> None:
+    with open(src, "rb") as f_src, open(dest, "wb") as f_dest:
+        src_fd, dest_fd = f_src.fileno(), f_dest.fileno()
+        if mode == CopyMode.REFLINK and _try_clone(src_fd, dest_fd):
+            return
+        if not _kernel_copy(src_fd, dest_fd, os.fstat(src_fd).st_size):
+            copyfileobj(f_src, f_dest)
+
+
+def _put_file(src: Path, dest: Path, mode: CopyMode) -> None:
+    """Replace `dest` with a copy of (or link to) `src` as selected by `mode`"""
+    tmp_path = dest.with_name(f".{dest.name}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    try:
+        if mode != CopyMode.HARDLINK or not _try_link(src, tmp_path):
+            _copy_contents(src, tmp_path, mode)
+            copystat(src, tmp_path)
+        os.replace(tmp_path, dest)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def copy_tree(
+    src: Path | str,
+    dest: Path | str,
+    dest_was_deleted: bool = False,
+    mode: CopyMode = CopyMode.COPY,
+    threads: int | None = None,
+):
     """Copies the entire `src` directory into `dest`
 
-    `copy_tree` first deletes the contents of `dest` before recursively copying all
-    files from `src` to dest.
+    `copy_tree` first deletes the contents of `dest` before copying all files from
+    `src` to dest. Files are found with `os.scandir` and copied on a thread pool.
 
     Parameters
     ----------
@@ -64,26 +346,138 @@ def copy_tree(src: Path | str, dest: Path | str, dest_was_deleted: bool = False)
     dest: pathlib.Path | str
         Path to the destination directory. Must already exist.
     dest_was_deleted: bool
-        Whether the contents of `dest` have already been deleted. Only used to skip the
-        deletion of the specified directory's contents during recursion. Should be left
-        alone by the user.
+        Whether the contents of `dest` have already been deleted, in which case they
+        are not deleted again. Default: False
+    mode: CopyMode
+        How files are put into `dest`. Default: `CopyMode.COPY`
+    threads: int | None
+        Number of threads copying files. Setting to `None` uses the default of
+        `concurrent.futures.ThreadPoolExecutor`. Default: None
     """
     src, dest = map(_convert_to_pathlib_path, (src, dest))
 
     # Delete all contents of destination tree including sub-directories
-    dest_deleted: bool = False
     if not dest_was_deleted:
-        dest_deleted = _delete_file_tree(dest)
-
-    # Copy all files from src to dest
-    for f_src in src.iterdir():
-        if f_src.is_dir():
-            dest_dir_mirror = dest / f_src.name
-            if not dest_dir_mirror.exists():
-                dest_dir_mirror.mkdir()
-            copy_tree(f_src, dest_dir_mirror, dest_deleted)
-        else:
-            copy2(str(f_src), str(dest))
+        _delete_file_tree(dest)
+
+    files = _scan_files(src)
+    for rel_dir in {rel_path.parent for rel_path, _ in files}:
+        (dest / rel_dir).mkdir(parents=True, exist_ok=True)
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda f: _put_file(src / f[0], dest / f[0], mode), files))
+
+
+def sync_file(
+    src: Path | str,
+    dest: Path | str,
+    mode: CopyMode = CopyMode.COPY,
+    src_stat: os.stat_result | None = None,
+) -> bool:
+    """Copy `src` to `dest` unless `dest` is already an up to date copy
+
+    Parameters
+    ----------
+    src: pathlib.Path | str
+        Path to the source file
+    dest: pathlib.Path | str
+        Path to the destination file. Missing parent directories are created.
+    mode: CopyMode
+        How the file is put into `dest`. Default: `CopyMode.COPY`
+    src_stat: os.stat_result | None
+        The result of `stat` on `src`, if it is already known. Default: None
+
+    Returns
+    -------
+    bool
+        True if the file was copied. False if it was already up to date.
+    """
+    src, dest = map(_convert_to_pathlib_path, (src, dest))
+    if _files_match(src, dest, mode, src_stat):
+        return False
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    _put_file(src, dest, mode)
+    return True
+
+
+def sync_tree(
+    src: Path | str,
+    dest: Path | str,
+    previous_files: Iterable[Path | str] = (),
+    mode: CopyMode = CopyMode.COPY,
+    threads: int | None = None,
+    exclude: Callable[[Path], bool] | None = None,
+) -> SyncReport:
+    """Incrementally synchronize the `dest` directory with the `src` directory
+
+    Unlike `copy_tree`, only files that are new or changed are copied and files in
+    `dest` that did not come from `src` (e.g., generated pages) are left alone. Files
+    from a previous sync that no longer exist in `src` are deleted. Files are found
+    with `os.scandir` and checked and copied on a thread pool, since the work is
+    dominated by system calls that release the GIL.
+
+    Parameters
+    ----------
+    src: pathlib.Path | str
+        Path to the source directory
+    dest: pathlib.Path | str
+        Path to the destination directory
+    previous_files: Iterable[pathlib.Path | str]
+        The `files` of the report of the previous sync, relative to `dest`. Only these
+        files are candidates for deletion. Default: ()
+    mode: CopyMode
+        How files are put into `dest`. Switching modes replaces files that were put
+        into `dest` differently. Default: `CopyMode.COPY`
+    threads: int | None
+        Number of threads syncing files. Setting to `None` uses the default of
+        `concurrent.futures.ThreadPoolExecutor`. Default: None
+    exclude: Callable[[pathlib.Path], bool] | None
+        Called with the path of every file relative to `src`. Files for which it
+        returns True are left out of the sync, as if they didn't exist in `src`
+        (e.g., because another stage puts them into `dest`). Default: None
+
+    Returns
+    -------
+    SyncReport
+        What was copied, left alone and deleted
+    """
+    src, dest = map(_convert_to_pathlib_path, (src, dest))
+
+    report = SyncReport()
+    with ThreadPoolExecutor(threads) as executor:
+        futures: list[Future[bool] | None] = []
+        for rel_path, src_stat in _scan_files(src):
+            if exclude is not None and exclude(rel_path):
+                continue
+            report.files.append(rel_path)
+            # Most files are unchanged, which is cheaper to tell right away than on
+            # the pool
+            try:
+                dest_stat = (dest / rel_path).stat()
+            except FileNotFoundError:
+                dest_stat = None
+            if dest_stat is not None and _stats_match(src_stat, dest_stat, mode):
+                futures.append(None)
+                continue
+            futures.append(
+                executor.submit(
+                    sync_file, src / rel_path, dest / rel_path, mode, src_stat
+                )
+            )
+        for rel_path, future in zip(report.files, futures):
+            if future is not None and future.result():
+                report.copied.append(rel_path)
+            else:
+                report.unchanged.append(rel_path)
+
+    current_files = set(report.files)
+    for rel_path in map(Path, previous_files):
+        if rel_path in current_files:
+            continue
+        f_dest = dest / rel_path
+        if f_dest.is_file():
+            f_dest.unlink()
+            report.deleted.append(rel_path)
+    return report
 
 
 def extract_title(markdown: str) -> str:
@@ -94,46 +488,432 @@ def extract_title(markdown: str) -> str:
     raise Exception("no title found")
 
 
+def render_page(
+    markdown: str,
+    engine: TemplateEngine,
+    profile: PageProfile | None = None,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    terms: PageTerms | None = None,
+) -> str:
+    """Render a markdown document into a complete HTML page
+
+    Root-relative URLs are resolved against the basepath in the `RenderOptions` of
+    `engine`, both in the markdown and in the template.
+
+    Parameters
+    ----------
+    markdown: str
+        Text representing a markdown document, optionally starting with front matter
+    engine: TemplateEngine
+        The template engine used to render the page
+    profile: PageProfile | None
+        If provided, the time spent in each phase is recorded in it. Default: None
+    cache: ParseCache | None
+        Cache of converted blocks and lines used while converting the markdown.
+        Default: None
+    render_cache: RenderCache | None
+        Persistent cache consulted for the title and content of the page before the
+        markdown is converted. Newly converted pages are added to it. Default: None
+    terms: PageTerms | None
+        If provided, the title and the terms of the text of the page are added to it.
+        The render cache only holds HTML, so a page found in it is converted anyway.
+        Callers should only pass one for pages whose terms aren't known yet (see
+        `SearchIndex.needs_terms`). Default: None
+
+    Returns
+    -------
+    str
+        The rendered page
+    """
+    front_matter, md = split_front_matter(markdown)
+    if profile is not None:
+        profile.lap("read")
+
+    key = None
+    cached = None
+    if render_cache is not None:
+        key = RenderCache.key(md, engine.options)
+        cached = render_cache.get(key)
+    if cached is not None:
+        title, content = cached
+        if terms is not None:
+            terms.add_node(markdown_to_html_node(md, None, engine.options, cache))
+        if profile is not None:
+            profile.lap("to_html")
+    else:
+        # Get title
+        try:
+            title = extract_title(md)
+        except Exception as e:
+            raise Exception(f"could not generate page: {e}")
+        if profile is not None:
+            profile.lap("extract_title")
+
+        # Get page HTML
+        md_node = markdown_to_html_node(md, profile, engine.options, cache)
+        if terms is not None:
+            terms.add_node(md_node)
+        content = md_node.to_html(engine.options.minify)
+        if render_cache is not None and key is not None:
+            render_cache.put(key, title, content)
+        if profile is not None:
+            profile.lap("to_html")
+
+    if terms is not None:
+        terms.title = title
+
+    # Generate page from template
+    page = engine.render(title, content, front_matter.get("template"))
+    if profile is not None:
+        profile.lap("template")
+    return page
+
+
+def _read_front_matter(md_file: TextIO) -> dict[str, str]:
+    """Read the front matter at the start of `md_file` like `split_front_matter` does
+
+    Leaves `md_file` positioned at the start of the body of the document.
+    """
+    start = md_file.tell()
+    if md_file.readline() != "---\n":
+        md_file.seek(start)
+        return {}
+    front_matter: dict[str, str] = {}
+    for line in iter(md_file.readline, ""):
+        if line == "---\n":
+            return front_matter
+        key, sep, value = line.partition(":")
+        if sep:
+            front_matter[key.strip()] = value.strip()
+    md_file.seek(start)
+    return {}
+
+
+def _markdown_lines(md_file: TextIO) -> Iterator[str]:
+    for line in md_file:
+        yield line[:-1] if line.endswith("\n") else line
+
+
+def _scan_title(md_file: TextIO) -> str:
+    """Find the title of a document line by line like `extract_title` does"""
+    for line in _markdown_lines(md_file):
+        if line.startswith("# "):
+            return line[2:]
+    raise Exception("no title found")
+
+
+def render_page_streaming(
+    md_file: TextIO,
+    out: TextIO,
+    engine: TemplateEngine,
+    profile: PageProfile | None = None,
+    cache: ParseCache | None = None,
+    terms: PageTerms | None = None,
+) -> None:
+    """Render a markdown document from a stream into a complete HTML page in a stream
+
+    Produces the same page as `render_page`, but the document is never held in memory
+    as a whole. The title is found in a first pass over the lines of the document.
+    In the second pass every block is converted and written to `out` as soon as it
+    ends, between the parts of the page rendered by
+    `TemplateEngine.render_around_content`. Memory use is therefore bounded by the
+    largest block instead of the whole document. If the template can't be split around
+    the content, the page is rendered in memory with `render_page` instead.
+
+    Parameters
+    ----------
+    md_file: TextIO
+        Seekable text stream of a markdown document, optionally starting with front
+        matter, positioned at the start of the document
+    out: TextIO
+        Text stream the page is written to
+    engine: TemplateEngine
+        The template engine used to render the page
+    profile: PageProfile | None
+        If provided, the time spent in each phase is recorded in it. Writing a block
+        counts towards `to_html`. Default: None
+    cache: ParseCache | None
+        Cache of converted blocks and lines used while converting the markdown.
+        Default: None
+    terms: PageTerms | None
+        If provided, the title and the terms of the text of the page are added to it,
+        block by block. Default: None
+    """
+    start = md_file.tell()
+    front_matter = _read_front_matter(md_file)
+    body_start = md_file.tell()
+    if profile is not None:
+        profile.lap("read")
+
+    try:
+        title = _scan_title(md_file)
+    except Exception as e:
+        raise Exception(f"could not generate page: {e}")
+    md_file.seek(body_start)
+    if terms is not None:
+        terms.title = title
+    if profile is not None:
+        profile.lap("extract_title")
+
+    parts = engine.render_around_content(title, front_matter.get("template"))
+    if profile is not None:
+        profile.lap("template")
+    if parts is None:
+        md_file.seek(start)
+        out.write(render_page(md_file.read(), engine, profile, cache, terms=terms))
+        return
+
+    before, after = parts
+    out.write(before)
+    # All blocks share a minifier so that end tags implied by the next block are
+    # left out like in `render_page`
+    minifier = HTMLMinifier(out.write) if engine.options.minify else None
+    if minifier is None:
+        out.write("<div>")
+    else:
+        minifier.start_tag("div")
+    for block in lex_blocks(_markdown_lines(md_file)):
+        if profile is not None:
+            profile.lap("blocks")
+        block_node = block_to_html_node(block, engine.options, cache)
+        if terms is not None:
+            terms.add_node(block_node)
+        if profile is not None:
+            profile.lap("inline")
+        if minifier is None:
+            block_node.write_html(out)
+        else:
+            block_node.write_minified(minifier)
+        if profile is not None:
+            profile.lap("to_html")
+    if minifier is None:
+        out.write("</div>")
+    else:
+        minifier.end_tag()
+        minifier.close()
+    out.write(after)
+    if profile is not None:
+        profile.lap("template")
+
+
+def _engine_for_basepath(
+    engine: TemplateEngine | None, template_path: Path, basepath: str
+) -> TemplateEngine:
+    if engine is None:
+        return TemplateEngine(template_path, options=RenderOptions(basepath))
+    if engine.options.basepath != basepath:
+        raise ValueError(
+            f"template engine renders pages for basepath '{engine.options.basepath}' "
+            f"instead of '{basepath}'"
+        )
+    return engine
+
+
 def generate_page(
     from_path: Path | str,
     template_path: Path | str,
     dest_path: Path | str,
     basepath: str,
+    engine: TemplateEngine | None = None,
+    verbose: bool = True,
+    profile: PageProfile | None = None,
+    stream_threshold: int | None = STREAM_THRESHOLD,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    terms: PageTerms | None = None,
 ):
     from_path, template_path, dest_path = map(
         _convert_to_pathlib_path, (from_path, template_path, dest_path)
     )
+    engine = _engine_for_basepath(engine, template_path, basepath)
 
-    print(
-        f"Generating page from '{from_path}' to '{dest_path}' using '{template_path}'..."
-    )
+    if verbose:
+        print(_generation_message(from_path, template_path, dest_path))
+
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    if stream_threshold is not None and from_path.stat().st_size > stream_threshold:
+        # Write to a temporary file so that a failure doesn't leave a partial page
+        tmp_path = dest_path.with_name(dest_path.name + ".tmp")
+        try:
+            with open(from_path) as md_file, open(tmp_path, "w") as html_page:
+                render_page_streaming(
+                    md_file, html_page, engine, profile, cache, terms
+                )
+            tmp_path.replace(dest_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        if profile is not None:
+            profile.lap("write")
+        return
 
     # Load the markdown file
     with open(from_path) as md_file:
         md = md_file.read()
 
-    # Get title
-    try:
-        title = extract_title(md)
-    except Exception as e:
-        raise Exception(f"could not generate page: {e}")
+    page = render_page(md, engine, profile, cache, render_cache, terms)
 
-    # Get page HTML
-    md_node = markdown_to_html_node(md)
-    content = md_node.to_html()
+    # Write page to dest_path
+    with open(dest_path, "w") as html_page:
+        html_page.write(page)
+    if profile is not None:
+        profile.lap("write")
 
-    # Load the template
-    template_env = Environment(loader=FileSystemLoader("."))
-    template = template_env.get_template("template.html")
 
-    # Generate page from template and write to dest_path
-    if not dest_path.parent.exists():
-        dest_path.parent.mkdir(parents=True)
+def _generation_message(from_path: Path, template_path: Path, dest_path: Path) -> str:
+    return f"Generating page from '{from_path}' to '{dest_path}' using '{template_path}'..."
 
-    with open(dest_path, "w") as html_page:
-        template_str = template.render(Title=title, Content=content)
-        template_str = re.sub(r'(href|src)(=")/', rf"\1\2{basepath}", template_str)
-        html_page.write(template_str)
+
+def _init_worker(
+    template_path: Path,
+    cache_dir: Path | None,
+    options: RenderOptions,
+    cache_sizes: tuple[int, int] | None,
+    render_cache_settings: tuple[Path, int] | None,
+) -> None:
+    global _worker_engine, _worker_parse_cache, _worker_render_cache
+    _worker_engine = TemplateEngine(template_path, cache_dir, options)
+    if cache_sizes is not None:
+        _worker_parse_cache = ParseCache(*cache_sizes)
+    if render_cache_settings is not None:
+        _worker_render_cache = RenderCache(*render_cache_settings)
+
+
+def _generate_page_job(
+    from_path: Path,
+    template_path: Path,
+    dest_path: Path,
+    basepath: str,
+    profiled: bool,
+    stream_threshold: int | None,
+    indexed: bool = False,
+) -> tuple[str, PageProfile | None, dict[str, CacheStats], PageTerms | None]:
+    """Generate a single page in a worker process
+
+    Returns
+    -------
+    tuple[str, PageProfile | None, dict[str, CacheStats], PageTerms | None]
+        A tuple containing the following values
+        - The log message for the page, so that the parent process can print the
+          messages in a deterministic order.
+        - The profile of the page if `profiled` is True. None otherwise
+        - The hits and misses of the worker's caches while generating the page: the
+          tiers of the parse cache and "pages" for the render cache, if the build
+          uses them
+        - The terms of the page if `indexed` is True. None otherwise
+    """
+    profile = PageProfile(from_path) if profiled else None
+    terms = PageTerms() if indexed else None
+    if _worker_parse_cache is not None:
+        _worker_parse_cache.reset_stats()
+    if _worker_render_cache is not None:
+        _worker_render_cache.stats = CacheStats()
+    generate_page(
+        from_path,
+        template_path,
+        dest_path,
+        basepath,
+        _worker_engine,
+        verbose=False,
+        profile=profile,
+        stream_threshold=stream_threshold,
+        cache=_worker_parse_cache,
+        render_cache=_worker_render_cache,
+        terms=terms,
+    )
+    cache_stats: dict[str, CacheStats] = {}
+    if _worker_parse_cache is not None:
+        cache_stats.update(_worker_parse_cache.stats())
+    if _worker_render_cache is not None:
+        _worker_render_cache.flush()
+        cache_stats["pages"] = _worker_render_cache.stats
+    message = _generation_message(from_path, template_path, dest_path)
+    return message, profile, cache_stats, terms
+
+
+def page_destination(
+    from_path: Path | str, dir_path_content: Path | str, dest_dir_path: Path | str
+) -> Path:
+    """Get the path of the page generated from a markdown file
+
+    Parameters
+    ----------
+    from_path: pathlib.Path | str
+        Path to the markdown file. Must be inside `dir_path_content`.
+    dir_path_content: pathlib.Path | str
+        Path to the directory containing the markdown files
+    dest_dir_path: pathlib.Path | str
+        Path to the directory the generated pages are written to
+
+    Returns
+    -------
+    pathlib.Path
+        Path to the generated HTML file
+    """
+    from_path, dir_path_content, dest_dir_path = map(
+        _convert_to_pathlib_path, (from_path, dir_path_content, dest_dir_path)
+    )
+    rel_path = from_path.relative_to(dir_path_content)
+    return dest_dir_path / rel_path.parent / f"{rel_path.stem}.html"
+
+
+def page_images(
+    from_path: Path | str, options: RenderOptions
+) -> dict[str, tuple[int, int] | None]:
+    """Get the URLs a markdown file refers to and the sizes of the images
+
+    The file is read a line at a time, so large pages are never held in memory.
+
+    Parameters
+    ----------
+    from_path: pathlib.Path | str
+        Path to the markdown file
+    options: RenderOptions
+        The options the page is converted with
+
+    Returns
+    -------
+    dict[str, tuple[int, int] | None]
+        The `RenderOptions.referenced_images` of the whole file
+    """
+    images: dict[str, tuple[int, int] | None] = {}
+    with open(from_path) as md_file:
+        for line in md_file:
+            images.update(options.referenced_images(line))
+    return images
+
+
+def discover_pages(
+    dir_path_content: Path | str, dest_dir_path: Path | str
+) -> list[tuple[Path, Path]]:
+    """Find every markdown file in `dir_path_content` and the page it generates
+
+    The directory structure of `dir_path_content` is mirrored in `dest_dir_path`.
+    Pages are returned sorted by source path so that builds are deterministic.
+
+    Parameters
+    ----------
+    dir_path_content: pathlib.Path | str
+        Path to the directory containing the markdown files
+    dest_dir_path: pathlib.Path | str
+        Path to the directory the generated pages are written to
+
+    Returns
+    -------
+    list[tuple[pathlib.Path, pathlib.Path]]
+        Pairs of source markdown file and destination HTML file
+    """
+    dir_path_content, dest_dir_path = map(
+        _convert_to_pathlib_path, (dir_path_content, dest_dir_path)
+    )
+
+    pages: list[tuple[Path, Path]] = []
+    for f_content in sorted(dir_path_content.iterdir()):
+        if f_content.is_dir():
+            pages.extend(discover_pages(f_content, dest_dir_path / f_content.name))
+        else:
+            pages.append((f_content, dest_dir_path / f"{f_content.stem}.html"))
+    return pages
 
 
 def generate_pages_recursive(
@@ -141,20 +921,179 @@ def generate_pages_recursive(
     template_path: Path | str,
     dest_dir_path: Path | str,
     basepath: str,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    engine: TemplateEngine | None = None,
+    profile: BuildProfile | None = None,
+    stream_threshold: int | None = STREAM_THRESHOLD,
+    cache: ParseCache | None = None,
+    render_cache: RenderCache | None = None,
+    search: SearchIndex | None = None,
 ):
-    dir_path_content, template_path, dest_dir_path = map(
-        _convert_to_pathlib_path, (dir_path_content, template_path, dest_dir_path)
-    )
+    """Generate a page for every markdown file in `dir_path_content`
 
-    for f_content in dir_path_content.iterdir():
-        if f_content.is_dir():
-            generate_pages_recursive(
-                f_content, template_path, dest_dir_path / f_content.name, basepath
+    The directory structure of `dir_path_content` is mirrored in `dest_dir_path`. If a
+    `manifest` is provided, pages whose inputs are unchanged since the last build are
+    skipped. Skipped pages are recorded in it right away and generated pages once
+    their output has been written, so a page that fails is rebuilt by the next build.
+
+    With `jobs` greater than 1, pages are generated on a pool of worker processes. Log
+    messages are still printed in the order the pages were discovered and failures are
+    collected so that every page gets a chance to be built before a
+    `PageGenerationError` listing all of them is raised.
+
+    Parameters
+    ----------
+    dir_path_content: pathlib.Path | str
+        Path to the directory containing the markdown files
+    template_path: pathlib.Path | str
+        Path to the HTML template used for every page
+    dest_dir_path: pathlib.Path | str
+        Path to the directory the generated pages are written to
+    basepath: str
+        The basepath that root-relative URLs are rewritten to
+    manifest: BuildManifest | None
+        The manifest of the current build. Default: None
+    jobs: int
+        Number of worker processes used to generate pages. Default: 1
+    engine: TemplateEngine | None
+        The template engine used to render pages. Its basepath must match
+        `basepath`. Worker processes create their own engine with the same settings.
+        If set to `None`, an engine without a bytecode cache is created for
+        `template_path`. Default: None
+    profile: BuildProfile | None
+        If provided, the profile of every generated page is added to it. Default: None
+    stream_threshold: int | None
+        Markdown files larger than this many bytes are rendered with
+        `render_page_streaming`. Setting to `None` renders every page in memory.
+        Default: `STREAM_THRESHOLD`
+    cache: ParseCache | None
+        Cache of converted blocks and lines shared by the pages. Worker processes
+        create their own cache of the same size and the hits and misses of their
+        caches are added to the stats of `cache`. Default: None
+    render_cache: RenderCache | None
+        Persistent cache of converted pages. Pages rendered in memory are looked up
+        in it before their markdown is converted. Worker processes open their own
+        connection to the same file and their hits and misses are added to the stats
+        of `render_cache`. Default: None
+    search: SearchIndex | None
+        If provided, every page is recorded in it and pages that are no longer part of
+        the build are removed from it. Terms are only collected from the pages whose
+        source hash it has no terms for, which are generated even if their output is
+        up to date. Default: None
+    """
+    template_path = _convert_to_pathlib_path(template_path)
+    engine = _engine_for_basepath(engine, template_path, basepath)
+    dest_dir_path = _convert_to_pathlib_path(dest_dir_path)
+
+    pages: list[tuple[Path, Path]] = []
+    # Source hash and images of the pages to generate, recorded in the manifest once
+    # written
+    to_record: dict[Path, tuple[str, dict[str, tuple[int, int] | None]]] = {}
+    # Source hash and URL of the pages whose terms are collected while they are
+    # generated. Every other page reuses the terms of its source hash
+    collect_terms: dict[Path, tuple[str, str]] = {}
+    indexed: set[str] = set()
+    for from_path, dest_path in discover_pages(dir_path_content, dest_dir_path):
+        if manifest is not None or search is not None:
+            src_hash = hash_file(from_path)
+        build = True
+        if manifest is not None:
+            build = manifest.needs_build(from_path, dest_path, src_hash)
+        if search is not None:
+            url = engine.options.rewrite_url(
+                "/" + dest_path.relative_to(dest_dir_path).as_posix()
             )
-        else:
+            indexed.add(str(from_path))
+            if search.needs_terms(from_path, src_hash):
+                collect_terms[from_path] = (src_hash, url)
+                build = True
+            else:
+                search.record(from_path, src_hash, url)
+        if build:
+            pages.append((from_path, dest_path))
+            if manifest is not None:
+                to_record[from_path] = (
+                    src_hash, page_images(from_path, engine.options)
+                )
+        elif manifest is not None:
+            manifest.record(from_path, dest_path, src_hash)
+    if search is not None:
+        search.prune(indexed)
+
+    if jobs <= 1 or len(pages) <= 1:
+        for from_path, dest_path in pages:
+            page_profile = PageProfile(from_path) if profile is not None else None
+            terms = PageTerms() if from_path in collect_terms else None
             generate_page(
-                f_content,
+                from_path,
+                template_path,
+                dest_path,
+                basepath,
+                engine,
+                profile=page_profile,
+                stream_threshold=stream_threshold,
+                cache=cache,
+                render_cache=render_cache,
+                terms=terms,
+            )
+            if manifest is not None:
+                manifest.record(from_path, dest_path, *to_record[from_path])
+            if search is not None and terms is not None:
+                search.record(from_path, *collect_terms[from_path], terms)
+            if profile is not None and page_profile is not None:
+                profile.pages.append(page_profile)
+        return
+
+    cache_sizes = None
+    if cache is not None:
+        cache_sizes = (cache.blocks.max_size, cache.lines.max_size)
+    render_cache_settings = None
+    if render_cache is not None:
+        render_cache.flush()
+        render_cache_settings = (render_cache.path, render_cache.max_bytes)
+    failures: list[tuple[Path, Exception]] = []
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(
+            engine.template_path,
+            engine.cache_dir,
+            engine.options,
+            cache_sizes,
+            render_cache_settings,
+        ),
+    ) as executor:
+        futures = [
+            executor.submit(
+                _generate_page_job,
+                from_path,
                 template_path,
-                dest_dir_path / f"{f_content.stem}.html",
+                dest_path,
                 basepath,
+                profile is not None,
+                stream_threshold,
+                from_path in collect_terms,
             )
+            for from_path, dest_path in pages
+        ]
+        for (from_path, dest_path), future in zip(pages, futures):
+            try:
+                message, page_profile, cache_stats, terms = future.result()
+            except Exception as e:
+                failures.append((from_path, e))
+                continue
+            print(message)
+            if manifest is not None:
+                manifest.record(from_path, dest_path, *to_record[from_path])
+            if search is not None and terms is not None:
+                search.record(from_path, *collect_terms[from_path], terms)
+            if cache is not None:
+                cache.add_stats(cache_stats)
+            if render_cache is not None:
+                render_cache.stats.hits += cache_stats["pages"].hits
+                render_cache.stats.misses += cache_stats["pages"].misses
+            if profile is not None and page_profile is not None:
+                profile.pages.append(page_profile)
+    if failures:
+        raise PageGenerationError(failures)
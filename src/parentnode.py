@@ -22,6 +22,8 @@ class ParentNode(HTMLNode):
         Default: None
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
@@ -30,25 +32,28 @@ class ParentNode(HTMLNode):
     ) -> None:
         super().__init__(tag, None, children, props)
 
-    def to_html(self) -> str:
-        """Convert the `ParentNode` into valid HTML
-
-        Returns a string containing the HTML string of all of the `ParentNode`s children
-        enclosed in the `ParentNode`s `tag`. Raises an exception if either `tag` or
-        `children` are missing values.
+    def _leaf_html(self) -> str:
+        """A `ParentNode` without children is invalid
 
-        Returns
-        -------
-        str
-            Valid HTML string constructed from the `tag`s of the `ParentNode` and the
-            HTML string of all the child nodes.
+        The HTML of a `ParentNode` is the HTML of all of its children enclosed in its
+        `tag`. Raises an exception if either `tag` or `children` are missing values.
         """
+        raise self._missing_value_error()
+
+    def _leaf_parts(self) -> tuple[str | None, str, dict[str, str] | None]:
+        raise self._missing_value_error()
+
+    def _missing_value_error(self) -> ValueError:
+        if self.tag is None:
+            return ValueError("'tag' attribute has no value")
+        return ValueError("'children' attribute has no value")
+
+    def _start_tag(self) -> str:
+        if self.tag is None:
+            raise ValueError("'tag' attribute has no value")
+        return f"<{self.tag}>"
+
+    def _start_parts(self) -> tuple[str, dict[str, str] | None]:
         if self.tag is None:
             raise ValueError("'tag' attribute has no value")
-        if self.children is None:
-            raise ValueError("'children' attribute has no value")
-        html_str = f"<{self.tag}>"
-        for child in self.children:
-            html_str += child.to_html()
-        html_str += f"</{self.tag}>"
-        return html_str
+        return self.tag, None
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from htmlnode import HTMLNode
+from inlinespan import InlineSpan
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+DEFAULT_MAX_BLOCKS = 4096
+"""Default number of converted blocks kept by a `ParseCache`"""
+DEFAULT_MAX_LINES = 16384
+"""Default number of tokenized lines kept by a `ParseCache`"""
+
+
+@dataclass
+class CacheStats:
+    """Number of lookups that were served from a cache and that weren't"""
+
+    hits: int = 0
+    misses: int = 0
+
+    def __str__(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate)"
+
+
+class LRUCache(Generic[K, V]):
+    """Mapping that keeps only the most recently used entries
+
+    Parameters
+    ----------
+    max_size: int
+        Maximum number of entries. Setting to 0 disables the cache, i.e., every lookup
+        is a miss and nothing is stored
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size: int = max_size
+        self.stats: CacheStats = CacheStats()
+        self._entries: OrderedDict[K, V] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Get the value stored for `key`, marking it as recently used
+
+        Returns
+        -------
+        V | None
+            The value stored for `key`. None if there is none
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        """Store `value` for `key`, evicting the least recently used entries if full"""
+        if self.max_size <= 0:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class ParseCache:
+    """Memoizes the conversion of markdown that repeats within and across pages
+
+    Has two tiers that are looked up by `markdown_to_html_node`:
+
+    - `blocks`: the `HTMLNode` of a block, keyed by its type, lines and the
+      `RenderOptions.fingerprint` and `RenderOptions.image_key` it was converted
+      with. Callers only ever receive copies of the cached nodes, so modifying a
+      converted tree doesn't affect the cache.
+    - `lines`: the `InlineSpan`s of a single line of inline markdown, keyed by the
+      text of the line. Only used while converting blocks that aren't cached
+      themselves.
+
+    A cache is not thread-safe. Every worker process of a build has its own.
+
+    Parameters
+    ----------
+    max_blocks: int
+        Maximum number of blocks kept. Setting to 0 disables the tier. Default:
+        `DEFAULT_MAX_BLOCKS`
+    max_lines: int
+        Maximum number of lines kept. Setting to 0 disables the tier. Default:
+        `DEFAULT_MAX_LINES`
+    """
+
+    def __init__(
+        self, max_blocks: int = DEFAULT_MAX_BLOCKS, max_lines: int = DEFAULT_MAX_LINES
+    ) -> None:
+        self.blocks: LRUCache[Hashable, HTMLNode] = LRUCache(max_blocks)
+        self.lines: LRUCache[str, tuple[InlineSpan, ...]] = LRUCache(max_lines)
+
+    def __str__(self) -> str:
+        return f"blocks: {self.blocks.stats}; lines: {self.lines.stats}"
+
+    def stats(self) -> dict[str, CacheStats]:
+        """Copies of the hit and miss counters of both tiers"""
+        return {
+            "blocks": CacheStats(self.blocks.stats.hits, self.blocks.stats.misses),
+            "lines": CacheStats(self.lines.stats.hits, self.lines.stats.misses),
+        }
+
+    def reset_stats(self) -> None:
+        self.blocks.stats = CacheStats()
+        self.lines.stats = CacheStats()
+
+    def add_stats(self, stats: dict[str, CacheStats]) -> None:
+        """Add the counters of another cache (e.g., of a worker process) to this one"""
+        for tier, tier_stats in (("blocks", self.blocks), ("lines", self.lines)):
+            tier_stats.stats.hits += stats[tier].hits
+            tier_stats.stats.misses += stats[tier].misses
@@ -0,0 +1,279 @@
+import os
+import struct
+import zlib
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from shutil import copyfile
+
+from build_manifest import hash_file
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+"""The first bytes of every PNG file"""
+KEPT_ANCILLARY_CHUNKS = frozenset(
+    {b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"cICP", b"mDCv", b"cLLi", b"sBIT"}
+)
+"""
+Ancillary chunks that change how the pixels are displayed (transparency and color
+management), which `optimize_png` keeps. Every other ancillary chunk (e.g., text,
+Exif and physical dimensions) is stripped.
+"""
+_ANIMATION_CHUNKS = frozenset({b"acTL", b"fcTL", b"fdAT"})
+_STRATEGIES = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+
+
+def is_png(path: Path) -> bool:
+    """Whether a path names a PNG file, judging by its suffix"""
+    return path.suffix.lower() == ".png"
+
+
+def _read_chunks(data: bytes) -> Iterator[tuple[bytes, bytes]]:
+    """The type and data of every chunk of a PNG file, up to and including IEND"""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    pos = len(PNG_SIGNATURE)
+    while pos + 12 <= len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, pos)
+        end = pos + 12 + length
+        if end > len(data):
+            break
+        body = data[pos + 8 : end - 4]
+        (crc,) = struct.unpack_from(">I", data, end - 4)
+        if zlib.crc32(chunk_type + body) != crc:
+            raise ValueError(f"{chunk_type!r} chunk is corrupted")
+        yield chunk_type, body
+        if chunk_type == b"IEND":
+            return
+        pos = end
+    raise ValueError("PNG file is truncated")
+
+
+def _chunk(chunk_type: bytes, body: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + body)
+    return struct.pack(">I4s", len(body), chunk_type) + body + struct.pack(">I", crc)
+
+
+def _deflate(raw: bytes, strategy: int) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def optimize_png(data: bytes) -> bytes:
+    """Losslessly make a PNG file smaller
+
+    The image data is decompressed and compressed again at the highest zlib level,
+    with every strategy in turn, keeping the smallest result in a single IDAT chunk.
+    Ancillary chunks are stripped except for `KEPT_ANCILLARY_CHUNKS`. The pixels,
+    including the filters chosen by the encoder for each row, are left unchanged.
+    Animated PNGs are returned as is, since their frames are stored outside of IDAT.
+
+    Parameters
+    ----------
+    data: bytes
+        The contents of a PNG file
+
+    Returns
+    -------
+    bytes
+        The contents of the optimized file, or `data` itself if it can't be made
+        smaller
+
+    Raises
+    ------
+    ValueError
+        If `data` is not a valid PNG file
+    """
+    chunks = list(_read_chunks(data))
+    if any(chunk_type in _ANIMATION_CHUNKS for chunk_type, _ in chunks):
+        return data
+    idat = b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT")
+    try:
+        raw = zlib.decompress(idat)
+    except zlib.error as e:
+        raise ValueError(f"image data is corrupted: {e}")
+    compressed = min((_deflate(raw, strategy) for strategy in _STRATEGIES), key=len)
+
+    out = [PNG_SIGNATURE]
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            if compressed:
+                out.append(_chunk(b"IDAT", compressed))
+                compressed = b""
+        elif chunk_type[:1].isupper() or chunk_type in KEPT_ANCILLARY_CHUNKS:
+            out.append(_chunk(chunk_type, body))
+    optimized = b"".join(out)
+    return optimized if len(optimized) < len(data) else data
+
+
+@dataclass
+class ImageReport:
+    """Summary of the work done by `optimize_images`
+
+    All paths are relative to the output directory.
+    """
+
+    hashes: dict[str, str] = field(default_factory=dict)
+    """Hash of the source of every image, to be passed to the next build"""
+    optimized: list[Path] = field(default_factory=list)
+    """Images that were optimized during this build"""
+    cached: list[Path] = field(default_factory=list)
+    """Images whose optimized version was taken from the cache"""
+    unchanged: list[Path] = field(default_factory=list)
+    """Images that were already up to date in the output directory"""
+    removed: list[Path] = field(default_factory=list)
+    """Previously optimized images that no longer exist in the source directory"""
+    saved_bytes: int = 0
+    """Bytes saved by the images optimized during this build"""
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.optimized)} optimized ({self.saved_bytes} bytes saved), "
+            f"{len(self.cached)} from cache, {len(self.unchanged)} unchanged, "
+            f"{len(self.removed)} removed"
+        )
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _optimize_job(src: Path, cache_path: Path) -> int:
+    """Optimize a single image into the cache
+
+    Files that are not valid PNG files are cached as is.
+
+    Returns
+    -------
+    int
+        The number of bytes saved
+    """
+    data = src.read_bytes()
+    try:
+        optimized = optimize_png(data)
+    except ValueError:
+        optimized = data
+    _write_file(cache_path, optimized)
+    return len(data) - len(optimized)
+
+
+def _same_contents(a: Path, b: Path) -> bool:
+    try:
+        if a.stat().st_size != b.stat().st_size:
+            return False
+        return a.read_bytes() == b.read_bytes()
+    except OSError:
+        return False
+
+
+def _put_cached(cache_path: Path, dest: Path) -> bool:
+    """Copy an image from the cache to `dest` by replacing it, unless it's identical
+
+    `dest` is never written in place, since it may be a hard link to its source.
+
+    Returns
+    -------
+    bool
+        True if `dest` was written. False if it already had the same contents
+    """
+    if _same_contents(cache_path, dest):
+        return False
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(dest.name + ".tmp")
+    try:
+        copyfile(cache_path, tmp_path)
+        tmp_path.replace(dest)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return True
+
+
+def optimize_images(
+    src_dir: Path | str,
+    output_dir: Path | str,
+    cache_dir: Path | str,
+    previous_hashes: dict[str, str] | None = None,
+    jobs: int = 1,
+) -> ImageReport:
+    """Put a losslessly optimized copy of every PNG file in a directory into another
+
+    Images are optimized with `optimize_png` and cached in `cache_dir` by the hash of
+    their source, so an image is only ever optimized once, even across builds and
+    output directories. Images whose source has the same hash as in the previous build
+    and that still exist in `output_dir` are skipped, and images in `output_dir` that
+    are identical to their optimized version are left in place. Images that were put
+    into `output_dir` by the previous build but no longer exist in `src_dir` are
+    deleted.
+
+    Parameters
+    ----------
+    src_dir: pathlib.Path | str
+        The directory containing the images, recursively
+    output_dir: pathlib.Path | str
+        The directory the images are put into, at the same relative paths
+    cache_dir: pathlib.Path | str
+        The directory of the cache of optimized images
+    previous_hashes: dict[str, str] | None
+        The `hashes` of the report of the previous build. Images put into
+        `output_dir` some other way (e.g., copied as is) can be taken over by mapping
+        them to an empty hash. Default: None
+    jobs: int
+        Number of worker processes optimizing images. Default: 1
+
+    Returns
+    -------
+    ImageReport
+        What was optimized, taken from the cache, left alone and removed
+    """
+    src_dir, output_dir, cache_dir = Path(src_dir), Path(output_dir), Path(cache_dir)
+    previous_hashes = previous_hashes or {}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    report = ImageReport()
+    pending: dict[Path, Path] = {}
+    for dir_path, _, file_names in os.walk(src_dir):
+        for file_name in sorted(file_names):
+            src = Path(dir_path, file_name)
+            if not is_png(src):
+                continue
+            rel_path = src.relative_to(src_dir)
+            src_hash = hash_file(src)
+            report.hashes[str(rel_path)] = src_hash
+            dest = output_dir / rel_path
+            if previous_hashes.get(str(rel_path)) == src_hash and dest.exists():
+                report.unchanged.append(rel_path)
+                continue
+            cache_path = cache_dir / f"{src_hash}.png"
+            if cache_path.exists():
+                if _put_cached(cache_path, dest):
+                    report.cached.append(rel_path)
+                else:
+                    report.unchanged.append(rel_path)
+            elif cache_path not in pending:
+                pending[cache_path] = src
+                report.optimized.append(rel_path)
+            else:
+                report.optimized.append(rel_path)
+
+    # Identical images are only optimized once
+    srcs, cache_paths = list(pending.values()), list(pending)
+    if jobs <= 1 or len(srcs) <= 1:
+        saved = list(map(_optimize_job, srcs, cache_paths))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            saved = list(executor.map(_optimize_job, srcs, cache_paths))
+    report.saved_bytes = sum(saved)
+    for rel_path in report.optimized:
+        cache_path = cache_dir / f"{report.hashes[str(rel_path)]}.png"
+        _put_cached(cache_path, output_dir / rel_path)
+
+    for rel_path in previous_hashes:
+        if rel_path not in report.hashes:
+            (output_dir / rel_path).unlink(missing_ok=True)
+            report.removed.append(Path(rel_path))
+    return report
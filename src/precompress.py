@@ -0,0 +1,204 @@
+import gzip
+import os
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from build_manifest import hash_file
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    zstd = None
+
+PRECOMPRESS_MIN_SIZE = 1024
+"""
+Size in bytes below which files are not precompressed by default. Compressing tiny
+files saves next to nothing and the compressed file may even be larger.
+"""
+PRECOMPRESS_SUFFIXES = (".html", ".css")
+"""Suffixes of the output files that are precompressed"""
+
+
+def _gzip(data: bytes) -> bytes:
+    # A fixed mtime keeps the output identical across builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _zstd(data: bytes) -> bytes:
+    return zstd.compress(data, level=19)  # type: ignore[union-attr]
+
+
+ENCODINGS: dict[str, Callable[[bytes], bytes]] = {".gz": _gzip}
+"""
+Suffix of every precompressed sibling that is written, mapped to the function
+compressing it. `.zst` is only available if the interpreter provides
+`compression.zstd`.
+"""
+if zstd is not None:
+    ENCODINGS[".zst"] = _zstd
+
+
+@dataclass
+class PrecompressReport:
+    """Summary of the work done by `precompress_tree`
+
+    All paths are relative to the output directory.
+    """
+
+    hashes: dict[str, str] = field(default_factory=dict)
+    """Hash of every precompressed file, to be passed to the next build"""
+    compressed: list[Path] = field(default_factory=list)
+    """Files that were new or changed and have been compressed"""
+    unchanged: list[Path] = field(default_factory=list)
+    """Files whose compressed siblings were already up to date"""
+    removed: list[Path] = field(default_factory=list)
+    """Previously compressed files whose siblings have been deleted"""
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.compressed)} compressed, {len(self.unchanged)} unchanged, "
+            f"{len(self.removed)} removed"
+        )
+
+
+def _siblings(path: Path, suffixes: Iterable[str]) -> list[Path]:
+    return [path.with_name(path.name + suffix) for suffix in suffixes]
+
+
+def remove_precompressed(output_dir: Path | str, rel_paths: Iterable[str]) -> None:
+    """Delete the precompressed siblings of files in `output_dir`
+
+    Parameters
+    ----------
+    output_dir: pathlib.Path | str
+        The output directory
+    rel_paths: Iterable[str]
+        Paths of the files relative to `output_dir`. The files themselves are kept
+    """
+    for rel_path in rel_paths:
+        for sibling in _siblings(Path(output_dir) / rel_path, ENCODINGS):
+            sibling.unlink(missing_ok=True)
+
+
+def precompress_file(path: Path, suffixes: Iterable[str] = tuple(ENCODINGS)) -> None:
+    """Write compressed siblings of a file (e.g., `index.html.gz`)
+
+    Parameters
+    ----------
+    path: pathlib.Path
+        The file to compress
+    suffixes: Iterable[str]
+        The suffixes of the siblings to write. Must be keys of `ENCODINGS`.
+        Default: every key of `ENCODINGS`
+    """
+    data = path.read_bytes()
+    for suffix in suffixes:
+        sibling = path.with_name(path.name + suffix)
+        tmp_path = sibling.with_name(sibling.name + ".tmp")
+        try:
+            tmp_path.write_bytes(ENCODINGS[suffix](data))
+            tmp_path.replace(sibling)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+def _precompress_job(
+    path: Path, previous_hash: str | None, suffixes: tuple[str, ...]
+) -> tuple[str, bool]:
+    """Compress a single file unless its siblings are up to date
+
+    Returns
+    -------
+    tuple[str, bool]
+        The hash of the file and whether it was compressed
+    """
+    file_hash = hash_file(path)
+    if file_hash == previous_hash and all(
+        sibling.exists() for sibling in _siblings(path, suffixes)
+    ):
+        return file_hash, False
+    precompress_file(path, suffixes)
+    return file_hash, True
+
+
+def _find_files(output_dir: Path, min_size: int) -> list[Path]:
+    """Every file with a suffix in `PRECOMPRESS_SUFFIXES` that is large enough"""
+    paths: list[Path] = []
+    for dir_path, _, file_names in os.walk(output_dir):
+        for file_name in file_names:
+            path = Path(dir_path, file_name)
+            if file_name.endswith(PRECOMPRESS_SUFFIXES) and (
+                path.stat().st_size >= min_size
+            ):
+                paths.append(path)
+    paths.sort()
+    return paths
+
+
+def precompress_tree(
+    output_dir: Path | str,
+    previous_hashes: dict[str, str] | None = None,
+    jobs: int = 1,
+    min_size: int = PRECOMPRESS_MIN_SIZE,
+) -> PrecompressReport:
+    """Write compressed siblings of every HTML and CSS file in a directory
+
+    Static hosts can serve the siblings (e.g., `index.html.gz`) to clients that accept
+    the encoding instead of compressing every response. Files whose contents have the
+    same hash as in the previous build and whose siblings still exist are skipped.
+    Siblings of files that no longer exist or have become smaller than `min_size` are
+    deleted.
+
+    Parameters
+    ----------
+    output_dir: pathlib.Path | str
+        The directory to precompress, recursively
+    previous_hashes: dict[str, str] | None
+        The `hashes` of the report of the previous build. Default: None
+    jobs: int
+        Number of worker processes compressing files. Default: 1
+    min_size: int
+        Files smaller than this many bytes are not compressed. Default:
+        `PRECOMPRESS_MIN_SIZE`
+
+    Returns
+    -------
+    PrecompressReport
+        What was compressed, left alone and removed
+    """
+    output_dir = Path(output_dir)
+    previous_hashes = previous_hashes or {}
+    suffixes = tuple(ENCODINGS)
+
+    paths = _find_files(output_dir, min_size)
+    rel_paths = [str(path.relative_to(output_dir)) for path in paths]
+    previous = [previous_hashes.get(rel_path) for rel_path in rel_paths]
+
+    if jobs <= 1 or len(paths) <= 1:
+        results = list(map(_precompress_job, paths, previous, [suffixes] * len(paths)))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(
+                executor.map(
+                    _precompress_job,
+                    paths,
+                    previous,
+                    [suffixes] * len(paths),
+                    chunksize=max(1, len(paths) // (4 * jobs)),
+                )
+            )
+
+    report = PrecompressReport()
+    for rel_path, (file_hash, compressed) in zip(rel_paths, results):
+        report.hashes[rel_path] = file_hash
+        if compressed:
+            report.compressed.append(Path(rel_path))
+        else:
+            report.unchanged.append(Path(rel_path))
+
+    stale = [rel_path for rel_path in previous_hashes if rel_path not in report.hashes]
+    remove_precompressed(output_dir, stale)
+    report.removed.extend(map(Path, stale))
+    return report
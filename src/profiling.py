@@ -0,0 +1,118 @@
+import json
+from pathlib import Path
+from time import perf_counter
+
+PHASES: tuple[str, ...] = (
+    "read",
+    "extract_title",
+    "blocks",
+    "inline",
+    "to_html",
+    "template",
+    "write",
+)
+"""
+Phases of generating a page, in the order they happen:
+
+- `read`: reading the markdown file and splitting off its front matter
+- `extract_title`: finding the title of the page
+- `blocks`: splitting the markdown into blocks and classifying them
+- `inline`: parsing the inline markdown of every line into `TextNode`s and `LeafNode`s
+- `to_html`: converting the `HTMLNode` tree into HTML
+- `template`: rendering the page template
+- `write`: writing the page to disk
+"""
+
+
+class PageProfile:
+    """Time spent in each phase of generating a single page
+
+    Time is recorded with `lap`, which attributes the time since the previous lap (or
+    since the profile was created) to a phase. Phases can be lapped repeatedly, in
+    which case the times add up.
+
+    Parameters
+    ----------
+    path: pathlib.Path | str
+        Path to the markdown file of the page
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path: str = str(path)
+        self.phases: dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self._last: float = perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Attribute the time elapsed since the last lap to `phase`"""
+        now = perf_counter()
+        self.phases[phase] += now - self._last
+        self._last = now
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+
+class BuildProfile:
+    """Profiles of every page generated during a build"""
+
+    def __init__(self) -> None:
+        self.pages: list[PageProfile] = []
+
+    def phase_totals(self) -> dict[str, float]:
+        """Time spent in each phase summed over all pages"""
+        totals = dict.fromkeys(PHASES, 0.0)
+        for page in self.pages:
+            for phase, seconds in page.phases.items():
+                totals[phase] += seconds
+        return totals
+
+    def write_json(self, path: Path | str) -> None:
+        """Write the profile as JSON, with all times in seconds
+
+        Parameters
+        ----------
+        path: pathlib.Path | str
+            Path to the JSON file
+        """
+        data = {
+            "totals": self.phase_totals(),
+            "pages": [
+                {"path": page.path, "total": page.total, "phases": page.phases}
+                for page in self.pages
+            ],
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def format_table(self, top_n: int = 10) -> str:
+        """Format the slowest pages as a table, with all times in milliseconds
+
+        Parameters
+        ----------
+        top_n: int
+            Number of pages listed. Default: 10
+
+        Returns
+        -------
+        str
+            A table of the slowest pages followed by the totals over all pages
+        """
+        slowest = sorted(self.pages, key=lambda page: page.total, reverse=True)
+        rows = [(page.path, page.total, page.phases) for page in slowest[:top_n]]
+        totals = self.phase_totals()
+        rows.append((f"all {len(self.pages)} pages", sum(totals.values()), totals))
+
+        path_width = max(len(row[0]) for row in rows)
+        col_widths = [max(len(phase), 8) for phase in PHASES]
+        header = f"{'page':<{path_width}}  {'total':>8}  " + "  ".join(
+            f"{phase:>{width}}" for phase, width in zip(PHASES, col_widths)
+        )
+        lines = [header, "-" * len(header)]
+        for path, total, phases in rows:
+            cells = "  ".join(
+                f"{phases[phase] * 1000:>{width}.2f}"
+                for phase, width in zip(PHASES, col_widths)
+            )
+            lines.append(f"{path:<{path_width}}  {total * 1000:>8.2f}  {cells}")
+        return "\n".join(lines)
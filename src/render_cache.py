@@ -0,0 +1,182 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+from markdown_converters import CONVERTER_VERSION
+from parse_cache import CacheStats
+from render_options import RenderOptions
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+"""Default size limit of the rendered pages stored in a `RenderCache`"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+"""
+
+
+class RenderCache:
+    """Persistent cache of the title and HTML content of converted markdown documents
+
+    Entries are stored in a single SQLite file and addressed by a hash of the markdown,
+    the converter version and the `RenderOptions` (of which only the sizes of the
+    images the markdown refers to count), so they stay valid across builds, checkouts
+    and output directories. Every process of a build opens its own
+    `RenderCache` on the same file.
+
+    Lookups and new entries are written out by `flush`. `close` also enforces the size
+    limit by evicting the least recently used entries.
+
+    Parameters
+    ----------
+    path: pathlib.Path | str
+        Path to the SQLite file. Created if it doesn't exist
+    max_bytes: int
+        Maximum total size of the stored titles and contents. Default:
+        `DEFAULT_MAX_BYTES`
+    """
+
+    def __init__(self, path: Path | str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path: Path = Path(path)
+        self.max_bytes: int = max_bytes
+        self.stats: CacheStats = CacheStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._used: dict[str, int] = {}
+
+    @staticmethod
+    def key(markdown: str, options: RenderOptions) -> str:
+        """Address of the rendered content of `markdown`
+
+        Parameters
+        ----------
+        markdown: str
+            A markdown document without front matter
+        options: RenderOptions
+            The options the document is converted with
+
+        Returns
+        -------
+        str
+            The hex digest identifying the document and how it is converted
+        """
+        images = options.image_key(markdown)
+        digest = hashlib.sha256(
+            f"{CONVERTER_VERSION}\0{options.fingerprint}\0{images!r}\0".encode()
+        )
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> tuple[str, str] | None:
+        """Look up the title and content stored for `key`
+
+        Returns
+        -------
+        tuple[str, str] | None
+            The title and HTML content. None if nothing is stored for `key`
+        """
+        row = self._conn.execute(
+            "SELECT title, content FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._used[key] = time.time_ns()
+        return row[0], row[1]
+
+    def put(self, key: str, title: str, content: str) -> None:
+        """Store the title and content of a document"""
+        size = len(title.encode()) + len(content.encode())
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+            (key, title, content, size, time.time_ns()),
+        )
+
+    def flush(self) -> None:
+        """Write new entries and the times entries were last used to disk"""
+        self._conn.executemany(
+            "UPDATE pages SET last_used = ? WHERE key = ?",
+            [(used, key) for key, used in self._used.items()],
+        )
+        self._used.clear()
+        self._conn.commit()
+
+    def evict(self) -> int:
+        """Remove the least recently used entries until the size limit is met
+
+        Returns
+        -------
+        int
+            The number of entries removed
+        """
+        self.flush()
+        query = "SELECT COALESCE(SUM(size), 0) FROM pages"
+        excess = self._conn.execute(query).fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return 0
+        keys: list[tuple[str]] = []
+        rows = self._conn.execute("SELECT key, size FROM pages ORDER BY last_used")
+        for key, size in rows:
+            if excess <= 0:
+                break
+            keys.append((key,))
+            excess -= size
+        rows.close()
+        self._conn.executemany("DELETE FROM pages WHERE key = ?", keys)
+        self._conn.commit()
+        return len(keys)
+
+    def close(self) -> None:
+        """Flush, enforce the size limit and close the database"""
+        self.evict()
+        self._conn.close()
+
+    def export_to(self, path: Path | str) -> None:
+        """Write a compacted copy of the cache to a single file
+
+        Parameters
+        ----------
+        path: pathlib.Path | str
+            Path to the file to create. Must not exist yet
+        """
+        self.flush()
+        self._conn.execute("VACUUM INTO ?", (str(path),))
+
+    def import_from(self, path: Path | str) -> int:
+        """Add the entries of an exported cache that aren't stored yet
+
+        Parameters
+        ----------
+        path: pathlib.Path | str
+            Path to a file written by `export_to`
+
+        Returns
+        -------
+        int
+            The number of entries added
+        """
+        self.flush()
+        self._conn.execute("ATTACH DATABASE ? AS imported", (str(path),))
+        try:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO pages SELECT * FROM imported.pages"
+            )
+            added = cursor.rowcount
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        finally:
+            self._conn.execute("DETACH DATABASE imported")
+        return added
@@ -0,0 +1,180 @@
+import hashlib
+import re
+from dataclasses import dataclass, field
+from functools import cached_property
+
+_TEMPLATE_URL_PATTERN = re.compile(r"""(\b(?:href|src)=["'])(/(?!/)[^"']*)""")
+# The URL of every link and image of a line of markdown, along with some text that
+# only looks like one. Links and images never span lines
+_MARKDOWN_URL_PATTERN = re.compile(r"\]\(([^)\n]*)\)")
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """Settings that change the HTML generated for a page
+
+    Options are immutable and hashable so that they can be shared between pages and
+    sent to worker processes. Caches key their entries by `fingerprint` instead of the
+    options themselves, since the options can hold thousands of asset URLs.
+
+    The image sizes only affect the pages that refer to the images, so they are left
+    out of `fingerprint` and of comparisons between options. Caches add the
+    `image_key` of the markdown they convert to their keys instead.
+
+    Parameters
+    ----------
+    basepath: str
+        The path the site is served from, ending in a slash. Root-relative URLs (e.g.,
+        "/index.css") of links, images and templates are prefixed with it instead of
+        "/". Default: "/"
+    minify: bool
+        Whether pages are written as minified HTML. Both the HTML converted from the
+        markdown and the templates are minified. Default: False
+    asset_urls: tuple[tuple[str, str], ...]
+        Pairs of root-relative URLs of assets (e.g., "/index.css") and the
+        root-relative URLs they are served from instead (e.g., the URL of a
+        fingerprinted copy). Links, images and templates referring to an asset are
+        rewritten before the basepath is applied. Default: ()
+    image_sizes: tuple[tuple[str, int, int], ...]
+        Root-relative URLs of images (e.g., "/images/a.png") with their width and
+        height in pixels. Images with one of these URLs get `width` and `height`
+        attributes, so the browser can lay out the page before they are loaded, and
+        are loaded lazily. Default: ()
+    """
+
+    basepath: str = "/"
+    minify: bool = False
+    asset_urls: tuple[tuple[str, str], ...] = ()
+    image_sizes: tuple[tuple[str, int, int], ...] = field(
+        default=(), compare=False, repr=False
+    )
+
+    @cached_property
+    def fingerprint(self) -> str:
+        """Hex digest identifying the options, computed once per instance"""
+        return hashlib.sha256(repr(self).encode()).hexdigest()
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+
+    @cached_property
+    def _asset_url_map(self) -> dict[str, str]:
+        return dict(self.asset_urls)
+
+    @cached_property
+    def _image_size_map(self) -> dict[str, tuple[int, int]]:
+        return {url: (width, height) for url, width, height in self.image_sizes}
+
+    def referenced_images(self, markdown: str) -> dict[str, tuple[int, int] | None]:
+        """Root-relative URLs referred to by markdown, with the sizes of the images
+
+        Parameters
+        ----------
+        markdown: str
+            Text written in markdown format
+
+        Returns
+        -------
+        dict[str, tuple[int, int] | None]
+            The URL of every root-relative link and image (and of text that looks
+            like one) mapped to its width and height from `image_sizes`, or to None if
+            its size isn't known
+        """
+        urls: dict[str, tuple[int, int] | None] = {}
+        if "](" not in markdown:
+            return urls
+        for match in _MARKDOWN_URL_PATTERN.finditer(markdown):
+            url = match[1]
+            if url.startswith("/") and not url.startswith("//"):
+                urls[url] = self._image_size_map.get(url)
+        return urls
+
+    def image_key(self, markdown: str) -> tuple[tuple[str, int, int], ...]:
+        """The sizes of the images markdown refers to, sorted by URL
+
+        Identifies, together with `fingerprint`, how the markdown is converted. Empty
+        if `image_sizes` is empty or none of the images have a known size.
+        """
+        if not self.image_sizes:
+            return ()
+        return tuple(
+            sorted(
+                (url, *size)
+                for url, size in self.referenced_images(markdown).items()
+                if size is not None
+            )
+        )
+
+    def image_props(self, url: str) -> dict[str, str]:
+        """Attributes of an image besides its `src` and `alt` attributes
+
+        Parameters
+        ----------
+        url: str
+            The URL of the image, before it is rewritten by `rewrite_url`
+
+        Returns
+        -------
+        dict[str, str]
+            The dimensions and loading hints of the image if its size is known from
+            `image_sizes`. Empty otherwise
+        """
+        if not self.image_sizes:
+            return {}
+        size = self._image_size_map.get(url)
+        if size is None:
+            return {}
+        return {
+            "width": str(size[0]),
+            "height": str(size[1]),
+            "loading": "lazy",
+            "decoding": "async",
+        }
+
+    def rewrite_url(self, url: str) -> str:
+        """Resolve a URL against the asset URLs and the basepath
+
+        Only root-relative URLs are rewritten. Protocol-relative URLs (e.g.,
+        "//example.com/image.png"), absolute URLs and relative URLs are returned as is.
+
+        Parameters
+        ----------
+        url: str
+            The URL of a link or image
+
+        Returns
+        -------
+        str
+            The URL as it should appear in the generated HTML
+        """
+        if (
+            (self.basepath == "/" and not self.asset_urls)
+            or not url.startswith("/")
+            or url.startswith("//")
+        ):
+            return url
+        if self.asset_urls:
+            url = self._asset_url_map.get(url, url)
+        if self.basepath == "/":
+            return url
+        return self.basepath + url[1:]
+
+    def rewrite_template(self, source: str) -> str:
+        """Resolve the root-relative `href` and `src` attributes of a template
+
+        Parameters
+        ----------
+        source: str
+            The source of a template
+
+        Returns
+        -------
+        str
+            The source with every root-relative `href` and `src` attribute rewritten
+            by `rewrite_url`
+        """
+        if self.basepath == "/" and not self.asset_urls:
+            return source
+        return _TEMPLATE_URL_PATTERN.sub(
+            lambda match: match[1] + self.rewrite_url(match[2]), source
+        )
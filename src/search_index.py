@@ -0,0 +1,331 @@
+import json
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from html_minify import BLOCK_ELEMENTS
+from htmlnode import HTMLNode
+from markdown_converters import CONVERTER_VERSION
+
+SEARCH_DIR_NAME = "search"
+"""Name of the directory in the output directory the search index is written to"""
+SEARCH_INDEX_VERSION = 1
+"""Version of the format of the files written by `SearchIndex.write`"""
+PREFIX_LENGTH = 2
+"""Default number of leading characters of a term that pick the shard it is in"""
+
+_WORD = re.compile(r"[^\W_]+")
+# Elements whose start and end separate the words of the text around them
+_SEPARATING_ELEMENTS = BLOCK_ELEMENTS | {"br", "img"}
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase terms, i.e., runs of letters and digits"""
+    return _WORD.findall(text.lower())
+
+
+class PageTerms:
+    """Terms of a single page and their positions, collected while it is converted
+
+    Positions count the terms of the page from 0 in the order they appear in.
+    """
+
+    def __init__(self) -> None:
+        self.title: str = ""
+        self.positions: dict[str, list[int]] = {}
+        self._count: int = 0
+
+    def add_text(self, text: str) -> None:
+        """Add the terms of a piece of text that follows everything added so far"""
+        for term in tokenize(text):
+            self.positions.setdefault(term, []).append(self._count)
+            self._count += 1
+
+    def add_node(self, node: HTMLNode) -> None:
+        """Add the terms of the text of a converted tree
+
+        The text of sibling inline elements is joined before it is split into terms,
+        so a word split by markup (e.g., `foo<b>bar</b>`) is a single term. The text of
+        different blocks is never joined. The tree is walked without recursion.
+        """
+        pending: list[str] = []
+        # None marks the end of an element that separates words
+        stack: list[HTMLNode | None] = [node]
+        while stack:
+            current = stack.pop()
+            if current is None or current.tag in _SEPARATING_ELEMENTS:
+                self.add_text("".join(pending))
+                pending.clear()
+                if current is None:
+                    continue
+                stack.append(None)
+            if current.children is None:
+                if current.value:
+                    pending.append(current.value)
+            else:
+                stack.extend(reversed(current.children))
+        self.add_text("".join(pending))
+
+
+def _gaps(positions: list[int]) -> list[int]:
+    """Positions as the first one followed by the difference to the previous one"""
+    return [positions[0]] + [b - a for a, b in zip(positions, positions[1:])]
+
+
+@dataclass
+class SearchIndexReport:
+    """Summary of the work done by `SearchIndex.write`
+
+    All paths are relative to the output directory.
+    """
+
+    files: list[str] = field(default_factory=list)
+    """Every file of the index, to be passed to the next build"""
+    written: list[str] = field(default_factory=list)
+    """Shards that were new or changed and have been written"""
+    removed: list[str] = field(default_factory=list)
+    """Files of the previous build that are no longer part of the index"""
+
+    def __str__(self) -> str:
+        return f"{len(self.written)} shard(s) written, {len(self.removed)} removed"
+
+
+def _remove_files(output_dir: Path, rel_paths: Iterable[str]) -> list[str]:
+    """Delete files of the index and the directories of the index they leave empty"""
+    removed: list[str] = []
+    for rel_path in rel_paths:
+        path = output_dir / rel_path
+        if path.exists():
+            path.unlink()
+            removed.append(rel_path)
+    if removed:
+        search_dir = output_dir / SEARCH_DIR_NAME
+        for path in (search_dir / "terms", search_dir):
+            try:
+                path.rmdir()
+            except OSError:
+                pass
+    return removed
+
+
+def _write_if_changed(path: Path, data: str) -> bool:
+    try:
+        if path.read_text() == data:
+            return False
+    except OSError:
+        pass
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        tmp_path.write_text(data)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return True
+
+
+class SearchIndex:
+    """Inverted index of the terms of every page, kept up to date across builds
+
+    The terms of every page are collected into a `PageTerms` while the page is
+    converted and recorded with `record`. They are cached in `cache_path` with the
+    hash of the source of the page, so a page whose source was indexed before (even
+    under another path) keeps its terms without being converted again, whether it is
+    skipped by a build or rendered from a `RenderCache`. `write` turns
+    the terms of all pages into an inverted index in the output directory, sharded by
+    term prefix so that a browser only loads the terms it looks up:
+
+    - `search/index.json`: the format version, the prefix length, the URL and title of
+      every page (the id of a page is its position in this list) and the prefixes of
+      the shards
+    - `search/terms/<prefix>.json`: every term starting with the prefix (terms shorter
+      than the prefix length are their own prefix), mapped to a list of postings. A
+      posting is the id of a page followed by the positions of the term in the page,
+      each as the difference to the previous position
+
+    Parameters
+    ----------
+    cache_path: pathlib.Path | str | None
+        Path to the JSON file the terms of the pages are cached in between builds.
+        Setting to `None` disables the cache. Default: None
+    """
+
+    def __init__(self, cache_path: Path | str | None = None) -> None:
+        self.cache_path: Path | None = None if cache_path is None else Path(cache_path)
+        self.pages: dict[str, dict] = {}
+        # Source of a page with each hash, to find the terms of moved and copied pages
+        self._sources: dict[str, str] = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def _load(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            data = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return
+        if data.get("converter_version") == CONVERTER_VERSION:
+            self.pages = data.get("pages", {})
+            self._sources = {page["hash"]: src for src, page in self.pages.items()}
+
+    def _page_with_hash(self, src_hash: str) -> dict | None:
+        src = self._sources.get(src_hash)
+        page = None if src is None else self.pages.get(src)
+        if page is None or page["hash"] != src_hash:
+            return None
+        return page
+
+    def needs_terms(self, src: Path, src_hash: str) -> bool:
+        """Whether the terms of a page have to be collected by converting it
+
+        Parameters
+        ----------
+        src: pathlib.Path
+            Path to the source markdown file of the page
+        src_hash: str
+            Hash of the current contents of `src`
+
+        Returns
+        -------
+        bool
+            True if no page with the same source hash has been recorded. False
+            otherwise
+        """
+        page = self.pages.get(str(src))
+        if page is not None and page["hash"] == src_hash:
+            return False
+        return self._page_with_hash(src_hash) is None
+
+    def record(
+        self, src: Path, src_hash: str, url: str, terms: PageTerms | None = None
+    ) -> None:
+        """Record a page as being part of the current build
+
+        Parameters
+        ----------
+        src: pathlib.Path
+            Path to the source markdown file of the page
+        src_hash: str
+            Hash of the current contents of `src`
+        url: str
+            The URL of the page
+        terms: PageTerms | None
+            The terms of the page. Setting to `None` reuses the terms recorded for the
+            same source hash, which requires `needs_terms` to be False. Default: None
+        """
+        if terms is None:
+            page = self.pages.get(str(src))
+            if page is None or page["hash"] != src_hash:
+                page = self._page_with_hash(src_hash)
+            if page is None:
+                raise ValueError(f"no terms recorded for '{src}'")
+            title, positions = page["title"], page["terms"]
+        else:
+            title, positions = terms.title, terms.positions
+        self.pages[str(src)] = {
+            "hash": src_hash,
+            "url": url,
+            "title": title,
+            "terms": positions,
+        }
+        self._sources[src_hash] = str(src)
+
+    def remove(self, src: Path) -> None:
+        """Remove a page from the index"""
+        self.pages.pop(str(src), None)
+
+    def prune(self, srcs: set[str]) -> None:
+        """Remove every page whose source is not in `srcs`"""
+        self.pages = {src: page for src, page in self.pages.items() if src in srcs}
+
+    def save(self) -> None:
+        """Write the terms of the pages to the cache"""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"converter_version": CONVERTER_VERSION, "pages": self.pages}
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, separators=(",", ":"), sort_keys=True))
+        tmp_path.replace(self.cache_path)
+
+    def write(
+        self,
+        output_dir: Path | str,
+        previous_files: Iterable[str] = (),
+        prefix_length: int = PREFIX_LENGTH,
+    ) -> SearchIndexReport:
+        """Write the sharded inverted index to `SEARCH_DIR_NAME` in `output_dir`
+
+        Only shards whose contents changed are written. Files written by a previous
+        build that are no longer part of the index (e.g., shards that no longer have
+        any terms) are deleted. Any other file in the output directory is left alone.
+
+        Parameters
+        ----------
+        output_dir: pathlib.Path | str
+            The output directory
+        previous_files: Iterable[str]
+            The files of the index written by the previous build
+            (`SearchIndexReport.files`). Default: ()
+        prefix_length: int
+            Number of leading characters of a term that pick its shard. Default:
+            `PREFIX_LENGTH`
+
+        Returns
+        -------
+        SearchIndexReport
+            The files of the index and what was done to them
+        """
+        output_dir = Path(output_dir)
+        search_dir = output_dir / SEARCH_DIR_NAME
+        terms_dir = search_dir / "terms"
+        terms_dir.mkdir(parents=True, exist_ok=True)
+
+        pages = sorted(self.pages.values(), key=lambda page: page["url"])
+        shards: dict[str, dict[str, list[list[int]]]] = {}
+        for page_id, page in enumerate(pages):
+            for term, positions in page["terms"].items():
+                postings = shards.setdefault(term[:prefix_length], {})
+                postings.setdefault(term, []).append([page_id, *_gaps(positions)])
+
+        report = SearchIndexReport()
+        for prefix, postings in shards.items():
+            data = json.dumps(postings, separators=(",", ":"), sort_keys=True)
+            path = terms_dir / f"{prefix}.json"
+            rel_path = path.relative_to(output_dir).as_posix()
+            report.files.append(rel_path)
+            if _write_if_changed(path, data):
+                report.written.append(rel_path)
+        index_path = search_dir / "index.json"
+        report.files.append(index_path.relative_to(output_dir).as_posix())
+        current = set(report.files)
+        report.removed = _remove_files(
+            output_dir, [path for path in previous_files if path not in current]
+        )
+        index = {
+            "version": SEARCH_INDEX_VERSION,
+            "prefix_length": prefix_length,
+            "pages": [[page["url"], page["title"]] for page in pages],
+            "shards": sorted(shards),
+        }
+        _write_if_changed(index_path, json.dumps(index, separators=(",", ":")))
+        return report
+
+
+def remove_search_index(output_dir: Path | str, rel_paths: Iterable[str]) -> None:
+    """Delete the files written by `SearchIndex.write`
+
+    The directories of the index are removed as well if that leaves them empty.
+
+    Parameters
+    ----------
+    output_dir: pathlib.Path | str
+        The output directory
+    rel_paths: Iterable[str]
+        Paths of the files of the index relative to `output_dir`
+        (`SearchIndexReport.files`). No other file is deleted
+    """
+    _remove_files(Path(output_dir), rel_paths)
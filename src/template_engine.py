@@ -0,0 +1,179 @@
+import hashlib
+from collections.abc import Callable
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+from html_minify import minify_template
+from render_options import RenderOptions
+
+_CONTENT_MARKER = "\0Content\0"
+"""Stands in for the content of a page in `TemplateEngine.render_around_content`"""
+
+
+class _RewritingLoader(FileSystemLoader):
+    """Loads templates from a directory and applies `RenderOptions` to their source
+
+    The source is rewritten before it is compiled, so root-relative URLs in templates
+    are resolved (and templates are minified, if enabled) once per template instead of
+    once per rendered page.
+    """
+
+    def __init__(self, searchpath: Path, options: RenderOptions) -> None:
+        super().__init__(searchpath)
+        self.options: RenderOptions = options
+
+    def get_source(
+        self, environment: Environment, template: str
+    ) -> tuple[str, str, Callable[[], bool]]:
+        source, filename, uptodate = super().get_source(environment, template)
+        source = self.options.rewrite_template(source)
+        if self.options.minify:
+            source = minify_template(source)
+        return source, filename, uptodate
+
+
+class TemplateEngine:
+    """Renders pages using compiled Jinja templates
+
+    A single `TemplateEngine` is meant to be created once per build (and once per
+    worker process) so that templates are only loaded and compiled once. Templates are
+    looked up in the directory containing `template_path`, which means templates in that
+    directory can extend each other (e.g., `{% extends "template.html" %}`) and pages
+    can select any of them by name.
+
+    Parameters
+    ----------
+    template_path: pathlib.Path | str
+        Path to the default template used to render pages
+    cache_dir: pathlib.Path | str | None
+        Directory used to store compiled template bytecode between runs. Setting to
+        `None` disables the on-disk cache. Default: None
+    options: RenderOptions | None
+        Options of the pages rendered with this engine. They are applied to the
+        templates when they are loaded and to the markdown of every page by
+        `render_page`. Setting to `None` selects the default options. Default: None
+    """
+
+    def __init__(
+        self,
+        template_path: Path | str,
+        cache_dir: Path | str | None = None,
+        options: RenderOptions | None = None,
+    ) -> None:
+        self.template_path: Path = Path(template_path)
+        self.cache_dir: Path | None = None if cache_dir is None else Path(cache_dir)
+        self.options: RenderOptions = RenderOptions() if options is None else options
+
+        bytecode_cache = None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(self.cache_dir))
+        self.env: Environment = Environment(
+            loader=_RewritingLoader(self.template_dir, self.options),
+            bytecode_cache=bytecode_cache,
+        )
+
+    @property
+    def template_dir(self) -> Path:
+        return self.template_path.parent
+
+    def set_options(self, options: RenderOptions) -> None:
+        """Change the options of the pages rendered with this engine
+
+        Templates that have already been compiled are discarded, so they are loaded
+        again with the new options, unless only the image sizes changed, which
+        templates don't use.
+
+        Parameters
+        ----------
+        options: RenderOptions
+            The new options
+        """
+        changed = options != self.options
+        self.options = options
+        self.env.loader.options = options  # type: ignore[union-attr]
+        if changed and self.env.cache is not None:
+            self.env.cache.clear()
+
+    def get_template(self, name: str | None = None) -> Template:
+        """Get a compiled template
+
+        Parameters
+        ----------
+        name: str | None
+            Name of the template relative to the template directory. Setting to `None`
+            selects the default template. Default: None
+
+        Returns
+        -------
+        jinja2.Template
+            The compiled template
+        """
+        return self.env.get_template(name or self.template_path.name)
+
+    def render(self, title: str, content: str, template: str | None = None) -> str:
+        """Render a page
+
+        Parameters
+        ----------
+        title: str
+            The title of the page
+        content: str
+            The HTML content of the page
+        template: str | None
+            Name of the template to use. Setting to `None` selects the default
+            template. Default: None
+
+        Returns
+        -------
+        str
+            The rendered page
+        """
+        return self.get_template(template).render(Title=title, Content=content)
+
+    def render_around_content(
+        self, title: str, template: str | None = None
+    ) -> tuple[str, str] | None:
+        """Render a page without its content, split where the content belongs
+
+        Lets the content of a page be written between the two parts as it is
+        generated instead of being passed to the template as a whole.
+
+        Parameters
+        ----------
+        title: str
+            The title of the page
+        template: str | None
+            Name of the template to use. Setting to `None` selects the default
+            template. Default: None
+
+        Returns
+        -------
+        tuple[str, str] | None
+            The rendered page before and after the content. `None` if the template
+            doesn't insert the content exactly once as is (e.g., it is passed through a
+            filter), in which case the page has to be rendered with `render`
+        """
+        page = self.get_template(template).render(Title=title, Content=_CONTENT_MARKER)
+        before, sep, after = page.partition(_CONTENT_MARKER)
+        if not sep or _CONTENT_MARKER in after:
+            return None
+        return before, after
+
+    def fingerprint(self) -> str:
+        """Hash of every template that pages can select
+
+        Covers all HTML files in the template directory so that changing a layout a
+        template inherits from is detected as well.
+
+        Returns
+        -------
+        str
+            The hex digest of the names and contents of the templates
+        """
+        digest = hashlib.sha256()
+        for path in sorted(self.template_dir.glob("*.html")):
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
@@ -0,0 +1,135 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from build_manifest import BuildManifest, hash_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.template = self.root / "template.html"
+        self.template.write_text("<html>{{ Content }}</html>")
+        self.manifest_path = self.root / "manifest.json"
+        self.src = self.root / "index.md"
+        self.src.write_text("# Title")
+        self.dest = self.root / "docs" / "index.html"
+        self.dest.parent.mkdir()
+        self.dest.write_text("<html></html>")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _manifest(
+        self,
+        basepath: str = "/",
+        minify: bool = False,
+        asset_urls: dict[str, str] | None = None,
+        image_sizes: dict[str, tuple[int, int]] | None = None,
+    ) -> BuildManifest:
+        return BuildManifest(
+            self.manifest_path,
+            hash_file(self.template),
+            basepath,
+            minify,
+            asset_urls,
+            image_sizes,
+        )
+
+    def _build(self) -> BuildManifest:
+        manifest = self._manifest()
+        src_hash = hash_file(self.src)
+        manifest.record(self.src, self.dest, src_hash)
+        manifest.save()
+        return manifest
+
+    def test_new_page_needs_build(self):
+        manifest = self._manifest()
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_unchanged_page_skipped(self):
+        self._build()
+        manifest = self._manifest()
+        self.assertFalse(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_changed_source_needs_build(self):
+        self._build()
+        self.src.write_text("# Another title")
+        manifest = self._manifest()
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_changed_template_needs_build(self):
+        self._build()
+        self.template.write_text("<html><body>{{ Content }}</body></html>")
+        manifest = self._manifest()
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_changed_basepath_needs_build(self):
+        self._build()
+        manifest = self._manifest("/blog/")
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_changed_minify_needs_build(self):
+        self._build()
+        manifest = self._manifest(minify=True)
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_changed_asset_urls_needs_build(self):
+        self._build()
+        manifest = self._manifest(asset_urls={"/index.css": "/index.0123abcd.css"})
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_changed_image_sizes_needs_build(self):
+        other_src = self.root / "other.md"
+        other_dest = self.root / "docs" / "other.html"
+        other_dest.write_text("<html></html>")
+        manifest = self._manifest(image_sizes={"/a.png": (640, 480)})
+        images = {"/a.png": (640, 480), "/b.png": None, "/about": None}
+        manifest.record(self.src, self.dest, hash_file(self.src), images)
+        manifest.record(other_src, other_dest, "1", {"/c.png": None})
+        manifest.save()
+        manifest = self._manifest(image_sizes={"/a.png": (640, 480), "/c.png": (1, 1)})
+        self.assertFalse(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+        # Only the pages that refer to a changed image are rebuilt
+        self.assertTrue(manifest.needs_build(other_src, other_dest, "1"))
+        for image_sizes in (
+            {"/a.png": (320, 240)},
+            {},
+            {"/a.png": (640, 480), "/b.png": (1, 1)},
+        ):
+            manifest = self._manifest(image_sizes=image_sizes)
+            self.assertTrue(
+                manifest.needs_build(self.src, self.dest, hash_file(self.src))
+            )
+
+    def test_skipped_page_keeps_images(self):
+        manifest = self._manifest(image_sizes={"/a.png": (640, 480)})
+        src_hash = hash_file(self.src)
+        manifest.record(self.src, self.dest, src_hash, {"/a.png": (640, 480)})
+        manifest.save()
+        manifest = self._manifest(image_sizes={"/a.png": (640, 480)})
+        manifest.record(self.src, self.dest, src_hash)
+        manifest.save()
+        manifest = self._manifest(image_sizes={"/a.png": (320, 240)})
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_missing_output_needs_build(self):
+        self._build()
+        self.dest.unlink()
+        manifest = self._manifest()
+        self.assertTrue(manifest.needs_build(self.src, self.dest, hash_file(self.src)))
+
+    def test_remove_orphans(self):
+        self._build()
+        manifest = self._manifest()
+        removed = manifest.remove_orphans(self.dest.parent)
+        self.assertEqual(removed, [self.dest])
+        self.assertFalse(self.dest.exists())
+        self.assertTrue(self.dest.parent.exists())
+
+    def test_remove_orphans_keeps_current_pages(self):
+        self._build()
+        manifest = self._build()
+        self.assertEqual(manifest.remove_orphans(self.dest.parent), [])
+        self.assertTrue(self.dest.exists())
@@ -0,0 +1,88 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from css_assets import (
+    ASSET_MANIFEST_NAME,
+    build_css_assets,
+    fingerprinted_name,
+    load_asset_manifest,
+    minify_css,
+    remove_css_assets,
+)
+
+
+class TestMinifyCSS(unittest.TestCase):
+    def test_whitespace_and_comments_removed(self):
+        source = "/* Headings */\nh1,\nh2 > a {\n  color: #fff;\n  margin: 0 auto;\n}\n"
+        self.assertEqual(minify_css(source), "h1,h2>a{color:#fff;margin:0 auto}")
+
+    def test_strings_unchanged(self):
+        source = 'a::before {\n  content: "  ;} /* x */";\n  font-family: "A  B";\n}'
+        want = 'a::before{content:"  ;} /* x */";font-family:"A  B"}'
+        self.assertEqual(minify_css(source), want)
+
+    def test_significant_whitespace_kept(self):
+        source = "@media screen and (max-width: 600px) {\n  div :hover { margin: 0 }\n}"
+        want = "@media screen and (max-width:600px){div :hover{margin:0}}"
+        self.assertEqual(minify_css(source), want)
+
+    def test_license_comment_kept(self):
+        source = "/*! License */\np { color: red; }"
+        self.assertEqual(minify_css(source), "/*! License */ p{color:red}")
+
+
+class TestFingerprintedName(unittest.TestCase):
+    def test_hash_before_suffix(self):
+        got = fingerprinted_name("css/index.css", b"p{}")
+        self.assertRegex(got, r"^css/index\.[0-9a-f]{8}\.css$")
+        self.assertNotEqual(got, fingerprinted_name("css/index.css", b"a{}"))
+
+    def test_no_suffix(self):
+        self.assertRegex(fingerprinted_name("v1.0/style", b""), r"^v1\.0/style\.\w{8}$")
+
+
+class TestBuildCSSAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.static = self.root / "static"
+        (self.static / "css").mkdir(parents=True)
+        (self.static / "index.css").write_text("body {\n  margin: 0;\n}\n")
+        (self.static / "css" / "print.css").write_text("p { color: black; }")
+        (self.static / "app.js").write_text("")
+        self.output = self.root / "docs"
+        self.output.mkdir()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_build(self):
+        assets = build_css_assets(self.static, self.output)
+        self.assertEqual(sorted(assets), ["css/print.css", "index.css"])
+        self.assertEqual(load_asset_manifest(self.output), assets)
+        self.assertEqual(
+            (self.output / assets["index.css"]).read_text(), "body{margin:0}"
+        )
+        manifest = json.loads((self.output / ASSET_MANIFEST_NAME).read_text())
+        self.assertEqual(manifest, assets)
+
+    def test_changed_stylesheet_replaced(self):
+        before = build_css_assets(self.static, self.output)
+        (self.static / "index.css").write_text("body { margin: 1px; }")
+        after = build_css_assets(self.static, self.output)
+        self.assertNotEqual(before["index.css"], after["index.css"])
+        self.assertEqual(before["css/print.css"], after["css/print.css"])
+        self.assertFalse((self.output / before["index.css"]).exists())
+        self.assertTrue((self.output / after["index.css"]).exists())
+
+    def test_remove(self):
+        assets = build_css_assets(self.static, self.output)
+        remove_css_assets(self.output)
+        self.assertFalse(any((self.output / path).exists() for path in assets.values()))
+        self.assertFalse((self.output / ASSET_MANIFEST_NAME).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
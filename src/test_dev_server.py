@@ -0,0 +1,114 @@
+import os
+import tempfile
+import threading
+import unittest
+from functools import partial
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+from dev_server import DevRequestHandler, PageCache
+from template_engine import TemplateEngine
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.template = self.root / "template.html"
+        self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.md_path = self.root / "index.md"
+        self.md_path.write_text("# Title")
+        self.cache = PageCache(TemplateEngine(self.template), max_pages=1)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _touch(self, path: Path, mtime_ns: int):
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def test_render(self):
+        got = self.cache.get(self.md_path)
+        want = b"<title>Title</title><div><h1>Title</h1></div>"
+        self.assertEqual(got, want)
+
+    def test_cached_page_reused(self):
+        first = self.cache.get(self.md_path)
+        self.assertIs(self.cache.get(self.md_path), first)
+
+    def test_modified_source_rerendered(self):
+        self.cache.get(self.md_path)
+        self.md_path.write_text("# New title")
+        self._touch(self.md_path, 1)
+        got = self.cache.get(self.md_path)
+        want = b"<title>New title</title><div><h1>New title</h1></div>"
+        self.assertEqual(got, want)
+
+    def test_modified_template_rerendered(self):
+        self.cache.get(self.md_path)
+        self.template.write_text("{{ Content }}")
+        self._touch(self.template, 1)
+        got = self.cache.get(self.md_path)
+        want = b"<div><h1>Title</h1></div>"
+        self.assertEqual(got, want)
+
+    def test_least_recently_used_evicted(self):
+        other_md_path = self.root / "other.md"
+        other_md_path.write_text("# Other")
+        first = self.cache.get(self.md_path)
+        self.cache.get(other_md_path)
+        self.assertIsNot(self.cache.get(self.md_path), first)
+
+
+class TestDevRequestHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        content = self.root / "content"
+        (content / "blog" / "post").mkdir(parents=True)
+        (content / "blog" / "post" / "index.md").write_text("# Post")
+        static = self.root / "static"
+        static.mkdir()
+        (static / "index.css").write_text("body {}")
+        handler = partial(
+            DevRequestHandler,
+            content_dir=content,
+            page_cache=PageCache(TemplateEngine(template)),
+            directory=str(static),
+        )
+        handler.log_message = lambda *args: None
+        self.server = ThreadingHTTPServer(("localhost", 0), handler)
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def _get(self, path: str) -> tuple[int, str | None, bytes]:
+        conn = HTTPConnection("localhost", self.server.server_address[1])
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            return response.status, response.getheader("Location"), response.read()
+        finally:
+            conn.close()
+
+    def test_page(self):
+        want = (200, None, b"<div><h1>Post</h1></div>")
+        self.assertEqual(self._get("/blog/post/"), want)
+        self.assertEqual(self._get("/blog/post/index.html"), want)
+
+    def test_directory_without_slash_redirected(self):
+        self.assertEqual(self._get("/blog/post"), (301, "/blog/post/", b""))
+        self.assertEqual(self._get("/blog/post?q=1"), (301, "/blog/post/?q=1", b""))
+
+    def test_static_file(self):
+        self.assertEqual(self._get("/index.css")[::2], (200, b"body {}"))
+        self.assertEqual(self._get("/missing")[0], 404)
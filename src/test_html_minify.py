@@ -0,0 +1,129 @@
+import unittest
+
+from html_minify import HTMLMinifier, minify_attr, minify_template
+
+
+class TestMinifyAttr(unittest.TestCase):
+    def test_unquoted(self):
+        self.assertEqual(minify_attr("href", "/blog/tom"), " href=/blog/tom")
+
+    def test_quoted(self):
+        self.assertEqual(minify_attr("alt", "JRR Tolkien"), ' alt="JRR Tolkien"')
+        self.assertEqual(minify_attr("title", "a=b"), ' title="a=b"')
+
+    def test_empty(self):
+        self.assertEqual(minify_attr("alt", ""), " alt")
+
+
+class TestHTMLMinifier(unittest.TestCase):
+    def _minify(self, *calls) -> str:
+        chunks: list[str] = []
+        minifier = HTMLMinifier(chunks.append)
+        for method, *args in calls:
+            getattr(minifier, method)(*args)
+        minifier.close()
+        return "".join(chunks)
+
+    def test_collapse_whitespace(self):
+        got = self._minify(("leaf", "p", "Some  \n text", None))
+        self.assertEqual(got, "<p>Some text</p>")
+
+    def test_preformatted_unchanged(self):
+        got = self._minify(
+            ("start_tag", "pre"),
+            ("leaf", "code", "a  b\n  c\n", None),
+            ("end_tag",),
+            ("leaf", None, "d  e", None),
+        )
+        self.assertEqual(got, "<pre><code>a  b\n  c\n</code></pre>d e")
+
+    def test_void_element(self):
+        got = self._minify(("leaf", "img", "", {"src": "/a.png", "alt": "A b"}))
+        self.assertEqual(got, '<img src=/a.png alt="A b">')
+
+    def test_paragraph_end_implied(self):
+        got = self._minify(
+            ("start_tag", "div"),
+            ("leaf", "p", "a", None),
+            ("leaf", "p", "b", None),
+            ("leaf", "h2", "c", None),
+            ("leaf", "p", "d", None),
+            ("end_tag",),
+        )
+        self.assertEqual(got, "<div><p>a<p>b<h2>c</h2><p>d</div>")
+
+    def test_paragraph_end_kept(self):
+        got = self._minify(
+            ("leaf", "p", "a", None),
+            ("leaf", "b", "b", None),
+            ("leaf", None, "c", None),
+            ("leaf", "p", "d", None),
+        )
+        self.assertEqual(got, "<p>a</p><b>b</b>c<p>d</p>")
+        got = self._minify(("start_tag", "a"), ("leaf", "p", "a", None), ("end_tag",))
+        self.assertEqual(got, "<a><p>a</p></a>")
+
+    def test_list_item_end_implied(self):
+        got = self._minify(
+            ("start_tag", "ul"),
+            ("leaf", "li", "a", None),
+            ("start_tag", "li"),
+            ("leaf", None, "b", None),
+            ("start_tag", "ol"),
+            ("leaf", "li", "c", None),
+            ("end_tag",),
+            ("end_tag",),
+            ("end_tag",),
+        )
+        self.assertEqual(got, "<ul><li>a<li>b<ol><li>c</ol></ul>")
+
+
+class TestMinifyTemplate(unittest.TestCase):
+    def test_whitespace_between_blocks_removed(self):
+        source = (
+            "<!doctype html>\n<html>\n  <head>\n"
+            '    <meta charset="utf-8" />\n'
+            "    <title>{{ Title }}</title>\n  </head>\n\n"
+            "  <body>\n    <article>{{ Content }}</article>\n  </body>\n</html>\n"
+        )
+        want = (
+            "<!doctype html><html><head><meta charset=utf-8>"
+            "<title>{{ Title }}</title></head>"
+            "<body><article>{{ Content }}</article></body></html>"
+        )
+        self.assertEqual(minify_template(source), want)
+
+    def test_inline_whitespace_collapsed(self):
+        source = (
+            "<p>\n  Written   by <b>{{ author }}</b>\n  {% if x %} and {% endif %}\n</p>"
+        )
+        want = "<p>Written by <b>{{ author }}</b> {% if x %} and {% endif %}</p>"
+        self.assertEqual(minify_template(source), want)
+
+    def test_preformatted_unchanged(self):
+        source = (
+            "<div>\n<pre>\n  a  <b> b </b>\n</pre>\n"
+            "<script>\n if (a  <b) {}\n</script>\n</div>"
+        )
+        want = (
+            "<div><pre>\n  a  <b> b </b>\n</pre>"
+            "<script>\n if (a  <b) {}\n</script></div>"
+        )
+        self.assertEqual(minify_template(source), want)
+
+    def test_comments_removed(self):
+        source = "<p>a <!-- note --> b</p>"
+        self.assertEqual(minify_template(source), "<p>a b</p>")
+
+    def test_tags_with_jinja_unchanged(self):
+        source = '<a class="nav link" href="{{ url }}" >x</a>'
+        self.assertEqual(minify_template(source), source)
+
+    def test_self_closing_slash(self):
+        self.assertEqual(minify_template("<br/>"), "<br>")
+        self.assertEqual(minify_template("<a href=/a/>x</a>"), "<a href=/a/>x</a>")
+        self.assertEqual(minify_template("<div/>"), "<div/>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import io
+import sys
 import unittest
 
 from htmlnode import HTMLNode
@@ -57,3 +59,48 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode(props=props)
         want = ' href="https://www.google.com" referrerpolicy="origin" target="_blank"'
         self.assertEqual(node.props_to_html(), want)
+
+    def test_props_to_html_empty(self):
+        node = HTMLNode("p", "text", None, {})
+        self.assertIsNone(node.props)
+        self.assertEqual(node.props_to_html(), "")
+
+    def test_tag_interned(self):
+        tag = "".join(["h", "2"])
+        self.assertIs(HTMLNode(tag, "text").tag, HTMLNode("h2", "text").tag)
+
+    def test_no_instance_dict(self):
+        node = HTMLNode("p", "text")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.unknown = "value"
+
+    def test_to_html_children(self):
+        node = HTMLNode(
+            "div", None, [HTMLNode("p", "One"), HTMLNode(None, "Two")], {"id": "x"}
+        )
+        self.assertEqual(node.to_html(), '<div id="x"><p>One</p>Two</div>')
+
+    def test_write_html_matches_to_html(self):
+        items = [HTMLNode("li", "One"), HTMLNode("li", None, [HTMLNode("b", "2")])]
+        node = HTMLNode("ul", None, items)
+        fp = io.StringIO()
+        node.write_html(fp)
+        self.assertEqual(fp.getvalue(), node.to_html())
+
+    def test_to_html_deep_tree(self):
+        depth = 10 * sys.getrecursionlimit()
+        node = HTMLNode(None, "text")
+        for _ in range(depth):
+            node = HTMLNode("b", None, [node])
+        html = node.to_html()
+        self.assertEqual(html, "<b>" * depth + "text" + "</b>" * depth)
+
+    def test_clone(self):
+        link = HTMLNode("a", "Link", None, {"href": "/"})
+        node = HTMLNode("p", None, [HTMLNode(None, "Text "), link])
+        clone = node.clone()
+        self.assertEqual(clone.to_html(), node.to_html())
+        clone.children[1].props["href"] = "/other"
+        clone.children.append(HTMLNode("b", "Bold"))
+        self.assertEqual(node.to_html(), '<p>Text <a href="/">Link</a></p>')
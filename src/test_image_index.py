@@ -0,0 +1,114 @@
+import json
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+from image_index import build_image_index, read_image_size
+
+
+def _png(width: int, height: int) -> bytes:
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    crc = struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + crc
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + bytes(9)
+    dqt = b"\xff\xdb" + struct.pack(">H", 67) + bytes(65)
+    sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 1) + bytes(3)
+    return b"\xff\xd8" + app0 + dqt + sof + b"\xff\xda"
+
+
+def _webp(chunk_type: bytes, payload: bytes) -> bytes:
+    chunk = chunk_type + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", 4 + len(chunk)) + b"WEBP" + chunk
+
+
+class TestReadImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _size(self, data: bytes) -> tuple[int, int] | None:
+        path = self.root / "image"
+        path.write_bytes(data)
+        return read_image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self._size(_png(1026, 388)), (1026, 388))
+
+    def test_gif(self):
+        gif = b"GIF89a" + struct.pack("<HH", 300, 200)
+        self.assertEqual(self._size(gif), (300, 200))
+
+    def test_jpeg(self):
+        self.assertEqual(self._size(_jpeg(1920, 1080)), (1920, 1080))
+
+    def test_webp(self):
+        lossy = bytes(3) + b"\x9d\x01\x2a" + struct.pack("<HH", 400, 300)
+        self.assertEqual(self._size(_webp(b"VP8 ", lossy)), (400, 300))
+        bits = (400 - 1) | (300 - 1) << 14
+        lossless = b"\x2f" + struct.pack("<I", bits)
+        self.assertEqual(self._size(_webp(b"VP8L", lossless)), (400, 300))
+        extended = bytes(4) + (400 - 1).to_bytes(3, "little")
+        extended += (300 - 1).to_bytes(3, "little")
+        self.assertEqual(self._size(_webp(b"VP8X", extended)), (400, 300))
+
+    def test_not_an_image(self):
+        self.assertIsNone(self._size(b"not an image"))
+        self.assertIsNone(self._size(b"\xff\xd8\xff\xe0"))
+
+
+class TestBuildImageIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.static = self.root / "static"
+        (self.static / "images").mkdir(parents=True)
+        (self.static / "images" / "a.png").write_bytes(_png(640, 480))
+        (self.static / "images" / "b.jpg").write_bytes(_jpeg(800, 600))
+        (self.static / "images" / "broken.gif").write_bytes(b"GIF")
+        (self.static / "index.css").write_text("body {}")
+        self.cache_path = self.root / "cache" / "image-index.json"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_index(self):
+        want = {"images/a.png": (640, 480), "images/b.jpg": (800, 600)}
+        self.assertEqual(build_image_index(self.static), want)
+        self.assertEqual(build_image_index(self.static, self.cache_path), want)
+        self.assertTrue(self.cache_path.exists())
+
+    def test_cached_by_hash(self):
+        build_image_index(self.static, self.cache_path)
+        cache = json.loads(self.cache_path.read_text())
+        self.assertEqual(cache["images/a.png"]["dimensions"], [640, 480])
+        # An entry with an unchanged size and modification time is used as is
+        cache["images/a.png"]["dimensions"] = [1, 1]
+        self.cache_path.write_text(json.dumps(cache))
+        index = build_image_index(self.static, self.cache_path)
+        self.assertEqual(index["images/a.png"], (1, 1))
+        # A touched or renamed file is looked up by its hash
+        os.utime(self.static / "images" / "a.png", ns=(0, 0))
+        (self.static / "images" / "a.png").rename(self.static / "images" / "c.png")
+        index = build_image_index(self.static, self.cache_path)
+        self.assertEqual(index["images/c.png"], (1, 1))
+        self.assertNotIn("images/a.png", index)
+
+    def test_changed_image(self):
+        build_image_index(self.static, self.cache_path)
+        (self.static / "images" / "a.png").write_bytes(_png(320, 240))
+        os.utime(self.static / "images" / "a.png", ns=(0, 0))
+        index = build_image_index(self.static, self.cache_path)
+        self.assertEqual(index["images/a.png"], (320, 240))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,10 +2,14 @@ import unittest
 
 from markdown_converters import (
     BlockType,
+    MarkdownBlock,
     block_to_block_type,
+    lex_blocks,
     markdown_to_blocks,
     markdown_to_html_node,
 )
+from parse_cache import CacheStats, ParseCache
+from render_options import RenderOptions
 
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -356,3 +360,108 @@ It should be rendered as raw text in p tags
             html,
             "<div><p>####### This is an invalid heading</p><p>It should be rendered as raw text in p tags</p></div>",
         )
+
+
+class TestLexBlocks(unittest.TestCase):
+    def test_lex_doc(self):
+        doc = """# A *heading*
+
+Paragraph with
+two lines.
+
+
+
+> A quote
+> with **bold**
+
+- Item one
+- Item two
+
+1. First
+2. Second
+
+```
+code
+```"""
+
+        got = list(lex_blocks(doc.split("\n")))
+        want = [
+            MarkdownBlock(BlockType.HEADING, ["A *heading*"], 1),
+            MarkdownBlock(BlockType.PARAGRAPH, ["Paragraph with", "two lines."]),
+            MarkdownBlock(BlockType.QUOTE, ["A quote", "with **bold**"]),
+            MarkdownBlock(BlockType.UNORDERED_LIST, ["Item one", "Item two"]),
+            MarkdownBlock(BlockType.ORDERED_LIST, ["First", "Second"]),
+            MarkdownBlock(BlockType.CODE, ["code\n"]),
+        ]
+        self.assertEqual(got, want)
+
+    def test_lex_matches_block_to_block_type(self):
+        blocks = [
+            "###### Heading",
+            "####### Not a heading",
+            "```\ncode\n```",
+            "> quote\nnot a quote",
+            "* item\n- item",
+            "-not an item",
+            "1. one\n1. one\n2. two",
+            "2. out\n1. of order",
+        ]
+        for block in blocks:
+            with self.subTest(block=block):
+                got = next(lex_blocks(block.split("\n"))).block_type
+                self.assertEqual(got, block_to_block_type(block))
+
+    def test_lex_strips_surrounding_whitespace(self):
+        doc = "\n\n  \n  Some text  \n \n\n\n"
+        got = list(lex_blocks(doc.split("\n")))
+        want = [MarkdownBlock(BlockType.PARAGRAPH, ["Some text"])]
+        self.assertEqual(got, want)
+
+    def test_whitespace_only_blocks_skipped(self):
+        doc = "First\n\n \t \n\nSecond\n\n\n"
+        node = markdown_to_html_node(doc)
+        self.assertEqual(node.to_html(), "<div><p>First</p><p>Second</p></div>")
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.doc = (
+            "# Title\n\nSome **bold** text\n\n- [a](/a)\n- b\n\n"
+            "Some **bold** text\n\n```\ncode\n```"
+        )
+
+    def test_cached_conversion_matches(self):
+        cache = ParseCache()
+        want = markdown_to_html_node(self.doc).to_html()
+        for _ in range(2):
+            got = markdown_to_html_node(self.doc, cache=cache).to_html()
+            self.assertEqual(got, want)
+        self.assertEqual(cache.stats()["blocks"], CacheStats(hits=6, misses=4))
+
+    def test_keyed_on_options(self):
+        cache = ParseCache()
+        markdown_to_html_node(self.doc, cache=cache)
+        node = markdown_to_html_node(self.doc, None, RenderOptions("/blog/"), cache)
+        self.assertIn('<a href="/blog/a">', node.to_html())
+
+    def test_keyed_on_image_sizes(self):
+        cache = ParseCache()
+        doc = self.doc + "\n\n![A](/a.png)"
+        options = RenderOptions(image_sizes=(("/a.png", 640, 480),))
+        markdown_to_html_node(doc, None, options, cache)
+        options = RenderOptions(image_sizes=(("/a.png", 320, 240),))
+        node = markdown_to_html_node(doc, None, options, cache)
+        self.assertIn('width="320" height="240"', node.to_html())
+        # Blocks without the image are shared between the sizes
+        self.assertEqual(cache.stats()["blocks"], CacheStats(hits=6, misses=6))
+
+    def test_cached_nodes_not_modified_by_callers(self):
+        cache = ParseCache()
+        want = markdown_to_html_node(self.doc).to_html()
+        for _ in range(2):
+            node = markdown_to_html_node(self.doc, cache=cache)
+            for block in node.children:
+                block.tag = "span"
+                block.children.clear()
+        got = markdown_to_html_node(self.doc, cache=cache).to_html()
+        self.assertEqual(got, want)
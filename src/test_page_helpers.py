@@ -1,6 +1,28 @@
+import io
+import os
+import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
 
-from page_helpers import extract_title
+from build_manifest import BuildManifest
+from page_helpers import (
+    CopyMode,
+    PageGenerationError,
+    copy_tree,
+    discover_pages,
+    extract_title,
+    generate_page,
+    generate_pages_recursive,
+    render_page,
+    render_page_streaming,
+    split_front_matter,
+    sync_tree,
+)
+from render_cache import RenderCache
+from render_options import RenderOptions
+from search_index import PageTerms, SearchIndex
+from template_engine import TemplateEngine
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -52,3 +74,386 @@ For testing the extract_title function
 
         got = cm.exception
         self.assertEqual(str(got), want)
+
+
+class TestSplitFrontMatter(unittest.TestCase):
+    def test_front_matter(self):
+        md = "---\ntemplate: post.html\n---\n# Title"
+        got = split_front_matter(md)
+        want = ({"template": "post.html"}, "# Title")
+        self.assertEqual(got, want)
+
+    def test_no_front_matter(self):
+        md = "# Title\n\n---\n"
+        got = split_front_matter(md)
+        want = ({}, md)
+        self.assertEqual(got, want)
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.content = self.root / "content"
+        (self.content / "blog" / "post").mkdir(parents=True)
+        (self.content / "index.md").write_text("No title here")
+        (self.content / "blog" / "post" / "index.md").write_text("Nor here")
+        self.dest = self.root / "docs"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_discover_pages(self):
+        got = discover_pages(self.content, self.dest)
+        want = [
+            (
+                self.content / "blog" / "post" / "index.md",
+                self.dest / "blog" / "post" / "index.html",
+            ),
+            (self.content / "index.md", self.dest / "index.html"),
+        ]
+        self.assertEqual(got, want)
+
+    def test_parallel_failures_aggregated(self):
+        with self.assertRaises(PageGenerationError) as cm:
+            generate_pages_recursive(
+                self.content, self.root / "template.html", self.dest, "/", jobs=2
+            )
+
+        got = [path for path, _ in cm.exception.failures]
+        want = [
+            self.content / "blog" / "post" / "index.md",
+            self.content / "index.md",
+        ]
+        self.assertEqual(got, want)
+
+    def test_basepath_only_applied_to_urls(self):
+        template = self.root / "template.html"
+        template.write_text('<link href="/index.css" />{{ Content }}')
+        (self.content / "index.md").write_text(
+            '# Title\n\n[Home](/) and `href="/"`\n\n```\n<img src="/a.png">\n```'
+        )
+        dest_path = self.dest / "index.html"
+        generate_page(
+            self.content / "index.md", template, dest_path, "/blog/", verbose=False
+        )
+        want = (
+            '<link href="/blog/index.css" /><div><h1>Title</h1>'
+            '<p><a href="/blog/">Home</a> and <code>href="/"</code></p>'
+            '<pre><code><img src="/a.png">\n</code></pre></div>'
+        )
+        self.assertEqual(dest_path.read_text(), want)
+
+    def test_failed_pages_not_recorded(self):
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        post = self.content / "blog" / "post" / "index.md"
+        post.write_text("# Post")
+        for jobs in (1, 2):
+            manifest = BuildManifest(self.root / "manifest.json", "templates", "/")
+            with self.assertRaises(Exception):
+                generate_pages_recursive(
+                    self.content, template, self.dest, "/", manifest, jobs
+                )
+            self.assertEqual(list(manifest.pages), [str(post)])
+
+    def test_changed_image_rebuilds_pages_showing_it(self):
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        index = self.content / "index.md"
+        post = self.content / "blog" / "post" / "index.md"
+        index.write_text("# Home\n\n![A](/a.png)")
+        post.write_text("# Post\n\n[Home](/)")
+        manifest_path = self.root / "manifest.json"
+        for size, want in (
+            ((640, 480), [post, index]),
+            ((640, 480), []),
+            ((320, 240), [index]),
+        ):
+            engine = TemplateEngine(template)
+            engine.set_options(RenderOptions(image_sizes=(("/a.png", *size),)))
+            manifest = BuildManifest(
+                manifest_path, "templates", "/", image_sizes={"/a.png": size}
+            )
+            with mock.patch("page_helpers.generate_page", wraps=generate_page) as gen:
+                generate_pages_recursive(
+                    self.content, template, self.dest, "/", manifest, engine=engine
+                )
+            manifest.save()
+            self.assertEqual([call.args[0] for call in gen.call_args_list], want)
+        self.assertIn('width="320"', (self.dest / "index.html").read_text())
+
+    def test_search_index(self):
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        (self.content / "index.md").write_text("# Home\n\nHello")
+        (self.content / "blog" / "post" / "index.md").write_text("# Post\n\nWorld")
+        manifest_path = self.root / "manifest.json"
+        search = SearchIndex(self.root / "search-terms.json")
+        for jobs in (1, 2):
+            manifest = BuildManifest(manifest_path, "templates", "/blog/")
+            generate_pages_recursive(
+                self.content, template, self.dest, "/blog/", manifest, jobs
+            )
+            manifest.save()
+            generate_pages_recursive(
+                self.content,
+                template,
+                self.dest,
+                "/blog/",
+                manifest,
+                jobs,
+                search=search,
+            )
+            pages = sorted((p["url"], p["title"]) for p in search.pages.values())
+            want = [
+                ("/blog/blog/post/index.html", "Post"),
+                ("/blog/index.html", "Home"),
+            ]
+            self.assertEqual(pages, want)
+            self.assertEqual(
+                search.pages[str(self.content / "index.md")]["terms"],
+                {"home": [0], "hello": [1]},
+            )
+            # Removed pages are dropped and up to date pages keep their terms
+            (self.content / "index.md").unlink()
+            manifest = BuildManifest(manifest_path, "templates", "/blog/")
+            generate_pages_recursive(
+                self.content,
+                template,
+                self.dest,
+                "/blog/",
+                manifest,
+                jobs,
+                search=search,
+            )
+            post = self.content / "blog" / "post" / "index.md"
+            self.assertEqual(list(search.pages), [str(post)])
+            (self.content / "index.md").write_text("# Home\n\nHello")
+
+    def test_search_index_keeps_render_cache(self):
+        template = self.root / "template.html"
+        template.write_text("{{ Content }}")
+        (self.content / "index.md").write_text("# Home\n\nHello")
+        (self.content / "blog" / "post" / "index.md").write_text("# Post\n\nWorld")
+        render_cache = RenderCache(self.root / "render-cache.sqlite")
+        search = SearchIndex(self.root / "search-terms.json")
+        args = (self.content, template, self.dest, "/")
+        generate_pages_recursive(*args, render_cache=render_cache, search=search)
+        search.save()
+        # A forced build of cached pages whose terms are known converts nothing
+        search = SearchIndex(self.root / "search-terms.json")
+        with mock.patch(
+            "page_helpers.markdown_to_html_node", side_effect=AssertionError
+        ):
+            generate_pages_recursive(*args, render_cache=render_cache, search=search)
+        self.assertEqual(render_cache.stats.hits, 2)
+        self.assertEqual(len(search), 2)
+        render_cache.close()
+
+    def test_engine_basepath_mismatch(self):
+        engine = TemplateEngine(self.root / "template.html")
+        with self.assertRaises(ValueError):
+            generate_pages_recursive(
+                self.content, engine.template_path, self.dest, "/blog/", engine=engine
+            )
+
+
+class TestRenderPageStreaming(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        (self.root / "template.html").write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        (self.root / "upper.html").write_text("{{ Content|upper }}")
+        self.engine = TemplateEngine(self.root / "template.html")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _render(self, markdown: str) -> str:
+        out = io.StringIO()
+        render_page_streaming(io.StringIO(markdown), out, self.engine)
+        return out.getvalue()
+
+    def test_matches_render_page(self):
+        documents = [
+            "# Title\n\nSome **bold** text\n\n- a\n- b\n\n```\ncode\n```\n",
+            "---\nauthor: someone\n---\nIntro\n\n# Title\n\n> quote",
+            "---\ntemplate: upper.html\n---\n# Title\n\ntext",
+            "---\n---\n# Title\n\n---\n",
+        ]
+        for markdown in documents:
+            with self.subTest(markdown=markdown):
+                self.assertEqual(
+                    self._render(markdown), render_page(markdown, self.engine)
+                )
+
+    def test_minified_matches_render_page(self):
+        engine = TemplateEngine(
+            self.root / "template.html", options=RenderOptions(minify=True)
+        )
+        markdown = "# Title\n\nSome  **bold**\ntext\n\n- a\n- b\n\n```\n  code\n```\n"
+        out = io.StringIO()
+        render_page_streaming(io.StringIO(markdown), out, engine)
+        want = (
+            "<h1>Title</h1><div><h1>Title</h1><p>Some <b>bold</b> text"
+            "<ul><li>a<li>b</ul><pre><code>  code\n</code></pre></div>"
+        )
+        self.assertEqual(out.getvalue(), want)
+        self.assertEqual(render_page(markdown, engine), want)
+
+    def test_no_title(self):
+        with self.assertRaises(Exception):
+            self._render("## Not a title\n\ntext")
+
+    def test_terms_match_render_page(self):
+        markdown = "# Title\n\nSome *text*\n\n- one\n- two"
+        want = PageTerms()
+        render_page(markdown, self.engine, terms=want)
+        got = PageTerms()
+        out = io.StringIO()
+        render_page_streaming(io.StringIO(markdown), out, self.engine, terms=got)
+        self.assertEqual((got.title, got.positions), (want.title, want.positions))
+
+    def test_generate_page_streaming(self):
+        src = self.root / "index.md"
+        src.write_text("# Title\n\ntext")
+        dest = self.root / "docs" / "index.html"
+        template = self.engine.template_path
+        generate_page(src, template, dest, "/", self.engine, stream_threshold=0)
+        self.assertEqual(dest.read_text(), render_page(src.read_text(), self.engine))
+        self.assertEqual(list(dest.parent.iterdir()), [dest])
+
+    def test_render_cache(self):
+        render_cache = RenderCache(self.root / "render-cache.sqlite")
+        markdown = "# Title\n\ntext"
+        want = render_page(markdown, self.engine)
+        got = render_page(markdown, self.engine, render_cache=render_cache)
+        self.assertEqual(got, want)
+        key = RenderCache.key(markdown, self.engine.options)
+        render_cache.put(key, "Cached", "<p>cached</p>")
+        got = render_page(markdown, self.engine, render_cache=render_cache)
+        self.assertEqual(got, "<h1>Cached</h1><p>cached</p>")
+        # The terms of a cached page are taken from its markdown
+        terms = PageTerms()
+        render_page(markdown, self.engine, render_cache=render_cache, terms=terms)
+        self.assertEqual(terms.title, "Cached")
+        self.assertEqual(terms.positions, {"title": [0], "text": [1]})
+        render_cache.close()
+
+
+class TestSyncTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.src = self.root / "static"
+        (self.src / "images").mkdir(parents=True)
+        (self.src / "index.css").write_text("body {}")
+        (self.src / "images" / "a.png").write_bytes(b"png")
+        self.dest = self.root / "docs"
+        self.dest.mkdir()
+        (self.dest / "index.html").write_text("<html></html>")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_initial_sync(self):
+        report = sync_tree(self.src, self.dest)
+        want = [Path("images/a.png"), Path("index.css")]
+        self.assertEqual(report.copied, want)
+        self.assertEqual(report.files, want)
+        self.assertEqual((self.dest / "index.css").read_text(), "body {}")
+        self.assertTrue((self.dest / "index.html").exists())
+
+    def test_unchanged_files_skipped(self):
+        sync_tree(self.src, self.dest)
+        report = sync_tree(self.src, self.dest)
+        self.assertEqual(report.copied, [])
+        self.assertEqual(len(report.unchanged), 2)
+
+    def test_excluded_files_skipped(self):
+        report = sync_tree(self.src, self.dest, exclude=lambda f: f.suffix == ".png")
+        self.assertEqual(report.files, [Path("index.css")])
+        self.assertFalse((self.dest / "images" / "a.png").exists())
+
+    def test_touched_file_with_same_content_skipped(self):
+        sync_tree(self.src, self.dest)
+        os.utime(self.src / "index.css", ns=(0, 0))
+        report = sync_tree(self.src, self.dest)
+        self.assertEqual(report.copied, [])
+
+    def test_changed_file_copied(self):
+        sync_tree(self.src, self.dest)
+        (self.src / "index.css").write_text("body { margin: 0 }")
+        report = sync_tree(self.src, self.dest)
+        self.assertEqual(report.copied, [Path("index.css")])
+        self.assertEqual((self.dest / "index.css").read_text(), "body { margin: 0 }")
+
+    def test_orphans_deleted(self):
+        first = sync_tree(self.src, self.dest)
+        (self.src / "images" / "a.png").unlink()
+        report = sync_tree(self.src, self.dest, first.files)
+        self.assertEqual(report.deleted, [Path("images/a.png")])
+        self.assertFalse((self.dest / "images" / "a.png").exists())
+        self.assertTrue((self.dest / "index.html").exists())
+
+    def test_large_file_copied(self):
+        data = bytes(range(256)) * 4096
+        (self.src / "images" / "a.png").write_bytes(data)
+        sync_tree(self.src, self.dest)
+        self.assertEqual((self.dest / "images" / "a.png").read_bytes(), data)
+
+    def test_short_kernel_copy_falls_back(self):
+        data = bytes(range(256)) * 4096
+        (self.src / "images" / "a.png").write_bytes(data)
+        written: list[int] = []
+
+        def short_copy(*args: int) -> int:
+            # Copies the first bytes of a file only, like a source that shrank
+            if len(args) == 3:
+                dest_fd, count = args[1], args[2]
+            else:
+                dest_fd, count = args[0], args[3]
+            if written:
+                return 0
+            written.append(os.write(dest_fd, data[: min(count, 100)]))
+            return written[-1]
+
+        with mock.patch.object(
+            os, "copy_file_range", short_copy, create=True
+        ), mock.patch.object(os, "sendfile", short_copy, create=True):
+            sync_tree(self.src, self.dest, exclude=lambda f: f.suffix == ".css")
+        self.assertEqual(written, [100])
+        self.assertEqual((self.dest / "images" / "a.png").read_bytes(), data)
+
+    def test_hardlink_mode(self):
+        report = sync_tree(self.src, self.dest, mode=CopyMode.HARDLINK)
+        self.assertEqual(len(report.copied), 2)
+        self.assertTrue((self.dest / "index.css").samefile(self.src / "index.css"))
+        report = sync_tree(self.src, self.dest, mode=CopyMode.HARDLINK)
+        self.assertEqual(report.copied, [])
+
+    def test_switching_modes_replaces_files(self):
+        sync_tree(self.src, self.dest)
+        report = sync_tree(self.src, self.dest, mode=CopyMode.HARDLINK)
+        self.assertEqual(len(report.copied), 2)
+        report = sync_tree(self.src, self.dest)
+        self.assertEqual(len(report.copied), 2)
+        self.assertFalse((self.dest / "index.css").samefile(self.src / "index.css"))
+        # Replacing a link must not write through it into the source
+        sync_tree(self.src, self.dest, mode=CopyMode.HARDLINK)
+        (self.src / "index.css").write_text("body { margin: 0 }")
+        sync_tree(self.src, self.dest)
+        self.assertEqual((self.src / "index.css").read_text(), "body { margin: 0 }")
+
+    def test_reflink_mode(self):
+        sync_tree(self.src, self.dest, mode=CopyMode.REFLINK)
+        self.assertEqual((self.dest / "index.css").read_text(), "body {}")
+        self.assertFalse((self.dest / "index.css").samefile(self.src / "index.css"))
+
+    def test_copy_tree(self):
+        copy_tree(self.src, self.dest, mode=CopyMode.HARDLINK)
+        self.assertTrue((self.dest / "index.css").samefile(self.src / "index.css"))
+        self.assertFalse((self.dest / "index.html").exists())
+        got = sorted(path.name for path in self.dest.rglob("*"))
+        self.assertEqual(got, ["a.png", "images", "index.css"])
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from leafnode import LeafNode
@@ -167,3 +168,44 @@ class TestParentNode(unittest.TestCase):
         )
         pnode = ParentNode("div", [pnode_outer])
         self.assertRaises(ValueError, pnode.to_html)
+
+    def test_write_html(self):
+        pnode = ParentNode(
+            "p",
+            [
+                LeafNode("b", "Bold text"),
+                LeafNode(None, "Normal text"),
+                ParentNode("i", [LeafNode(None, "italic text")]),
+            ],
+        )
+        fp = io.StringIO()
+        pnode.write_html(fp)
+        want = "<p><b>Bold text</b>Normal text<i>italic text</i></p>"
+        self.assertEqual(fp.getvalue(), want)
+        self.assertEqual(pnode.to_html(), want)
+
+    def test_write_html_value_error(self):
+        pnode = ParentNode("div", [LeafNode("b", "Bold text"), LeafNode(None, None)])
+        self.assertRaises(ValueError, pnode.write_html, io.StringIO())
+
+    def test_minified(self):
+        pnode = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "Some\n  text "), LeafNode("b", "b")]),
+                ParentNode("pre", [LeafNode("code", "a  b\n")]),
+                LeafNode("a", "link", {"href": "/a b"}),
+            ],
+        )
+        want = (
+            "<div><p>Some text <b>b</b><pre><code>a  b\n</code></pre>"
+            '<a href="/a b">link</a></div>'
+        )
+        self.assertEqual(pnode.to_html(minify=True), want)
+        fp = io.StringIO()
+        pnode.write_html(fp, minify=True)
+        self.assertEqual(fp.getvalue(), want)
+
+    def test_minified_value_error(self):
+        self.assertRaises(ValueError, ParentNode("p", None).to_html, True)
+        self.assertRaises(ValueError, ParentNode(None, []).to_html, True)
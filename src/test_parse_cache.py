@@ -0,0 +1,47 @@
+import unittest
+
+from parse_cache import CacheStats, LRUCache, ParseCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = LRUCache(2)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats, CacheStats(hits=1, misses=1))
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.put("a", 1)
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestParseCache(unittest.TestCase):
+    def test_add_stats(self):
+        cache = ParseCache()
+        cache.blocks.get("missing")
+        worker_cache = ParseCache()
+        worker_cache.lines.put("line", ())
+        worker_cache.lines.get("line")
+        cache.add_stats(worker_cache.stats())
+        self.assertEqual(cache.stats()["blocks"], CacheStats(hits=0, misses=1))
+        self.assertEqual(cache.stats()["lines"], CacheStats(hits=1, misses=0))
+
+    def test_reset_stats(self):
+        cache = ParseCache()
+        cache.blocks.get("missing")
+        cache.reset_stats()
+        self.assertEqual(cache.stats()["blocks"], CacheStats())
@@ -0,0 +1,142 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+from png_optimizer import PNG_SIGNATURE, _read_chunks, optimize_images, optimize_png
+
+
+def _chunk(chunk_type: bytes, body: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + body)
+    return struct.pack(">I4s", len(body), chunk_type) + body + struct.pack(">I", crc)
+
+
+def _png(width: int = 64, height: int = 64, extra: bytes = b"") -> bytes:
+    """A grayscale PNG whose image data is split into poorly compressed IDAT chunks"""
+    rows = b"".join(
+        b"\0" + bytes((x * y) % 256 for x in range(width)) for y in range(height)
+    )
+    data = zlib.compress(rows, 0)
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    idats = [_chunk(b"IDAT", data[i : i + 1000]) for i in range(0, len(data), 1000)]
+    return (
+        PNG_SIGNATURE
+        + _chunk(b"IHDR", ihdr)
+        + extra
+        + b"".join(idats)
+        + _chunk(b"IEND", b"")
+    )
+
+
+def _pixels(data: bytes) -> bytes:
+    chunks = list(_read_chunks(data))
+    return zlib.decompress(b"".join(body for t, body in chunks if t == b"IDAT"))
+
+
+class TestOptimizePNG(unittest.TestCase):
+    def test_lossless(self):
+        data = _png()
+        optimized = optimize_png(data)
+        self.assertLess(len(optimized), len(data))
+        self.assertEqual(_pixels(optimized), _pixels(data))
+        chunk_types = [t for t, _ in _read_chunks(optimized)]
+        self.assertEqual(chunk_types, [b"IHDR", b"IDAT", b"IEND"])
+
+    def test_ancillary_chunks(self):
+        extra = _chunk(b"tEXt", b"Comment\0hello") + _chunk(b"tRNS", b"\0\0")
+        optimized = optimize_png(_png(extra=extra))
+        chunk_types = [t for t, _ in _read_chunks(optimized)]
+        self.assertEqual(chunk_types, [b"IHDR", b"tRNS", b"IDAT", b"IEND"])
+
+    def test_animated_unchanged(self):
+        data = _png(extra=_chunk(b"acTL", struct.pack(">II", 1, 0)))
+        self.assertIs(optimize_png(data), data)
+
+    def test_invalid(self):
+        data = _png()
+        for invalid in (b"GIF89a", data[:-20], data[:40] + b"x" + data[41:]):
+            with self.subTest(invalid=invalid[:16]):
+                self.assertRaises(ValueError, optimize_png, invalid)
+
+
+class TestOptimizeImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.src = self.root / "static"
+        (self.src / "images").mkdir(parents=True)
+        (self.src / "images" / "a.png").write_bytes(_png())
+        (self.src / "images" / "b.png").write_bytes(_png(32, 16))
+        (self.src / "index.css").write_text("body {}")
+        self.dest = self.root / "docs"
+        self.cache = self.root / "cache"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_optimize(self):
+        report = optimize_images(self.src, self.dest, self.cache)
+        want = [Path("images/a.png"), Path("images/b.png")]
+        self.assertEqual(report.optimized, want)
+        self.assertGreater(report.saved_bytes, 0)
+        self.assertFalse((self.dest / "index.css").exists())
+        for rel_path in want:
+            src, dest = self.src / rel_path, self.dest / rel_path
+            self.assertEqual(dest.read_bytes(), optimize_png(src.read_bytes()))
+
+    def test_unchanged_and_cached(self):
+        report = optimize_images(self.src, self.dest, self.cache)
+        report = optimize_images(self.src, self.dest, self.cache, report.hashes)
+        self.assertEqual(len(report.unchanged), 2)
+        (self.dest / "images" / "a.png").unlink()
+        report = optimize_images(self.src, self.dest, self.cache, report.hashes)
+        self.assertEqual(report.cached, [Path("images/a.png")])
+        self.assertEqual(report.optimized, [])
+        self.assertTrue((self.dest / "images" / "a.png").exists())
+
+    def test_removed(self):
+        report = optimize_images(self.src, self.dest, self.cache)
+        (self.src / "images" / "b.png").unlink()
+        report = optimize_images(self.src, self.dest, self.cache, report.hashes)
+        self.assertEqual(report.removed, [Path("images/b.png")])
+        self.assertFalse((self.dest / "images" / "b.png").exists())
+
+    def test_hard_link_not_modified(self):
+        src = self.src / "images" / "a.png"
+        data = src.read_bytes()
+        (self.dest / "images").mkdir(parents=True)
+        os.link(src, self.dest / "images" / "a.png")
+        optimize_images(self.src, self.dest, self.cache)
+        self.assertEqual(src.read_bytes(), data)
+        self.assertLess((self.dest / "images" / "a.png").stat().st_size, len(data))
+
+    def test_synced_images_taken_over(self):
+        optimal = optimize_png(_png(32, 16))
+        (self.src / "images" / "b.png").write_bytes(optimal)
+        (self.src / "images" / "c.png").write_bytes(_png())
+        for name in ("a.png", "b.png", "c.png"):
+            (self.dest / "images").mkdir(parents=True, exist_ok=True)
+            (self.dest / "images" / name).write_bytes(
+                (self.src / "images" / name).read_bytes()
+            )
+        (self.src / "images" / "c.png").unlink()
+        inode = (self.dest / "images" / "b.png").stat().st_ino
+        previous = {"images/a.png": "", "images/b.png": "", "images/c.png": ""}
+        report = optimize_images(self.src, self.dest, self.cache, previous)
+        self.assertEqual(report.optimized, [Path("images/a.png"), Path("images/b.png")])
+        self.assertEqual(report.removed, [Path("images/c.png")])
+        self.assertLess((self.dest / "images" / "a.png").stat().st_size, len(_png()))
+        # A file that is already optimal isn't replaced
+        self.assertEqual((self.dest / "images" / "b.png").stat().st_ino, inode)
+        self.assertFalse((self.dest / "images" / "c.png").exists())
+
+    def test_invalid_image_copied(self):
+        (self.src / "images" / "a.png").write_bytes(b"not a png")
+        optimize_images(self.src, self.dest, self.cache)
+        self.assertEqual((self.dest / "images" / "a.png").read_bytes(), b"not a png")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+
+from precompress import ENCODINGS, precompress_tree
+
+PAGE = "<html>" + "<p>Some text</p>" * 100 + "</html>"
+
+
+class TestPrecompressTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        (self.root / "blog").mkdir()
+        (self.root / "index.html").write_text(PAGE)
+        (self.root / "blog" / "index.html").write_text(PAGE)
+        (self.root / "index.css").write_text("body {}")
+        (self.root / "image.png").write_bytes(b"png" * 1000)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_compresses_large_html_and_css(self):
+        report = precompress_tree(self.root)
+        self.assertEqual(
+            report.compressed, [Path("blog/index.html"), Path("index.html")]
+        )
+        data = gzip.decompress((self.root / "index.html.gz").read_bytes())
+        self.assertEqual(data.decode(), PAGE)
+        for suffix in ENCODINGS:
+            self.assertFalse((self.root / f"index.css{suffix}").exists())
+            self.assertFalse((self.root / f"image.png{suffix}").exists())
+
+    def test_min_size(self):
+        report = precompress_tree(self.root, min_size=0)
+        self.assertIn(Path("index.css"), report.compressed)
+
+    def test_unchanged_files_skipped(self):
+        first = precompress_tree(self.root)
+        (self.root / "index.html").write_text(PAGE + "\n")
+        report = precompress_tree(self.root, first.hashes)
+        self.assertEqual(report.compressed, [Path("index.html")])
+        self.assertEqual(report.unchanged, [Path("blog/index.html")])
+
+    def test_missing_sibling_recompressed(self):
+        first = precompress_tree(self.root)
+        (self.root / "index.html.gz").unlink()
+        report = precompress_tree(self.root, first.hashes)
+        self.assertEqual(report.compressed, [Path("index.html")])
+
+    def test_stale_siblings_removed(self):
+        first = precompress_tree(self.root)
+        (self.root / "blog" / "index.html").unlink()
+        report = precompress_tree(self.root, first.hashes, jobs=2)
+        self.assertEqual(report.removed, [Path("blog/index.html")])
+        self.assertFalse((self.root / "blog" / "index.html.gz").exists())
+        self.assertTrue((self.root / "index.html.gz").exists())
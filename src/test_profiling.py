@@ -0,0 +1,46 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from markdown_converters import markdown_to_html_node
+from profiling import PHASES, BuildProfile, PageProfile
+
+
+class TestPageProfile(unittest.TestCase):
+    def test_lap_accumulates(self):
+        profile = PageProfile("index.md")
+        profile.lap("inline")
+        profile.lap("inline")
+        self.assertGreater(profile.phases["inline"], 0.0)
+        self.assertEqual(profile.total, profile.phases["inline"])
+
+    def test_markdown_to_html_node_phases(self):
+        profile = PageProfile("index.md")
+        markdown_to_html_node("# Heading\n\nSome **bold** text", profile)
+        self.assertGreater(profile.phases["blocks"], 0.0)
+        self.assertGreater(profile.phases["inline"], 0.0)
+
+
+class TestBuildProfile(unittest.TestCase):
+    def setUp(self):
+        self.profile = BuildProfile()
+        for i, seconds in enumerate((0.001, 0.003, 0.002)):
+            page = PageProfile(f"page{i}.md")
+            page.phases["inline"] = seconds
+            self.profile.pages.append(page)
+
+    def test_write_json(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "profile.json"
+            self.profile.write_json(path)
+            data = json.loads(path.read_text())
+        self.assertEqual(list(data["totals"]), list(PHASES))
+        self.assertAlmostEqual(data["totals"]["inline"], 0.006)
+        self.assertEqual([page["path"] for page in data["pages"]][0], "page0.md")
+
+    def test_format_table_slowest_first(self):
+        lines = self.profile.format_table(top_n=2).split("\n")
+        got = [line.split()[0] for line in lines[2:]]
+        want = ["page1.md", "page2.md", "all"]
+        self.assertEqual(got, want)
@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from render_cache import RenderCache
+from render_options import RenderOptions
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.path = self.root / "cache" / "render-cache.sqlite"
+        self.key = RenderCache.key("# Title", RenderOptions())
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_persists_across_builds(self):
+        cache = RenderCache(self.path)
+        self.assertIsNone(cache.get(self.key))
+        cache.put(self.key, "Title", "<div><h1>Title</h1></div>")
+        cache.close()
+
+        cache = RenderCache(self.path)
+        self.assertEqual(cache.get(self.key), ("Title", "<div><h1>Title</h1></div>"))
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 0))
+        cache.close()
+
+    def test_key_covers_options(self):
+        other_key = RenderCache.key("# Title", RenderOptions("/blog/"))
+        self.assertNotEqual(self.key, other_key)
+        image_sizes = (("/a.png", 640, 480),)
+        other_key = RenderCache.key("# Title", RenderOptions(image_sizes=image_sizes))
+        self.assertEqual(self.key, other_key)
+
+    def test_key_covers_image_sizes(self):
+        markdown = "# Title\n\n![A](/a.png)"
+        options = RenderOptions(image_sizes=(("/a.png", 640, 480), ("/b.png", 1, 1)))
+        key = RenderCache.key(markdown, options)
+        # Images the page doesn't refer to don't matter
+        same = RenderOptions(image_sizes=(("/a.png", 640, 480), ("/b.png", 2, 2)))
+        self.assertEqual(RenderCache.key(markdown, same), key)
+        for image_sizes in ((("/a.png", 320, 240),), ()):
+            other = RenderOptions(image_sizes=image_sizes)
+            self.assertNotEqual(RenderCache.key(markdown, other), key)
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(self.path, max_bytes=20)
+        cache.put("a", "A", "a" * 9)
+        cache.put("b", "B", "b" * 9)
+        cache.flush()
+        cache.get("a")
+        cache.put("c", "C", "c" * 9)
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        cache.close()
+
+    def test_export_import(self):
+        cache = RenderCache(self.path)
+        cache.put(self.key, "Title", "<div></div>")
+        exported = self.root / "exported.sqlite"
+        cache.export_to(exported)
+        cache.close()
+
+        other = RenderCache(self.root / "other.sqlite")
+        self.assertEqual(other.import_from(exported), 1)
+        self.assertEqual(other.import_from(exported), 0)
+        self.assertEqual(other.get(self.key), ("Title", "<div></div>"))
+        other.close()
@@ -0,0 +1,82 @@
+import unittest
+
+from render_options import RenderOptions
+
+
+class TestRenderOptions(unittest.TestCase):
+    def setUp(self):
+        self.options = RenderOptions("/blog/")
+
+    def test_rewrite_root_relative_url(self):
+        got = self.options.rewrite_url("/images/a.png")
+        self.assertEqual(got, "/blog/images/a.png")
+
+    def test_other_urls_unchanged(self):
+        for url in (
+            "//cdn.example.com/a.png",
+            "https://example.com/",
+            "images/a.png",
+            "#top",
+            "",
+        ):
+            self.assertEqual(self.options.rewrite_url(url), url)
+
+    def test_default_basepath_unchanged(self):
+        self.assertEqual(RenderOptions().rewrite_url("/index.css"), "/index.css")
+
+    def test_rewrite_template(self):
+        source = (
+            '<link href="/index.css" /><script src=\'/app.js\'></script>'
+            '<img src="//cdn.example.com/a.png" /><a href="about/">About</a>'
+        )
+        want = (
+            '<link href="/blog/index.css" /><script src=\'/blog/app.js\'></script>'
+            '<img src="//cdn.example.com/a.png" /><a href="about/">About</a>'
+        )
+        self.assertEqual(self.options.rewrite_template(source), want)
+
+    def test_rewrite_asset_urls(self):
+        asset_urls = (("/index.css", "/index.0123abcd.css"),)
+        for basepath, want in (
+            ("/", "/index.0123abcd.css"),
+            ("/blog/", "/blog/index.0123abcd.css"),
+        ):
+            options = RenderOptions(basepath, asset_urls=asset_urls)
+            self.assertEqual(options.rewrite_url("/index.css"), want)
+            self.assertEqual(
+                options.rewrite_template('<link href="/index.css" />'),
+                f'<link href="{want}" />',
+            )
+        options = RenderOptions(asset_urls=asset_urls)
+        self.assertEqual(options.rewrite_url("/other.css"), "/other.css")
+        self.assertEqual(options.rewrite_url("index.css"), "index.css")
+
+    def test_fingerprint(self):
+        image_sizes = (("/a.png", 640, 480),)
+        options = RenderOptions("/blog/", image_sizes=image_sizes)
+        same = RenderOptions("/blog/", image_sizes=image_sizes)
+        self.assertEqual(options.fingerprint, same.fingerprint)
+        self.assertEqual(hash(options), hash(same))
+        self.assertEqual(options, same)
+        # Image sizes only count for the pages that refer to the images
+        for other in (
+            RenderOptions("/blog/"),
+            RenderOptions("/blog/", image_sizes=(("/a.png", 320, 240),)),
+        ):
+            self.assertEqual(options.fingerprint, other.fingerprint)
+            self.assertEqual(options, other)
+        other = RenderOptions("/blog/", True, image_sizes=image_sizes)
+        self.assertNotEqual(options.fingerprint, other.fingerprint)
+
+    def test_image_key(self):
+        options = RenderOptions(image_sizes=(("/a.png", 640, 480), ("/b.png", 1, 1)))
+        markdown = "![B](/b.png) [a](/about) ![A](/a.png) ![C](c.png) [D](//d.png)"
+        self.assertEqual(
+            options.referenced_images(markdown),
+            {"/b.png": (1, 1), "/about": None, "/a.png": (640, 480)},
+        )
+        self.assertEqual(
+            options.image_key(markdown), (("/a.png", 640, 480), ("/b.png", 1, 1))
+        )
+        self.assertEqual(options.image_key("No images"), ())
+        self.assertEqual(RenderOptions().image_key(markdown), ())
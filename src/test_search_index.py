@@ -0,0 +1,138 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from leafnode import LeafNode
+from markdown_converters import markdown_to_html_node
+from parentnode import ParentNode
+from search_index import (
+    SEARCH_DIR_NAME,
+    PageTerms,
+    SearchIndex,
+    remove_search_index,
+    tokenize,
+)
+
+
+def _terms(title: str, text: str) -> PageTerms:
+    terms = PageTerms()
+    terms.title = title
+    terms.add_text(text)
+    return terms
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_tokenize(self):
+        got = tokenize("Hello, World! It's 2 o_clock... Ünïcode")
+        want = ["hello", "world", "it", "s", "2", "o", "clock", "ünïcode"]
+        self.assertEqual(got, want)
+
+    def test_positions(self):
+        terms = _terms("", "the cat and the hat")
+        want = {"the": [0, 3], "cat": [1], "and": [2], "hat": [4]}
+        self.assertEqual(terms.positions, want)
+
+    def test_add_node_joins_inline_text(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode(None, "foo"), LeafNode("b", "bar baz")]),
+                ParentNode("ul", [LeafNode("li", "one"), LeafNode("li", "two")]),
+                LeafNode("p", "end"),
+            ],
+        )
+        terms = PageTerms()
+        terms.add_node(node)
+        want = {"foobar": [0], "baz": [1], "one": [2], "two": [3], "end": [4]}
+        self.assertEqual(terms.positions, want)
+
+    def test_add_converted_markdown(self):
+        terms = PageTerms()
+        terms.add_node(markdown_to_html_node("# Title\n\nSome **bold** [link](/a)"))
+        self.assertEqual(list(terms.positions), ["title", "some", "bold", "link"])
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.cache_path = self.root / "cache" / "search-terms.json"
+        self.output = self.root / "docs"
+        self.index = SearchIndex(self.cache_path)
+        self.index.record(Path("a.md"), "1", "/a.html", _terms("A", "apple and pie"))
+        self.index.record(Path("b.md"), "2", "/b.html", _terms("B", "apple apple"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _read(self, rel_path: str) -> object:
+        return json.loads((self.output / SEARCH_DIR_NAME / rel_path).read_text())
+
+    def test_write(self):
+        report = self.index.write(self.output)
+        self.assertEqual(len(report.written), 3)
+        self.assertEqual(
+            report.files,
+            [
+                "search/terms/ap.json",
+                "search/terms/an.json",
+                "search/terms/pi.json",
+                "search/index.json",
+            ],
+        )
+        index = self._read("index.json")
+        self.assertEqual(index["pages"], [["/a.html", "A"], ["/b.html", "B"]])
+        self.assertEqual(index["shards"], ["an", "ap", "pi"])
+        want = {"apple": [[0, 0], [1, 0, 1]]}
+        self.assertEqual(self._read("terms/ap.json"), want)
+        # Unchanged shards aren't written again
+        self.assertEqual(self.index.write(self.output, report.files).written, [])
+
+    def test_stale_shards_removed(self):
+        files = self.index.write(self.output).files
+        self.index.remove(Path("a.md"))
+        report = self.index.write(self.output, files)
+        self.assertEqual(report.written, ["search/terms/ap.json"])
+        self.assertEqual(
+            sorted(report.removed), ["search/terms/an.json", "search/terms/pi.json"]
+        )
+        self.assertEqual(self._read("index.json")["shards"], ["ap"])
+        terms_dir = self.output / SEARCH_DIR_NAME / "terms"
+        self.assertEqual([path.name for path in terms_dir.iterdir()], ["ap.json"])
+        remove_search_index(self.output, report.files)
+        self.assertFalse((self.output / SEARCH_DIR_NAME).exists())
+
+    def test_other_files_kept(self):
+        terms_dir = self.output / SEARCH_DIR_NAME / "terms"
+        terms_dir.mkdir(parents=True)
+        (terms_dir / "zz.json").write_text("{}")
+        # Nothing is deleted if no index was written before
+        remove_search_index(self.output, [])
+        self.assertTrue((terms_dir / "zz.json").exists())
+        files = self.index.write(self.output).files
+        self.assertTrue((terms_dir / "zz.json").exists())
+        remove_search_index(self.output, files)
+        self.assertEqual([path.name for path in terms_dir.iterdir()], ["zz.json"])
+        self.assertFalse((self.output / SEARCH_DIR_NAME / "index.json").exists())
+
+    def test_cached_terms(self):
+        self.index.save()
+        index = SearchIndex(self.cache_path)
+        self.assertFalse(index.needs_terms(Path("a.md"), "1"))
+        self.assertTrue(index.needs_terms(Path("a.md"), "3"))
+        self.assertTrue(index.needs_terms(Path("c.md"), "4"))
+        index.record(Path("a.md"), "1", "/blog/a.html")
+        with self.assertRaises(ValueError):
+            index.record(Path("b.md"), "3", "/blog/b.html")
+        # A moved page keeps the terms of its source hash
+        self.assertFalse(index.needs_terms(Path("moved.md"), "2"))
+        index.record(Path("moved.md"), "2", "/moved.html")
+        self.assertEqual(index.pages["moved.md"]["title"], "B")
+        index.prune({"a.md"})
+        index.write(self.output)
+        self.assertEqual(self._read("index.json")["pages"], [["/blog/a.html", "A"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from render_options import RenderOptions
+from template_engine import TemplateEngine
+
+
+class TestTemplateEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.template = self.root / "base.html"
+        self.template.write_text(
+            "<title>{{ Title }}</title>{% block body %}{{ Content }}{% endblock %}"
+        )
+        (self.root / "post.html").write_text(
+            '{% extends "base.html" %}'
+            "{% block body %}<article>{{ Content }}</article>{% endblock %}"
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_render_default_template(self):
+        engine = TemplateEngine(self.template)
+        got = engine.render("Title", "<p>Text</p>")
+        want = "<title>Title</title><p>Text</p>"
+        self.assertEqual(got, want)
+
+    def test_render_inherited_template(self):
+        engine = TemplateEngine(self.template)
+        got = engine.render("Title", "<p>Text</p>", "post.html")
+        want = "<title>Title</title><article><p>Text</p></article>"
+        self.assertEqual(got, want)
+
+    def test_bytecode_cache(self):
+        cache_dir = self.root / "cache"
+        engine = TemplateEngine(self.template, cache_dir)
+        engine.render("Title", "<p>Text</p>")
+        self.assertTrue(any(cache_dir.iterdir()))
+
+    def test_fingerprint_covers_layouts(self):
+        engine = TemplateEngine(self.template)
+        before = engine.fingerprint()
+        (self.root / "post.html").write_text("{{ Content }}")
+        self.assertNotEqual(engine.fingerprint(), before)
+
+    def test_template_urls_rewritten(self):
+        (self.root / "link.html").write_text('<a href="/">{{ Content }}</a>')
+        engine = TemplateEngine(self.template, options=RenderOptions("/blog/"))
+        got = engine.render("Title", '<a href="/">Home</a>', "link.html")
+        want = '<a href="/blog/"><a href="/">Home</a></a>'
+        self.assertEqual(got, want)
+
+    def test_minified_template(self):
+        (self.root / "page.html").write_text(
+            '<html>\n  <head>\n    <link href="/index.css" rel="stylesheet" />\n'
+            "  </head>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n"
+        )
+        engine = TemplateEngine(
+            self.template, options=RenderOptions("/blog/", minify=True)
+        )
+        got = engine.render("Title", "<p>Text</p>", "page.html")
+        want = (
+            "<html><head><link href=/blog/index.css rel=stylesheet></head>"
+            "<body><p>Text</p></body></html>"
+        )
+        self.assertEqual(got, want)
+
+    def test_set_options(self):
+        (self.root / "link.html").write_text('<link href="/index.css">')
+        engine = TemplateEngine(self.template)
+        self.assertEqual(engine.render("", "", "link.html"), '<link href="/index.css">')
+        asset_urls = (("/index.css", "/index.0123abcd.css"),)
+        engine.set_options(RenderOptions(asset_urls=asset_urls))
+        got = engine.render("", "", "link.html")
+        self.assertEqual(got, '<link href="/index.0123abcd.css">')
+
+    def test_render_around_content(self):
+        engine = TemplateEngine(self.template)
+        got = engine.render_around_content("Title", "post.html")
+        want = ("<title>Title</title><article>", "</article>")
+        self.assertEqual(got, want)
+
+    def test_render_around_filtered_content(self):
+        (self.root / "upper.html").write_text("{{ Content|upper }}")
+        engine = TemplateEngine(self.template)
+        self.assertIsNone(engine.render_around_content("Title", "upper.html"))
@@ -1,6 +1,8 @@
 import unittest
 from enum import Enum
 
+from inlinespan import InlineSpan
+from render_options import RenderOptions
 from textnode import TextNode, TextType
 from textnode_converters import (
     extract_markdown_images,
@@ -8,8 +10,11 @@ from textnode_converters import (
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
+    spans_to_leafnodes,
     text_node_to_html,
+    text_to_spans,
     text_to_textnodes,
+    textnodes_to_leafnodes,
 )
 
 
@@ -81,6 +86,35 @@ class TestTextNodeToHTML(unittest.TestCase):
         with self.assertRaises(ValueError):
             _ = text_node_to_html(text_node)
 
+    def test_create_node_urls_rewritten(self):
+        options = RenderOptions("/blog/")
+        link = text_node_to_html(TextNode("Home", TextType.LINK, "/"), options)
+        self.assertEqual(link.props, {"href": "/blog/"})
+        image = text_node_to_html(TextNode("A", TextType.IMAGE, "/a.png"), options)
+        self.assertEqual(image.props, {"src": "/blog/a.png", "alt": "A"})
+
+    def test_create_node_image_props(self):
+        options = RenderOptions("/blog/", image_sizes=(("/a.png", 640, 480),))
+        image = text_node_to_html(TextNode("A", TextType.IMAGE, "/a.png"), options)
+        want = {
+            "src": "/blog/a.png",
+            "alt": "A",
+            "width": "640",
+            "height": "480",
+            "loading": "lazy",
+            "decoding": "async",
+        }
+        self.assertEqual(image.props, want)
+        image = text_node_to_html(TextNode("B", TextType.IMAGE, "/b.png"), options)
+        self.assertEqual(image.props, {"src": "/blog/b.png", "alt": "B"})
+
+    def test_create_node_nested_urls_rewritten(self):
+        text_node = TextNode(
+            "Home", TextType.BOLD, children=[TextNode("Home", TextType.LINK, "/")]
+        )
+        node = text_node_to_html(text_node, RenderOptions("/blog/"))
+        self.assertEqual(node.to_html(), '<b><a href="/blog/">Home</a></b>')
+
 
 # There is an issue with the logic used for dealing with bold delimiters nested within
 # italic delimiters. For now, will update the strings in the relevant tests so that they
@@ -998,6 +1032,120 @@ class TestTextToTextNodes(unittest.TestCase):
 
         self.assertEqual(got, want)
 
+    def test_nested_delimiters(self):
+        text = "**Bold with _italic_ and a [link](https://boot.dev)** text"
+        got = text_to_textnodes(text)
+        want = [
+            TextNode(
+                "Bold with italic and a link",
+                TextType.BOLD,
+                None,
+                [
+                    TextNode("Bold with ", TextType.TEXT),
+                    TextNode("italic", TextType.ITALIC),
+                    TextNode(" and a ", TextType.TEXT),
+                    TextNode("link", TextType.LINK, "https://boot.dev"),
+                ],
+            ),
+            TextNode(" text", TextType.TEXT),
+        ]
+
+        self.assertEqual(got, want)
+
+    def test_nested_delimiters_to_html(self):
+        text = "_Italic with **bold**_"
+        leafnodes = textnodes_to_leafnodes(text_to_textnodes(text))
+        got = "".join(node.to_html() for node in leafnodes)
+        want = "<i>Italic with <b>bold</b></i>"
+
+        self.assertEqual(got, want)
+
+    def test_code_span_is_literal(self):
+        text = "Use `snake_case` and `[text](url)` here"
+        got = text_to_textnodes(text)
+        want = [
+            TextNode("Use ", TextType.TEXT),
+            TextNode("snake_case", TextType.CODE),
+            TextNode(" and ", TextType.TEXT),
+            TextNode("[text](url)", TextType.CODE),
+            TextNode(" here", TextType.TEXT),
+        ]
+
+        self.assertEqual(got, want)
+
+    def test_link_url_with_delimiters(self):
+        text = "A [link](https://example.com/some_path_here) to follow"
+        got = text_to_textnodes(text)
+        want = [
+            TextNode("A ", TextType.TEXT),
+            TextNode("link", TextType.LINK, "https://example.com/some_path_here"),
+            TextNode(" to follow", TextType.TEXT),
+        ]
+
+        self.assertEqual(got, want)
+
+    def test_unbalanced_delimiters_are_text(self):
+        text = "An unmatched _ and ** and ` stay as text"
+        got = text_to_textnodes(text)
+        want = [TextNode(text, TextType.TEXT)]
+
+        self.assertEqual(got, want)
+
+
+class TestTextToSpans(unittest.TestCase):
+    def test_offsets(self):
+        text = "A **bold** [link](/page) `code`"
+        got = text_to_spans(text)
+        want = [
+            InlineSpan(TextType.TEXT, 0, 2),
+            InlineSpan(TextType.BOLD, 4, 8),
+            InlineSpan(TextType.TEXT, 10, 11),
+            InlineSpan(TextType.LINK, 12, 16, 18, 23),
+            InlineSpan(TextType.TEXT, 24, 25),
+            InlineSpan(TextType.CODE, 26, 30),
+        ]
+
+        self.assertEqual(got, want)
+        self.assertEqual(got[3].text(text), "link")
+        self.assertEqual(got[3].url(text), "/page")
+
+    def test_nested_emphasis(self):
+        text = "**bold _italic_**"
+        got = text_to_spans(text)
+        want = [
+            InlineSpan(
+                TextType.BOLD,
+                2,
+                15,
+                children=(
+                    InlineSpan(TextType.TEXT, 2, 7),
+                    InlineSpan(TextType.ITALIC, 8, 14),
+                ),
+            )
+        ]
+
+        self.assertEqual(got, want)
+        self.assertEqual(got[0].text(text), "bold italic")
+
+    def test_unmatched_delimiters_merge_with_text(self):
+        text = "An unmatched _ and ** and ` stay as text"
+        self.assertEqual(text_to_spans(text), [InlineSpan(TextType.TEXT, 0, len(text))])
+
+    def test_leafnodes_match_textnodes(self):
+        options = RenderOptions("/blog/")
+        for text in [
+            "A **bold _and italic_** [link](/page) with ![image](/image.png)",
+            "Dropped ____ emphasis and **text ____ in bold**",
+            "Unmatched [ and `, **nested `code`** and _[link](/a)_",
+        ]:
+            with self.subTest(text=text):
+                got = spans_to_leafnodes(text, text_to_spans(text), options)
+                want = textnodes_to_leafnodes(text_to_textnodes(text), options)
+                self.assertEqual(
+                    [node.to_html() for node in got], [node.to_html() for node in want]
+                )
+                self.assertEqual(len(got), len(want))
+
 
 if __name__ == "__main__":
     _ = unittest.main()
@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from watcher import InotifyWatcher, PollingWatcher, create_watcher
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name)
+        self.content = self.root / "content"
+        self.content.mkdir()
+        (self.content / "index.md").write_text("# Title")
+        self.template = self.root / "template.html"
+        self.template.write_text("{{ Content }}")
+        (self.root / "other.html").write_text("")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _check_watcher(self, watcher: InotifyWatcher | PollingWatcher):
+        try:
+            (self.content / "index.md").write_text("# New title")
+            (self.content / "blog").mkdir()
+            (self.content / "blog" / "post.md").write_text("# Post")
+            (self.root / "other.html").write_text("ignored")
+            self.template.write_text("<p>{{ Content }}</p>")
+            got = watcher.wait()
+        finally:
+            watcher.close()
+        want = {
+            self.content / "index.md",
+            self.content / "blog" / "post.md",
+            self.template,
+        }
+        self.assertTrue(want <= got)
+        self.assertNotIn(self.root / "other.html", got)
+
+    def test_polling_watcher(self):
+        self._check_watcher(
+            PollingWatcher([self.content], [self.template], interval=0.01)
+        )
+
+    def test_create_watcher(self):
+        self._check_watcher(create_watcher([self.content], [self.template]))
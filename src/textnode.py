@@ -51,23 +51,39 @@ class TextNode:
         enum
     url: str | None
         The URL of the link or image if the text is a link. Default: None
+    children: list[TextNode] | None
+        The nested nodes making up the contents of a bold or italic node whose contents
+        are not just plain text (e.g., bold text containing a link). `text` is then the
+        concatenated text of the children. Default: None
     """
 
-    def __init__(self, text: str, text_type: TextType, url: str | None = None) -> None:
+    __slots__ = ("text", "text_type", "url", "children")
+
+    def __init__(
+        self,
+        text: str,
+        text_type: TextType,
+        url: str | None = None,
+        children: list["TextNode"] | None = None,
+    ) -> None:
         self.text: str = text
         self.text_type: TextType = text_type
         self.url: str | None = url
+        self.children: list["TextNode"] | None = children
 
     def __eq__(self, other: object, /) -> bool:
         if not isinstance(other, TextNode):
             return NotImplemented
-        return (self.text, self.text_type, self.url) == (
+        return (self.text, self.text_type, self.url, self.children) == (
             other.text,
             other.text_type,
             other.url,
+            other.children,
         )
 
     def __repr__(self) -> str:
         repr_str = f'TextNode("{self.text}", {self.text_type.name}, '
-        repr_str += f'"{self.url}")' if self.url is not None else f"{self.url})"
-        return repr_str
+        repr_str += f'"{self.url}"' if self.url is not None else f"{self.url}"
+        if self.children is not None:
+            repr_str += f", {self.children}"
+        return repr_str + ")"
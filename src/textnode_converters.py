@@ -1,6 +1,11 @@
 import re
+from collections.abc import Sequence
 
+from htmlnode import HTMLNode
+from inlinespan import InlineSpan
 from leafnode import LeafNode
+from parentnode import ParentNode
+from render_options import RenderOptions
 from textnode import TextNode, TextType
 
 ALLOWED_DELIMS: dict[str, TextType] = {
@@ -20,53 +25,82 @@ TRIPLE_ASTERISK_PATTERN: dict[str, dict[str, str]] = {
 }
 
 
-def text_node_to_html(text_node: TextNode) -> LeafNode:
+def text_node_to_html(
+    text_node: TextNode, options: RenderOptions | None = None
+) -> HTMLNode:
     """Convert `TextNode` into `LeafNode`
 
     `TextNode` is converted into the `LeafNode` corresponding to it's `text_type`
-    attribute.
+    attribute. Bold and italic nodes with nested `children` are converted into a
+    `ParentNode` instead.
 
     Parameters
     ----------
     `text_node`: TextNode
         A `TextNode` object
+    `options`: RenderOptions | None
+        If provided, the URLs of links and images are resolved with
+        `RenderOptions.rewrite_url` and images get the attributes of
+        `RenderOptions.image_props`. Default: None
 
     Returns
     -------
-    `LeafNode`
-        A `LeafNode` object that matches `text_node`'s `text_type` attribute
+    `HTMLNode`
+        A `LeafNode` (or `ParentNode`) object that matches `text_node`'s `text_type`
+        attribute
     """
     if not isinstance(text_node.text_type, TextType):
         raise TypeError("`text_node.text_type` must be of type `TextType`")
-    match text_node.text_type:
+    if text_node.children is not None:
+        match text_node.text_type:
+            case TextType.BOLD:
+                children = textnodes_to_leafnodes(text_node.children, options)
+                return ParentNode("b", children)
+            case TextType.ITALIC:
+                children = textnodes_to_leafnodes(text_node.children, options)
+                return ParentNode("i", children)
+    return _inline_leaf(text_node.text_type, text_node.text, text_node.url, options)
+
+
+def _inline_leaf(
+    text_type: TextType, text: str, url: str | None, options: RenderOptions | None
+) -> LeafNode:
+    """The `LeafNode` of inline markdown without nested markdown"""
+    match text_type:
         case TextType.TEXT:
-            return LeafNode(None, text_node.text)
+            return LeafNode(None, text)
         case TextType.BOLD:
-            return LeafNode("b", text_node.text)
+            return LeafNode("b", text)
         case TextType.ITALIC:
-            return LeafNode("i", text_node.text)
+            return LeafNode("i", text)
         case TextType.CODE:
-            return LeafNode("code", text_node.text)
+            return LeafNode("code", text)
         case TextType.LINK:
-            if text_node.url is not None:
-                return LeafNode("a", text_node.text, {"href": text_node.url})
+            if url is not None:
+                if options is not None:
+                    url = options.rewrite_url(url)
+                return LeafNode("a", text, {"href": url})
             else:
-                return LeafNode("a", text_node.text, {"href": ""})
+                return LeafNode("a", text, {"href": ""})
         case TextType.IMAGE:
-            if text_node.url is not None:
-                return LeafNode(
-                    "img", "", {"src": text_node.url, "alt": text_node.text}
-                )
+            if url is not None:
+                if options is None:
+                    return LeafNode("img", "", {"src": url, "alt": text})
+                props = {"src": options.rewrite_url(url), "alt": text}
+                props.update(options.image_props(url))
+                return LeafNode("img", "", props)
             raise ValueError("`src` parameter recieved no value")
         case _:
             # Not sure if I even need this. Will keep for now.
             raise ValueError("`text_node` does not match any `TextType` member")
 
 
-def textnodes_to_leafnodes(textnodes: list[TextNode]) -> list[LeafNode]:
-    leafnodes: list[LeafNode] = []
+def textnodes_to_leafnodes(
+    textnodes: Sequence[TextNode], options: RenderOptions | None = None
+) -> list[HTMLNode]:
+    leafnodes: list[HTMLNode] = []
     for textnode in textnodes:
-        leafnode = text_node_to_html(textnode)
+        leafnode = text_node_to_html(textnode, options)
         leafnodes.append(leafnode)
     return leafnodes
 
@@ -339,9 +373,245 @@ def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
     return text_nodes
 
 
+INLINE_TOKEN_PATTERN = re.compile(r"\*\*|_|`|!?\[")
+"""
+Matches the start of every inline markdown construct: bold and italic delimiters, code
+spans, images and links
+"""
+
+LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+"""
+Matches a link (or the part of an image after the `!`), capturing its text and URL
+"""
+
+EMPHASIS_DELIMS: dict[str, TextType] = {
+    "_": TextType.ITALIC,
+    "**": TextType.BOLD,
+}
+
+
+class _Delimiter:
+    """A bold or italic delimiter that has not been matched with a closing delimiter"""
+
+    __slots__ = ("delim", "start")
+
+    def __init__(self, delim: str, start: int) -> None:
+        self.delim: str = delim
+        self.start: int = start
+
+
+def _close_emphasis(
+    items: list[InlineSpan | _Delimiter], opener: int, end: int
+) -> None:
+    """Replace an opening delimiter and everything after it with an emphasis span
+
+    Unmatched delimiters between the opener and the closing delimiter at `end` are
+    turned into plain text. Emphasis with no contents is dropped.
+    """
+    delimiter = items[opener]
+    assert isinstance(delimiter, _Delimiter)
+    text_type = EMPHASIS_DELIMS[delimiter.delim]
+    contents = _merge_spans(items[opener + 1 :])
+    del items[opener:]
+    if not contents:
+        return
+    if len(contents) == 1 and contents[0].text_type == TextType.TEXT:
+        items.append(InlineSpan(text_type, contents[0].start, contents[0].end))
+    else:
+        start = delimiter.start + len(delimiter.delim)
+        items.append(InlineSpan(text_type, start, end, children=tuple(contents)))
+
+
+def _merge_spans(items: list[InlineSpan | _Delimiter]) -> list[InlineSpan]:
+    """Turn unmatched delimiters into text and merge contiguous plain text spans"""
+    spans: list[InlineSpan] = []
+    for item in items:
+        if isinstance(item, _Delimiter):
+            item = InlineSpan(TextType.TEXT, item.start, item.start + len(item.delim))
+        if (
+            item.text_type == TextType.TEXT
+            and spans
+            and spans[-1].text_type == TextType.TEXT
+            and spans[-1].end == item.start
+        ):
+            spans[-1] = InlineSpan(TextType.TEXT, spans[-1].start, item.end)
+        else:
+            spans.append(item)
+    return spans
+
+
+def _is_plain(spans: Sequence[InlineSpan]) -> bool:
+    """Whether the spans are all plain text, which converts to a single text node"""
+    return all(span.text_type == TextType.TEXT for span in spans)
+
+
+def text_to_spans(text: str) -> list[InlineSpan]:
+    """Parse inline markdown into spans of the appropriate type
+
+    Recognizes the same markdown as `text_to_textnodes` in the same single left to
+    right scan, but the result only holds offsets into `text`. No text is copied
+    until the spans are converted with `spans_to_leafnodes` or `spans_to_textnodes`.
+
+    Parameters
+    ----------
+    text: str
+        A string containing valid markdown delimiters and tags.
+
+    Returns
+    -------
+    list[InlineSpan]
+        Spans covering the contents of `text`, in order. Adjacent plain text spans are
+        merged unless the markdown between them (e.g., empty emphasis) was dropped.
+    """
+    # Spans are created with tuple.__new__, which is much faster than the constructor
+    # of the named tuple
+    new = tuple.__new__
+    items: list[InlineSpan | _Delimiter] = []
+    openers: list[int] = []
+    # Whether unmatched tokens have been kept as plain text next to other text
+    needs_merge = False
+    pos = 0
+    for m in INLINE_TOKEN_PATTERN.finditer(text):
+        start = m.start()
+        if start < pos:
+            # Inside a code span, image or link that has already been consumed
+            continue
+        if start > pos:
+            items.append(new(InlineSpan, (TextType.TEXT, pos, start, -1, -1, None)))
+        token = m.group()
+        pos = m.end()
+        match token:
+            case "`":
+                end = text.find("`", pos)
+                if end == -1:
+                    items.append(InlineSpan(TextType.TEXT, start, pos))
+                    needs_merge = True
+                    continue
+                if end > pos:
+                    code = (TextType.CODE, pos, end, -1, -1, None)
+                    items.append(new(InlineSpan, code))
+                pos = end + 1
+            case "![" | "[":
+                link = LINK_PATTERN.match(text, start + len(token) - 1)
+                # Images take precedence over links containing them
+                if link is None or (token == "[" and "![" in link.group(1)):
+                    items.append(InlineSpan(TextType.TEXT, start, pos))
+                    needs_merge = True
+                    continue
+                text_type = TextType.IMAGE if token == "![" else TextType.LINK
+                link_span = (text_type, *link.span(1), *link.span(2), None)
+                items.append(new(InlineSpan, link_span))
+                pos = link.end()
+            case _:
+                for i in range(len(openers) - 1, -1, -1):
+                    opener = items[openers[i]]
+                    if opener.delim == token:  # type: ignore[union-attr]
+                        _close_emphasis(items, openers[i], start)
+                        del openers[i:]
+                        break
+                else:
+                    openers.append(len(items))
+                    items.append(_Delimiter(token, start))
+    if pos < len(text):
+        items.append(new(InlineSpan, (TextType.TEXT, pos, len(text), -1, -1, None)))
+    if needs_merge or openers:
+        return _merge_spans(items)
+    return items  # type: ignore[return-value]
+
+
+def spans_to_textnodes(source: str, spans: Sequence[InlineSpan]) -> list[TextNode]:
+    """Convert spans parsed from `source` into `TextNode`s
+
+    Parameters
+    ----------
+    source: str
+        The text the spans were parsed from
+    spans: Sequence[InlineSpan]
+        Spans returned by `text_to_spans`
+
+    Returns
+    -------
+    list[TextNode]
+        The equivalent `TextNode`s, with adjacent plain text merged
+    """
+    nodes: list[TextNode] = []
+    for span in spans:
+        if span.children is not None and not _is_plain(span.children):
+            children = spans_to_textnodes(source, span.children)
+            text = "".join(child.text for child in children)
+            node = TextNode(text, span.text_type, None, children)
+        else:
+            node = TextNode(span.text(source), span.text_type, span.url(source))
+        if (
+            node.text_type == TextType.TEXT
+            and nodes
+            and nodes[-1].text_type == TextType.TEXT
+        ):
+            nodes[-1] = TextNode(nodes[-1].text + node.text, TextType.TEXT)
+        else:
+            nodes.append(node)
+    return nodes
+
+
+def spans_to_leafnodes(
+    source: str, spans: Sequence[InlineSpan], options: RenderOptions | None = None
+) -> list[HTMLNode]:
+    """Convert spans parsed from `source` straight into HTML nodes
+
+    Produces the same nodes as converting the spans into `TextNode`s and those with
+    `textnodes_to_leafnodes`, but the text of every node is sliced out of `source`
+    only once, without creating the intermediate `TextNode`s.
+
+    Parameters
+    ----------
+    source: str
+        The text the spans were parsed from
+    spans: Sequence[InlineSpan]
+        Spans returned by `text_to_spans`
+    options: RenderOptions | None
+        If provided, the URLs of links and images are resolved with
+        `RenderOptions.rewrite_url` and images get the attributes of
+        `RenderOptions.image_props`. Default: None
+
+    Returns
+    -------
+    list[HTMLNode]
+        A `LeafNode`, or a `ParentNode` for emphasis containing other markdown, for
+        every span
+    """
+    leafnodes: list[HTMLNode] = []
+    for span in spans:
+        text_type, start, end, url_start, url_end, children = span
+        if children is None:
+            text = source[start:end]
+        elif _is_plain(children):
+            text = span.text(source)
+        else:
+            children = spans_to_leafnodes(source, children, options)
+            tag = "b" if text_type == TextType.BOLD else "i"
+            leafnodes.append(ParentNode(tag, children))
+            continue
+        if text_type == TextType.TEXT:
+            # Only plain text converts to a node without a tag
+            if leafnodes and leafnodes[-1].tag is None:
+                leafnodes[-1].value += text  # type: ignore[operator]
+            else:
+                leafnodes.append(LeafNode(None, text))
+            continue
+        url = source[url_start:url_end] if url_start >= 0 else None
+        leafnodes.append(_inline_leaf(text_type, text, url, options))
+    return leafnodes
+
+
 def text_to_textnodes(text: str) -> list[TextNode]:
     """Converts text to a list of 'TextNodes' of the appropriate type
 
+    The text is scanned once from left to right. Code spans, images and links are
+    recognized as soon as they start, so any markdown inside them is kept as is. Bold
+    and italic delimiters are kept on a stack until a matching closing delimiter is
+    found, which allows them to be nested inside each other and to contain code, images
+    and links. Delimiters that are never closed are kept as plain text.
+
     Parameters
     ----------
     text: str
@@ -352,9 +622,4 @@ def text_to_textnodes(text: str) -> list[TextNode]:
     list[TextNode]
         A list of `TextNode`s whose type matches the corresponding delimiter.
     """
-    nodes = [TextNode(text, TextType.TEXT)]
-    for delimiter, text_type in ALLOWED_DELIMS.items():
-        nodes = split_nodes_delimiter(nodes, delimiter, text_type)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    return nodes
+    return spans_to_textnodes(text, text_to_spans(text))
@@ -0,0 +1,238 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+# Flags from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_INOTIFY_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+DEBOUNCE_SECONDS = 0.1
+"""
+How long to keep collecting changes after the first one so that a burst of events
+(e.g., an editor writing a file in several steps) results in a single rebuild.
+"""
+
+
+class PollingWatcher:
+    """Detects changes to files by periodically comparing their modification times
+
+    Works on every platform, but has to stat every watched file on each poll.
+
+    Parameters
+    ----------
+    dirs: Iterable[pathlib.Path]
+        Directories to watch recursively
+    files: Iterable[pathlib.Path]
+        Individual files to watch
+    interval: float
+        Seconds between polls. Default: 0.5
+    """
+
+    def __init__(
+        self, dirs: Iterable[Path], files: Iterable[Path], interval: float = 0.5
+    ) -> None:
+        self.dirs: list[Path] = list(dirs)
+        self.files: list[Path] = list(files)
+        self.interval: float = interval
+        self._snapshot: dict[Path, tuple[int, int]] = self._take_snapshot()
+
+    def _take_snapshot(self) -> dict[Path, tuple[int, int]]:
+        paths = list(self.files)
+        for watched_dir in self.dirs:
+            paths.extend(p for p in watched_dir.rglob("*") if not p.is_dir())
+        snapshot: dict[Path, tuple[int, int]] = {}
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _poll(self) -> set[Path]:
+        snapshot = self._take_snapshot()
+        changed = {
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def wait(self) -> set[Path]:
+        """Block until at least one watched file changes
+
+        Returns
+        -------
+        set[pathlib.Path]
+            Files that were created, modified or deleted
+        """
+        while True:
+            time.sleep(self.interval)
+            changed = self._poll()
+            if changed:
+                time.sleep(DEBOUNCE_SECONDS)
+                return changed | self._poll()
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Detects changes to files using the Linux inotify API
+
+    The kernel reports changes as they happen, so nothing has to be scanned between
+    changes. Directories are watched recursively, including directories created after
+    the watcher was set up. Individual files are watched through their parent directory
+    so that editors replacing a file instead of writing to it are handled as well.
+
+    Parameters
+    ----------
+    dirs: Iterable[pathlib.Path]
+        Directories to watch recursively
+    files: Iterable[pathlib.Path]
+        Individual files to watch
+    """
+
+    def __init__(self, dirs: Iterable[Path], files: Iterable[Path]) -> None:
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify is not available")
+        self._fd: int = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: dict[int, tuple[Path, bool]] = {}
+        self.files: set[Path] = set(files)
+        for watched_dir in dirs:
+            self._add_tree(watched_dir)
+        for parent in {f.parent for f in self.files}:
+            self._add_watch(parent, recursive=False)
+
+    def _add_watch(self, path: Path, recursive: bool) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _INOTIFY_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"could not watch '{path}'")
+        self._watches[wd] = (path, recursive)
+
+    def _add_tree(self, path: Path) -> list[Path]:
+        """Watch `path` and all its subdirectories, returning the files found in them"""
+        self._add_watch(path, recursive=True)
+        files: list[Path] = []
+        for entry in path.iterdir():
+            if entry.is_dir():
+                files.extend(self._add_tree(entry))
+            else:
+                files.append(entry)
+        return files
+
+    def _read_events(self) -> set[Path]:
+        changed: set[Path] = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                raise OSError("inotify event queue overflowed")
+            if mask & IN_IGNORED or wd not in self._watches:
+                self._watches.pop(wd, None)
+                continue
+            watch_path, recursive = self._watches[wd]
+            path = watch_path / os.fsdecode(name)
+            if not recursive:
+                if path in self.files:
+                    changed.add(path)
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and path.is_dir():
+                    changed.update(self._add_tree(path))
+                else:
+                    changed.add(path)
+            else:
+                changed.add(path)
+        return changed
+
+    def wait(self) -> set[Path]:
+        """Block until at least one watched file changes
+
+        Returns
+        -------
+        set[pathlib.Path]
+            Files that were created, modified or deleted. Deleted or moved directories
+            are reported as a single path.
+        """
+        changed: set[Path] = set()
+        while not changed:
+            select.select([self._fd], [], [])
+            changed = self._read_events()
+        while select.select([self._fd], [], [], DEBOUNCE_SECONDS)[0]:
+            changed |= self._read_events()
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _load_libc() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+def create_watcher(
+    dirs: Iterable[Path], files: Iterable[Path]
+) -> InotifyWatcher | PollingWatcher:
+    """Create the best watcher available on the current platform
+
+    Uses inotify where available and falls back to polling otherwise.
+
+    Parameters
+    ----------
+    dirs: Iterable[pathlib.Path]
+        Directories to watch recursively
+    files: Iterable[pathlib.Path]
+        Individual files to watch
+
+    Returns
+    -------
+    InotifyWatcher | PollingWatcher
+        A watcher for the given directories and files
+    """
+    dirs, files = list(dirs), list(files)
+    try:
+        return InotifyWatcher(dirs, files)
+    except OSError:
+        return PollingWatcher(dirs, files)
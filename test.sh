@@ -1,3 +1,6 @@
 #!/usr/bin/env bash
 
-python3 -m unittest discover -s src
+status=0
+python3 -m unittest discover -s src || status=1
+python3 -m unittest discover -s benchmarks -t . || status=1
+exit $status